@@ -1,90 +1,188 @@
 import extract_image_text
 import text_translator
-import caption_maker
 import overlay_caption_on_image
-import window_creator
-import screenshot_clicker
+import pipeline
+import progressive
+import startup
+import translation_server
+from incremental_ocr import IncrementalOCR
+from ocr_results import OCRResults
+import text_layout
 from PIL import Image
 import io
-import os
+import logging
+import metrics
 import win32clipboard 
 from win32con import CF_DIB
 import keyboard
 import threading
+import time
+from frame_cache import FrameCache
 
 # Define the thread variable globally
 translation_thread = None
 
+# Client of a running translation_server, if one was found; models are then never loaded here
+server_client = None
 
-def mid_process(img) -> Image.Image:
+logger = logging.getLogger(__name__)
+
+
+def mid_process(img, ocr: IncrementalOCR = None, client=None, merge_lines: bool = True,
+                frame_cache: FrameCache = None) -> Image.Image:
     """
-    Extracts Japanese text from the given image, translates it, and creates captioned images.
+    Extracts Japanese text from the given image, translates it, and overlays cached captions.
 
     Args:
         img: The input image to process.
+        ocr: Optional IncrementalOCR (re-reads only regions changed since its previous frame) or
+             RegionOfInterestOCR (reads only where text appeared before).
+        client: Optional translation_server.TranslationClient; the whole job then runs on the
+                server, which keeps the models loaded.
+        merge_lines: Merge OCR fragments into lines and paragraphs, translating each once.
+        frame_cache: Optional FrameCache; a screen seen before is answered from it without OCR or
+                     translation.
 
     Returns:
         An image with overlaid captions based on the extracted and translated text.
     """
-    # Extract Japanese text from the image
-    extraction_result = extract_image_text.extract_japanese_text(img)
-
-    # Process each extracted item
-    for pos, item in enumerate(extraction_result):
-        text = item['text']
-
-        try:
-            # Translate the extracted text
-            translated_text = text_translator.translate_text(text)
-        except Exception as err:
-            with open(os.path.basename(__file__).replace('.py', '.log'), 'a') as file:
-                file.write(f"Translation error: {err}\n")
-            translated_text = text  # Fallback to original text if translation fails
-
-        # Create a captioned image object
-        caption_image_obj = caption_maker.create_captioned_image(translated_text)
-
-        coords = item['coordinates']
-        confidence = item['confidence']
-
-        # Update extraction result with translation and captioned image
-        extraction_result[pos]['text'] = translated_text
-        extraction_result[pos]['original_text'] = text
-        extraction_result[pos]['cap img obj'] = caption_image_obj
+    if client is not None:
+        return client.overlay(img)
+
+    start = time.perf_counter()
+    if frame_cache is not None:
+        key, hit = frame_cache.get(img)
+        if hit is not None and hit['overlay'] is not None:
+            return hit['overlay']
+        if hit is not None:
+            # Found on disk only: draw the stored translations and keep the overlay in memory
+            render_start = time.perf_counter()
+            result = overlay_caption_on_image.overlay_images_with_coordinates(img, {'sentences': hit['results']})
+            render_seconds = time.perf_counter() - render_start
+            frame_cache.put(key, hit['results'], result, hit['seconds'] - hit['render_seconds'] + render_seconds, render_seconds)
+            return result
+
+    # Extract Japanese text from the image; results stay columnar instead of being mutated as dicts
+    if ocr is not None:
+        extraction_result = OCRResults.from_dicts(ocr.process(img))
+    else:
+        extraction_result = extract_image_text.extract_results(img)
+
+    # One sentence split over several boxes is translated once, with its full context
+    if merge_lines and len(extraction_result) > 1:
+        extraction_result = OCRResults.from_dicts(text_layout.merge_results(extraction_result.to_dicts()))
+
+    # Translate every extracted item in one batch; captions come from the caption cache during overlay
+    text_translator.translate_results(extraction_result)
 
     # Overlay captions on the original image
+    render_start = time.perf_counter()
     result = overlay_caption_on_image.overlay_images_with_coordinates(img, {'sentences': extraction_result})
+    if frame_cache is not None:
+        end = time.perf_counter()
+        frame_cache.put(key, extraction_result, result, end - start, end - render_start)
     return result
 
-def screen_maker(coords: tuple = (500, 1000, 0, 1000)) -> None:
+def mid_process_stream(img, ocr: IncrementalOCR = None, client=None, merge_lines: bool = True, order='reading',
+                       frame_cache: FrameCache = None):
+    """
+    Streaming mid_process: yields the overlay each time another paragraph has been translated.
+
+    Args:
+        img: The input image to process.
+        ocr: Optional IncrementalOCR or RegionOfInterestOCR. Its results are read in one call and
+             only translation and drawing are streamed.
+        client: Optional translation_server.TranslationClient; the server answers with the finished
+                overlay, which is yielded once.
+        merge_lines: Translate whole paragraphs instead of single boxes.
+        order: 'reading', 'priority' (largest text first) or a sort key; see progressive.group_boxes.
+        frame_cache: Optional FrameCache; a screen seen before is yielded finished, at once. A frame
+                     is stored once its last paragraph is drawn.
+
+    Yields:
+        dict: Updates from progressive.stream_overlays; update['image'] is the overlay so far.
+    """
+    if client is not None:
+        yield {'image': client.overlay(img), 'results': [], 'box': None, 'done': 1, 'total': 1, 'elapsed': None}
+        return
+
+    start = time.perf_counter()
+    if frame_cache is not None:
+        key, hit = frame_cache.get(img)
+        if hit is not None:
+            result = hit['overlay']
+            if result is None:
+                # Found on disk only: draw the stored translations and keep the overlay in memory
+                render_start = time.perf_counter()
+                result = overlay_caption_on_image.overlay_images_with_coordinates(img, {'sentences': hit['results']})
+                render_seconds = time.perf_counter() - render_start
+                frame_cache.put(key, hit['results'], result, hit['seconds'] - hit['render_seconds'] + render_seconds, render_seconds)
+            yield {'image': result, 'results': hit['results'].to_dicts(), 'box': None, 'done': 1, 'total': 1,
+                   'elapsed': time.perf_counter() - start, 'render_seconds': 0.0}
+            return
+
+    results = ocr.process(img) if ocr is not None else None
+    drawn, update = [], None
+    for update in progressive.stream_overlays(img, merge_lines=merge_lines, order=order, results=results):
+        drawn.extend(update['results'])
+        yield update
+    # Store only a finished frame: a stream closed early never gets here, and a frame without text
+    # ends on the first update (0 of None groups)
+    if frame_cache is not None and update is not None and update['done'] == (update['total'] or 0):
+        frame_cache.put(key, drawn, update['image'], time.perf_counter() - start, update['render_seconds'])
+
+def screen_maker(coords: tuple = (500, 1000, 0, 1000), ocr: IncrementalOCR = None, client=None,
+                 progressive_display: bool = False, frame_cache: FrameCache = None) -> None:
     """
     Captures a screenshot from the specified coordinates, processes the image,
-    and displays it in a window.
+    and displays it in a window, repeating with the window's new position until
+    the coordinates become invalid.
 
     Args:
         coords: A tuple of coordinates in the format (x1, x2, y1, y2).
                  The coordinates should not contain None values.
+        ocr: OCR state carried between frames, e.g. IncrementalOCR or RegionOfInterestOCR.
+             A new IncrementalOCR is created if None.
+        client: Optional translation_server.TranslationClient doing OCR and translation on the server.
+        progressive_display: Show each capture at once and draw captions in the window as they
+                             are translated (see mid_process_stream), instead of showing only
+                             finished frames.
+        frame_cache: Optional FrameCache answering repeated screens (menus, paused scenes) without
+                     OCR, translation or rendering.
     """
-    # Validate coordinates
-    if None in coords:
-        with open(os.path.basename(__file__).replace('.py', '.log'), 'a') as file:
-            file.write("Invalid coordinates: None detected.\n")
-        return None
-
-    print(f"Capturing screenshot with coordinates: {coords}")
-
-    # Capture a screenshot of the specified area
-    screenshot = screenshot_clicker.capture_screenshot(coords)
-
-
-    # Process the captured screenshot
-    screenshot = mid_process(screenshot)
-
-    # Display the processed image in a window and get new click coordinates
-    click_position, coordinates = window_creator.show_image_in_window(screenshot, coords[0] - 9, coords[2] - 38)
-
-    # Recursive call to allow continuous screenshot capturing
-    screen_maker(coordinates)
+    if ocr is None:
+        ocr = IncrementalOCR()
+
+    if progressive_display:
+        _progressive_screen_maker(coords, ocr=ocr, client=client, frame_cache=frame_cache)
+        return
+
+    # A loop-based pipeline instead of recursing once per frame; the window feeds the next region back to the source
+    source = pipeline.ScreenSource(coords)
+    sink = pipeline.WindowSink(source)
+    stats = pipeline.Pipeline(source, sink, ocr=ocr, stop_on_error=True, client=client, frame_cache=frame_cache).run()
+    logger.info("Live translation stopped: %s", stats)
+
+def _progressive_screen_maker(coords: tuple, ocr: IncrementalOCR = None, client=None, frame_cache: FrameCache = None) -> None:
+    """Capture, show and caption frames one at a time, updating the window as captions finish."""
+    import window_creator
+
+    source = pipeline.ScreenSource(coords)
+    while True:
+        frame = source.read()
+        if frame is None:
+            break
+        coords = frame['coords']
+        stream = mid_process_stream(frame['image'], ocr=ocr, client=client, frame_cache=frame_cache)
+        try:
+            first = next(stream)['image']
+            click_position, coordinates = window_creator.show_image_in_window(
+                first.copy(), coords[0] - 9, coords[2] - 38, updates=(update['image'] for update in stream))
+        finally:
+            # The window can close before every caption is drawn; stop the OCR and translation of this frame
+            stream.close()
+        source.update(tuple(coordinates))
+    logger.info("Live translation stopped.")
 
 def copy_image_to_clipboard(image:Image.Image):
     """
@@ -98,8 +196,7 @@ def copy_image_to_clipboard(image:Image.Image):
     """
     # Validate the input
     if not isinstance(image, Image.Image):
-        with open(os.path.basename(__file__).replace('.py', '.log'), 'a') as file:
-            file.write("Invalid input: Provided object is not a Pillow Image instance.\n")
+        logger.error("Invalid input: Provided object is not a Pillow Image instance.")
         raise ValueError("The provided object is not a Pillow Image instance.")
 
     try:
@@ -114,10 +211,9 @@ def copy_image_to_clipboard(image:Image.Image):
             win32clipboard.EmptyClipboard()
             win32clipboard.SetClipboardData(win32clipboard.CF_DIB, output.getvalue())  # Set the image data
 
-        print("Image copied to clipboard successfully.")
+        logger.info("Image copied to clipboard successfully.")
     except Exception as e:
-        with open(os.path.basename(__file__).replace('.py', '.log'), 'a') as file:
-            file.write(f"Failed to copy image to clipboard: {e}\n")
+        logger.error("Failed to copy image to clipboard: %s", e)
     finally:
         win32clipboard.CloseClipboard()  # Ensure the clipboard is closed
 
@@ -143,15 +239,13 @@ def get_image_from_clipboard() -> Image.Image:
             # Create a BytesIO object from the DIB data
             image = Image.open(io.BytesIO(dib_data))
 
-            print("Image retrieved from clipboard successfully.")
+            logger.info("Image retrieved from clipboard successfully.")
             return image
         else:
-            with open(os.path.basename(__file__).replace('.py', '.log'), 'a') as file:
-                file.write("Clipboard does not contain a DIB image.\n")
+            logger.warning("Clipboard does not contain a DIB image.")
             raise ValueError("No image found in the clipboard or unsupported format.")
     except Exception as e:
-        with open(os.path.basename(__file__).replace('.py', '.log'), 'a') as file:
-            file.write(f"Failed to retrieve image from clipboard: {e}\n")
+        logger.error("Failed to retrieve image from clipboard: %s", e)
         raise
     finally:
         win32clipboard.CloseClipboard()  # Ensure the clipboard is closed
@@ -161,29 +255,39 @@ def start_translation():
     """
     The function to be called when Num Lock is pressed. This will initiate the translation process.
     """
-    print("Starting translation process...")
+    logger.info("Starting translation process...")
     # Call your translation functions here, like screen_maker or mid_process.
-    screen_maker((0,0,0,0))
+    # A client is used by one thread at a time, so each run gets its own connection
+    client = translation_server.connect() if server_client is not None else None
+    screen_maker((0,0,0,0), client=client)
 
 def on_demand_translation():
     """
     Listens for the Num Lock key. Starts a new thread to run the translation process
     when the key is pressed, and restarts the thread if it has finished running.
     """
-    global translation_thread
+    global server_client
 
     def toggle_translation():
         global translation_thread
 
         if translation_thread and translation_thread.is_alive():
-            print("Translation is already running.")
+            logger.info("Translation is already running.")
         else:
-            print("Num Lock pressed. Starting a new translation thread.")
+            logger.info("Num Lock pressed. Starting a new translation thread.")
             translation_thread = threading.Thread(target=start_translation)
             translation_thread.start()
 
+    # Use a running translation server if there is one; otherwise load the OCR reader and the
+    # offline model in the background while the listener is already waiting for the first key press
+    server_client = translation_server.connect()
+    if server_client is not None:
+        logger.info("Using the running translation server.")
+    else:
+        startup.warm_up()
+
     # Listen for Num Lock key press
-    print("Listening for Num Lock key press to start/stop translation...")
+    logger.info("Listening for Num Lock key press to start/stop translation...")
     keyboard.add_hotkey('num lock', toggle_translation)
 
     # Keep the program running to listen for the key press
@@ -192,9 +296,15 @@ def on_demand_translation():
 
 
 if __name__ == "__main__":
-    pass
+    metrics.setup_logging()
+    # metrics.serve()  # Per-stage timings on http://127.0.0.1:8765/report
+    # text_translator.HAN_LANGUAGE = 'zh'  # Read text in Han ideographs only as Chinese instead of Japanese
     ## live translation
     # screen_maker((0,100,0,100))
+
+    # # Live translation reading only the learned dialogue regions of this window
+    # from roi_learner import RegionOfInterestOCR
+    # screen_maker((0,100,0,100), RegionOfInterestOCR())
     
     # # Single Image Translation
     # img = Image.open('1.jpg')
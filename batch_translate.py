@@ -0,0 +1,252 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+import metrics
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp', '.gif', '.tif', '.tiff')
+
+
+def find_images(inputs: list, recursive: bool = True) -> list:
+    """
+    Expand directories and glob patterns into (path, relative name) pairs.
+
+    Args:
+        inputs (list): Directories, glob patterns or image paths.
+        recursive (bool): Walk sub-directories of directory inputs.
+
+    Returns:
+        list: Sorted (path, relative_stem) tuples; the stem keeps sub-directories so outputs do not collide.
+    """
+    pages = {}
+    for entry in inputs:
+        if os.path.isdir(entry):
+            pattern = os.path.join(entry, '**', '*') if recursive else os.path.join(entry, '*')
+            for path in glob.glob(pattern, recursive=recursive):
+                if path.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path):
+                    pages[os.path.abspath(path)] = os.path.splitext(os.path.relpath(path, entry))[0]
+        else:
+            for path in glob.glob(entry, recursive=True):
+                if path.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path):
+                    pages[os.path.abspath(path)] = os.path.splitext(os.path.basename(path))[0]
+    return sorted(pages.items(), key=lambda page: page[1])
+
+def _ocr_page(path: str, cache_path: str, languages: tuple, max_side: int = None) -> tuple:
+    """OCR one page in a worker and cache the raw results next to the outputs."""
+    import extract_image_text
+
+    with Image.open(path) as image:
+        results = extract_image_text.extract_japanese_text(image.convert('RGB'), languages, max_side)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False)
+    return path, results
+
+def page_chunks(pages: list, results_by_path: dict, max_chars: int = 20000) -> list:
+    """
+    Group pages so the text translated in one call stays within `max_chars` characters.
+
+    A page is never split, so a page larger than the budget forms a chunk of its own.
+
+    Returns:
+        list: Lists of pages, in order.
+    """
+    chunks, chunk, size = [], [], 0
+    for page in pages:
+        chars = sum(len(item['text']) for item in results_by_path[page['path']])
+        if chunk and size + chars > max_chars:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(page)
+        size += chars
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def translation_failed(results: list, failed: set) -> bool:
+    """
+    Check whether any box of a translated page came back empty or could not be translated.
+
+    Unchanged text alone is not a failure: names, loanwords and text already in the target
+    language legitimately come back as they are.
+
+    Args:
+        results (list): The page's translated results.
+        failed (set): Source texts the translator reported as failed.
+    """
+    for item in results:
+        original = item.get('original_text', item['text'])
+        if not original.strip():
+            continue
+        if not item['text'].strip() or original in failed:
+            return True
+    return False
+
+def _render_page(path: str, results: list, image_path: str, json_path: str) -> str:
+    """Overlay translated captions on one page in a worker and write the image and JSON."""
+    import overlay_caption_on_image
+
+    with Image.open(path) as image:
+        output = overlay_caption_on_image.overlay_images_with_coordinates(image.convert('RGB'), {'sentences': results}, inplace=True)
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+    output.save(image_path)
+
+    # Write the JSON last: its presence marks the page as finished for --resume
+    with open(json_path, 'w', encoding='utf-8') as file:
+        json.dump({'source': path, 'image': image_path, 'sentences': results}, file, ensure_ascii=False, indent=2)
+    return path
+
+def translate_directory(inputs: list, output_dir: str, workers: int = None, languages: tuple = ('ja',),
+                        target_language: str = 'en', use_google: bool = True, resume: bool = True,
+                        recursive: bool = True, image_format: str = 'png', merge_lines: bool = True,
+                        max_side: int = None, chunk_chars: int = 20000, han_language: str = None) -> dict:
+    """
+    Translate every image found in `inputs`, writing overlaid images and per-image JSON.
+
+    OCR runs across a process pool with one warm reader per worker. The text of the pages is
+    then translated in deduplicated batches of whole pages, and pages are rendered back in the
+    pool. Raw OCR results are cached under `output_dir/.ocr`, so an interrupted run redoes neither
+    finished pages nor pages that were already OCR'd. Pages whose translation failed are not
+    written, so the next run with `resume` translates them again.
+
+    Args:
+        inputs (list): Directories, glob patterns or image paths.
+        output_dir (str): Where the overlaid images and JSON files are written.
+        workers (int): Worker processes; defaults to the CPU count.
+        languages (tuple): OCR language codes.
+        target_language (str): The target language code.
+        use_google (bool): Allow the online backend when connected.
+        resume (bool): Skip pages whose JSON output already exists.
+        recursive (bool): Walk sub-directories of directory inputs.
+        image_format (str): Extension of the overlaid images.
+        merge_lines (bool): Merge OCR fragments into lines and paragraphs before translation.
+        max_side (int): Detect text on pages downscaled to this longest side and recognize it at full
+                        resolution; None reads pages in one pass.
+        chunk_chars (int): Characters of text translated per call, in whole pages.
+        han_language (str): Source language of ideograph-only text; None uses text_translator.HAN_LANGUAGE.
+
+    Returns:
+        dict: Page counts (including 'failed' pages left for a later run), seconds per phase and
+              pages per second.
+    """
+    import extract_image_text
+    import text_layout
+    import text_translator
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    pages = []
+    skipped = 0
+    for path, stem in find_images(inputs, recursive):
+        json_path = os.path.join(output_dir, stem + '.json')
+        if resume and os.path.exists(json_path):
+            skipped += 1
+            continue
+        pages.append({
+            'path': path,
+            'json_path': json_path,
+            'image_path': os.path.join(output_dir, f'{stem}.{image_format}'),
+            'cache_path': os.path.join(output_dir, '.ocr', stem + '.json'),
+        })
+    logger.info("%s page(s) to translate, %s already done.", len(pages), skipped)
+
+    results_by_path = {}
+    timings = {}
+    with ProcessPoolExecutor(workers, initializer=extract_image_text.init_worker, initargs=(tuple(languages), threads_per_worker)) as pool:
+        # OCR, reusing cached results from an interrupted run
+        phase_start = time.perf_counter()
+        futures = []
+        for page in pages:
+            if resume and os.path.exists(page['cache_path']):
+                with open(page['cache_path'], encoding='utf-8') as file:
+                    results_by_path[page['path']] = json.load(file)
+            else:
+                futures.append(pool.submit(_ocr_page, page['path'], page['cache_path'], tuple(languages), max_side))
+        for done, future in enumerate(as_completed(futures), 1):
+            path, results = future.result()
+            results_by_path[path] = results
+            logger.info("OCR %s/%s: %s box(es) in %s", done, len(futures), len(results), path)
+        if merge_lines:
+            for path, results in results_by_path.items():
+                results_by_path[path] = text_layout.merge_results(results)
+        timings['ocr_seconds'] = time.perf_counter() - phase_start
+
+        # Bounded batches of whole pages; translate_batch dedupes repeated lines within a batch and
+        # the translation memory across batches
+        phase_start = time.perf_counter()
+        all_items = [item for page in pages for item in results_by_path[page['path']]]
+        unique_texts = len({item['text'] for item in all_items})
+        chunks = page_chunks(pages, results_by_path, chunk_chars)
+        failed_texts = set()
+        for chunk in chunks:
+            text_translator.translate_results([item for page in chunk for item in results_by_path[page['path']]],
+                                              target_language, use_google, han_language, failed_texts)
+        timings['translate_seconds'] = time.perf_counter() - phase_start
+        logger.info("Translated %s box(es) (%s unique) in %s batch(es) in %.1fs.",
+                    len(all_items), unique_texts, len(chunks), timings['translate_seconds'])
+
+        failed = {page['path'] for page in pages if translation_failed(results_by_path[page['path']], failed_texts)}
+        for path in failed:
+            logger.warning("Translation failed for %s; it is not written and will be retried on resume.", path)
+        finished = [page for page in pages if page['path'] not in failed]
+
+        # Render and write outputs
+        phase_start = time.perf_counter()
+        futures = [pool.submit(_render_page, page['path'], results_by_path[page['path']], page['image_path'], page['json_path'])
+                   for page in finished]
+        for future in as_completed(futures):
+            future.result()
+        timings['render_seconds'] = time.perf_counter() - phase_start
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'pages': len(finished),
+        'skipped': skipped,
+        'failed': len(failed),
+        'boxes': len(all_items),
+        'unique_texts': unique_texts,
+        'seconds': elapsed,
+        'pages_per_second': len(finished) / elapsed if elapsed else 0.0,
+        **timings,
+    }
+    return summary
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Translate a directory (or glob) of images headlessly.')
+    parser.add_argument('inputs', nargs='+', help='Directories, glob patterns or image files.')
+    parser.add_argument('-o', '--output', default='translated', help='Output directory.')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+    parser.add_argument('--languages', default='ja', help='Comma-separated OCR language codes.')
+    parser.add_argument('--target', default='en', help='Target language code.')
+    parser.add_argument('--offline', action='store_true', help='Never use the online backend.')
+    parser.add_argument('--no-resume', action='store_true', help='Redo pages that already have output.')
+    parser.add_argument('--no-recursive', action='store_true', help='Do not walk sub-directories.')
+    parser.add_argument('--format', default='png', help='Extension of the overlaid images.')
+    parser.add_argument('--max-side', type=int, default=None, help='Detect text on pages downscaled to this longest side.')
+    parser.add_argument('--no-merge', action='store_true', help='Translate every OCR box on its own.')
+    parser.add_argument('--chunk-chars', type=int, default=20000, help='Characters of text translated per batch of pages.')
+    parser.add_argument('--han-language', default=None, help="Language of text in Han ideographs only (default: ja; use zh for Chinese).")
+    args = parser.parse_args(argv)
+
+    metrics.setup_logging()
+    summary = translate_directory(
+        args.inputs, args.output, workers=args.workers, languages=tuple(args.languages.split(',')),
+        target_language=args.target, use_google=not args.offline, resume=not args.no_resume,
+        recursive=not args.no_recursive, image_format=args.format, merge_lines=not args.no_merge,
+        max_side=args.max_side, chunk_chars=args.chunk_chars, han_language=args.han_language,
+    )
+    logger.info("Translated %s page(s) in %.1fs (%.2f pages/s, %s skipped, %s failed).", summary['pages'],
+                summary['seconds'], summary['pages_per_second'], summary['skipped'], summary['failed'])
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from PIL import Image, ImageDraw
+from caption_maker import load_font
+from caption_cache import caption_cache
+import overlay_caption_on_image
+import metrics
+from ocr_results import OCRResults
+from text_layout import box_iou
+
+# Short Japanese lines typical of game dialogue and UI labels
+SAMPLE_LINES = [
+    'こんにちは', 'ありがとうございます', '好きなだけ', 'はじめましょう', 'セーブしますか？',
+    '今日はいい天気ですね', 'どこへ行くの？', 'ちょっと待って！', 'アイテムを手に入れた', 'もう一度やり直す',
+    '本当にそれでいいの？', '次のステージへ', 'ゲームオーバー', '設定を変更しました', 'また明日会いましょう',
+]
+
+
+def parse_size(value: str) -> tuple:
+    """Parse a 'WIDTHxHEIGHT' string into a (width, height) tuple."""
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+def make_synthetic_frame(size: tuple, lines: int, font_path: str = 'NotoSansJP-Regular.ttf', seed: int = 0) -> tuple:
+    """
+    Render known Japanese lines at random sizes and positions on a plain background.
+
+    Args:
+        size (tuple): (width, height) of the frame.
+        lines (int): Number of text lines to place (text density).
+        font_path (str): Font able to render Japanese.
+        seed (int): Seed for positions, sizes and line choice.
+
+    Returns:
+        tuple: (image, ground_truth) where ground_truth is a list in the extract_japanese_text format.
+    """
+    rng = random.Random(seed)
+    width, height = size
+    image = Image.new('RGB', size, tuple(rng.randint(160, 255) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+
+    truth = []
+    for _ in range(lines):
+        text = rng.choice(SAMPLE_LINES)
+        font_size = rng.randint(max(12, height // 60), max(13, height // 12))
+        font = load_font(font_path, font_size)
+        x1, y1, x2, y2 = draw.textbbox((0, 0), text, font=font)
+        text_width, text_height = x2 - x1, y2 - y1
+        if text_width >= width or text_height >= height:
+            continue
+        x = rng.randint(0, width - text_width - 1)
+        y = rng.randint(0, height - text_height - 1)
+        draw.text((x - x1, y - y1), text, fill=(0, 0, 0), font=font)
+        truth.append({
+            'text': text,
+            'coordinates': {'x1': x, 'x2': x + text_width, 'y1': y, 'y2': y + text_height},
+            'confidence': 1.0,
+        })
+    return image, truth
+
+def percentiles(samples: list) -> dict:
+    """Return mean and p50/p90/p99/max of a list of seconds, in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000
+
+    return {
+        'mean_ms': sum(ordered) / len(ordered) * 1000,
+        'p50_ms': pick(0.50),
+        'p90_ms': pick(0.90),
+        'p99_ms': pick(0.99),
+        'max_ms': ordered[-1] * 1000,
+        'count': len(ordered),
+    }
+
+def recall(results: list, truth: list, iou_threshold: float = 0.5) -> tuple:
+    """
+    Count the ground-truth lines found by OCR.
+
+    Returns:
+        tuple: (lines whose box is matched with IoU >= iou_threshold, of those also read exactly).
+    """
+    found = exact = 0
+    for expected in truth:
+        best = max(results, key=lambda result: box_iou(result['coordinates'], expected['coordinates']), default=None)
+        if best is not None and box_iou(best['coordinates'], expected['coordinates']) >= iou_threshold:
+            found += 1
+            exact += best.get('original_text', best['text']) == expected['text']
+    return found, exact
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MiB (Linux reports KiB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024 * 1024)
+
+def git_revision() -> str:
+    """Return the current git commit, or '' outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+
+class StubOCR:
+    """OCR backend returning the ground truth of a synthetic frame after a simulated delay."""
+
+    def __init__(self, ms_per_megapixel: float = 0.0):
+        self.ms_per_megapixel = ms_per_megapixel
+
+    def __call__(self, image: Image.Image, truth: list) -> list:
+        if self.ms_per_megapixel:
+            time.sleep(image.width * image.height / 1e6 * self.ms_per_megapixel / 1000)
+        return [dict(item, coordinates=dict(item['coordinates'])) for item in truth]
+
+
+def frame_key(image: Image.Image) -> str:
+    """Name a frame by its pixels, so recorded OCR results are found again for the same synthetic frame."""
+    return f"{image.width}x{image.height}-{hashlib.sha1(image.tobytes()).hexdigest()[:16]}"
+
+
+class RealOCR:
+    """OCR backend using extract_image_text with the shared warm reader."""
+
+    def __init__(self, max_side: int = None, record_dir: str = None):
+        """
+        Args:
+            max_side (int): See extract_image_text.extract_japanese_text.
+            record_dir (str): Also save every frame's results there, for ReplayOCR.
+        """
+        import extract_image_text
+        self.extract = extract_image_text.extract_results
+        self.max_side = max_side
+        self.record_dir = record_dir
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+        extract_image_text.warm_up_reader(background=False)
+
+    def __call__(self, image: Image.Image, truth: list) -> list:
+        results = self.extract(image, max_side=self.max_side)
+        if self.record_dir:
+            with open(os.path.join(self.record_dir, frame_key(image) + '.ocr'), 'wb') as file:
+                file.write(results.to_bytes())
+        return results.to_dicts()
+
+
+class ReplayOCR:
+    """OCR backend returning results recorded by RealOCR, to rerun real OCR output without the OCR cost."""
+
+    def __init__(self, record_dir: str):
+        self.record_dir = record_dir
+
+    def __call__(self, image: Image.Image, truth: list) -> list:
+        path = os.path.join(self.record_dir, frame_key(image) + '.ocr')
+        try:
+            with open(path, 'rb') as file:
+                return OCRResults.from_bytes(file.read()).to_dicts()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No recorded OCR results for this frame in {self.record_dir}; "
+                                    f"record them with --ocr real --ocr-record {self.record_dir} and the same arguments.") from None
+
+
+class StubTranslator:
+    """Translation backend tagging each text instead of translating it, after a simulated delay."""
+
+    def __init__(self, ms_per_call: float = 0.0):
+        self.ms_per_call = ms_per_call
+
+    def __call__(self, results: list) -> list:
+        if self.ms_per_call and results:
+            time.sleep(self.ms_per_call / 1000)
+        for item in results:
+            item['original_text'] = item['text']
+            item['source_language'] = 'ja'
+            item['text'] = f"[en] {item['text']}"
+            item['language'] = 'en'
+        return results
+
+
+class RealTranslator:
+    """Translation backend using text_translator.translate_results."""
+
+    def __init__(self, use_google: bool = False):
+        import text_translator
+        self.translate_results = text_translator.translate_results
+        self.use_google = use_google
+
+    def __call__(self, results: list) -> list:
+        return self.translate_results(results, USE_GOOGLE=self.use_google)
+
+
+def run_benchmark(ocr, translator, sizes: list, densities: list, frames: int, seed: int = 0,
+                  clear_caches: bool = False, font_path: str = 'NotoSansJP-Regular.ttf') -> dict:
+    """
+    Run synthetic frames through OCR, translation and caption overlay, timing every stage.
+
+    Args:
+        ocr: Callable (image, ground_truth) -> results.
+        translator: Callable (results) -> results, translating in place.
+        sizes (list): Frame sizes as (width, height) tuples.
+        densities (list): Numbers of text lines per frame.
+        frames (int): Frames per (size, density) case.
+        seed (int): Base seed for the synthetic frames.
+        clear_caches (bool): Clear the caption cache before every frame to measure cold rendering.
+        font_path (str): Font used to draw the synthetic Japanese text.
+
+    Returns:
+        dict: Per-case and overall latency percentiles, throughput and peak RSS.
+    """
+    compositor = overlay_caption_on_image.Compositor(buffers=1)
+    cases = []
+    all_totals = []
+    wall_start = time.perf_counter()
+    for size in sizes:
+        for density in densities:
+            timings = {'ocr': [], 'translate': [], 'overlay': [], 'total': []}
+            boxes = 0
+            lines_total = lines_found = lines_exact = 0
+            case_start = time.perf_counter()
+            for index in range(frames):
+                image, truth = make_synthetic_frame(size, density, font_path, seed + index)
+                if clear_caches:
+                    caption_cache.clear()
+
+                start = time.perf_counter()
+                results = ocr(image, truth)
+                after_ocr = time.perf_counter()
+                translator(results)
+                after_translate = time.perf_counter()
+                overlay_caption_on_image.overlay_images_with_coordinates(image, {'sentences': results}, compositor=compositor)
+                end = time.perf_counter()
+
+                timings['ocr'].append(after_ocr - start)
+                timings['translate'].append(after_translate - after_ocr)
+                timings['overlay'].append(end - after_translate)
+                timings['total'].append(end - start)
+                boxes += len(results)
+                found, exact = recall(results, truth)
+                lines_total += len(truth)
+                lines_found += found
+                lines_exact += exact
+            case_seconds = time.perf_counter() - case_start
+
+            all_totals.extend(timings['total'])
+            cases.append({
+                'size': f'{size[0]}x{size[1]}',
+                'lines': density,
+                'frames': frames,
+                'boxes': boxes,
+                'recall': lines_found / lines_total if lines_total else 0.0,
+                'exact_recall': lines_exact / lines_total if lines_total else 0.0,
+                'frames_per_second': frames / sum(timings['total']) if sum(timings['total']) else 0.0,
+                'wall_seconds': case_seconds,
+                'stages': {name: percentiles(samples) for name, samples in timings.items()},
+            })
+
+    return {
+        'cases': cases,
+        'overall': {
+            'frames': len(all_totals),
+            'frames_per_second': len(all_totals) / sum(all_totals) if sum(all_totals) else 0.0,
+            'wall_seconds': time.perf_counter() - wall_start,
+            'total': percentiles(all_totals),
+            'peak_rss_mb': peak_rss_mb(),
+            'caption_cache': caption_cache.stats(),
+            'metrics': metrics.snapshot(),
+        },
+    }
+
+def compare_results(baseline: dict, current: dict) -> list:
+    """
+    Compare two benchmark result files case by case.
+
+    Returns:
+        list: Lines describing the change in p50 total latency and throughput per case.
+    """
+    previous = {(case['size'], case['lines']): case for case in baseline['cases']}
+    lines = []
+    for case in current['cases']:
+        key = (case['size'], case['lines'])
+        if key not in previous:
+            continue
+        old, new = previous[key], case
+        old_p50 = old['stages']['total'].get('p50_ms', 0.0)
+        new_p50 = new['stages']['total'].get('p50_ms', 0.0)
+        change = (new_p50 - old_p50) / old_p50 * 100 if old_p50 else 0.0
+        lines.append(f"{key[0]:>10} lines={key[1]:<3} p50 {old_p50:8.1f} -> {new_p50:8.1f} ms ({change:+.1f}%)  "
+                     f"fps {old['frames_per_second']:.2f} -> {new['frames_per_second']:.2f}  "
+                     f"recall {old.get('recall', 0.0):.2f} -> {new.get('recall', 0.0):.2f}")
+    return lines
+
+def print_report(results: dict):
+    """Print a human-readable summary of a benchmark run."""
+    for case in results['cases']:
+        stages = case['stages']
+        print(f"{case['size']:>10} lines={case['lines']:<3} boxes={case['boxes']:<4} fps={case['frames_per_second']:7.2f}  "
+              f"recall={case['recall']:.2f}/{case['exact_recall']:.2f}  "
+              + '  '.join(f"{name} p50={stages[name].get('p50_ms', 0.0):.1f}/p99={stages[name].get('p99_ms', 0.0):.1f}ms"
+                          for name in ('ocr', 'translate', 'overlay', 'total')))
+    overall = results['overall']
+    spans = overall['metrics']['spans']
+    if 'ocr.prepare' in spans:
+        # Two-pass OCR: frame resizing and grayscale conversion run outside the reader lock
+        print(f"OCR under the reader lock p50={spans['ocr']['p50_ms']:.1f}ms, "
+              f"frame preparation outside it p50={spans['ocr.prepare']['p50_ms']:.1f}ms")
+    print(f"Overall: {overall['frames']} frames, {overall['frames_per_second']:.2f} frames/s, peak RSS {overall['peak_rss_mb']:.1f} MiB")
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Benchmark the OCR -> translate -> overlay pipeline on synthetic screenshots.')
+    parser.add_argument('--sizes', default='640x360,1280x720,1920x1080', help='Comma-separated frame sizes, e.g. 1280x720,3840x2160.')
+    parser.add_argument('--lines', default='2,8,24', help='Comma-separated numbers of text lines per frame.')
+    parser.add_argument('--frames', type=int, default=10, help='Frames per size/density case.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ocr', choices=('stub', 'real', 'replay'), default='stub',
+                        help='OCR backend; replay reads results saved by a real run with --ocr-record.')
+    parser.add_argument('--translator', choices=('stub', 'real'), default='stub', help='Translation backend (real runs offline MarianMT).')
+    parser.add_argument('--ocr-max-side', type=int, default=None,
+                        help='Real OCR only: detect on frames downscaled to this longest side, recognize at full resolution.')
+    parser.add_argument('--ocr-record', metavar='DIR', help='Real OCR: save each frame\'s results to DIR. Replay: read them from DIR.')
+    parser.add_argument('--stub-ocr-ms-per-mp', type=float, default=0.0, help='Simulated stub OCR cost per megapixel.')
+    parser.add_argument('--stub-translate-ms', type=float, default=0.0, help='Simulated stub translation cost per frame.')
+    parser.add_argument('--clear-caches', action='store_true', help='Clear the caption cache before every frame.')
+    parser.add_argument('--font', default='NotoSansJP-Regular.ttf', help='Font used to draw the synthetic text.')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to write the JSON results.')
+    parser.add_argument('--compare', help='Earlier JSON results to compare against.')
+    args = parser.parse_args(argv)
+
+    if args.ocr == 'real':
+        ocr = RealOCR(args.ocr_max_side, args.ocr_record)
+    elif args.ocr == 'replay':
+        if not args.ocr_record:
+            parser.error('--ocr replay needs --ocr-record DIR')
+        ocr = ReplayOCR(args.ocr_record)
+    else:
+        ocr = StubOCR(args.stub_ocr_ms_per_mp)
+    translator = RealTranslator() if args.translator == 'real' else StubTranslator(args.stub_translate_ms)
+
+    results = run_benchmark(
+        ocr, translator,
+        sizes=[parse_size(size) for size in args.sizes.split(',')],
+        densities=[int(lines) for lines in args.lines.split(',')],
+        frames=args.frames, seed=args.seed, clear_caches=args.clear_caches, font_path=args.font,
+    )
+    results['meta'] = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'args': vars(args),
+    }
+
+    print_report(results)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        print(f"Compared with {args.compare} ({baseline.get('meta', {}).get('revision', 'unknown revision')}):")
+        for line in compare_results(baseline, results):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
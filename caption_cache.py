@@ -0,0 +1,160 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+from caption_maker import create_captioned_image, select_font_path
+import metrics
+
+
+class CaptionCache:
+    """
+    Memory-bounded LRU cache of finished caption tiles.
+
+    Tiles are keyed by the translated text, the final pixel size and every style option that
+    changes the rendered pixels. The budget is the total size of the cached RGBA buffers in
+    bytes; the least recently used tiles are dropped once it is exceeded.
+
+    Cached tiles are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_bytes (int): Total bytes of pixel data kept in the cache.
+        """
+        self.max_bytes = max_bytes
+        self._tiles = OrderedDict()  # key -> [image, nbytes, {channels: blend planes}]
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def tile_bytes(image: Image.Image) -> int:
+        """Return the size of a tile's pixel buffer in bytes."""
+        return image.width * image.height * len(image.getbands())
+
+    def get_caption(self, text: str, box_size: tuple, font_path: str = None, text_color='red',
+                    background_rgb: tuple = (255, 255, 255), background_opacity: int = 200, language: str = None) -> Image.Image:
+        """
+        Return the caption tile for a text and box, rendering it only on a miss.
+
+        Args:
+            text (str): The translated text to display.
+            box_size (tuple): Final (width, height) of the tile in pixels.
+            font_path (str): Font override; None selects the font from the text's language.
+            text_color: Pillow color of the text.
+            background_rgb (tuple): RGB color of the background.
+            background_opacity (int): Opacity of the background color (0-255).
+            language (str): Language of the text if known; selects the font without detecting it again.
+
+        Returns:
+            Image: An RGBA tile of exactly `box_size`.
+        """
+        key = self._key(text, box_size, font_path, text_color, background_rgb, background_opacity, language)
+        box_size = key[1]
+        font_path = key[2]
+
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                metrics.increment('caption_cache.hit')
+                return entry[0]
+            self.misses += 1
+        metrics.increment('caption_cache.miss')
+
+        # Render outside the lock so other threads can keep hitting the cache
+        with metrics.span('render'):
+            image = create_captioned_image(text, box_size=box_size, font_path=font_path, text_color=text_color,
+                                           background_rgb=background_rgb, background_opacity=background_opacity)
+        self.put(key, image)
+        return image
+
+    def get_caption_planes(self, text: str, box_size: tuple, channels: int = 3, font_path: str = None, text_color='red',
+                           background_rgb: tuple = (255, 255, 255), background_opacity: int = 200, language: str = None) -> tuple:
+        """
+        Return the caption tile premultiplied for alpha blending into a frame with `channels` channels.
+
+        The planes are computed once and kept with the tile, so compositing a cached caption costs
+        only the blend itself. Other arguments are the same as get_caption.
+
+        Returns:
+            tuple: (color, inverse_alpha) uint16 arrays, see overlay_caption_on_image.premultiply.
+        """
+        from overlay_caption_on_image import premultiply
+
+        image = self.get_caption(text, box_size, font_path, text_color, background_rgb, background_opacity, language)
+        key = self._key(text, box_size, font_path, text_color, background_rgb, background_opacity, language)
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None and entry[0] is image and channels in entry[2]:
+                return entry[2][channels]
+
+        planes = premultiply(np.asarray(image if image.mode == 'RGBA' else image.convert('RGBA')), channels)
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None and entry[0] is image and channels not in entry[2]:
+                nbytes = planes[0].nbytes + planes[1].nbytes
+                entry[2][channels] = planes
+                entry[1] += nbytes
+                self._bytes += nbytes
+                self._evict()
+        return planes
+
+    @staticmethod
+    def _key(text: str, box_size: tuple, font_path: str, text_color, background_rgb: tuple, background_opacity: int, language: str) -> tuple:
+        """Build the cache key, resolving the font from the language when one is given."""
+        box_size = (max(1, int(box_size[0])), max(1, int(box_size[1])))
+        if font_path is None and language is not None:
+            font_path = select_font_path(language)
+        return (text, box_size, font_path, text_color, tuple(background_rgb), background_opacity)
+
+    def _evict(self):
+        """Drop least recently used tiles until the budget is respected. Caller holds the lock."""
+        while self._bytes > self.max_bytes and self._tiles:
+            _, (_, evicted_bytes, _) = self._tiles.popitem(last=False)
+            self._bytes -= evicted_bytes
+            self.evictions += 1
+
+    def put(self, key: tuple, image: Image.Image):
+        """Store a tile under a key, evicting least recently used tiles to stay within budget."""
+        nbytes = self.tile_bytes(image)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._tiles.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._tiles[key] = [image, nbytes, {}]
+            self._bytes += nbytes
+            self._evict()
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and the memory in use."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._tiles),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self):
+        """Drop every cached tile and reset the counters."""
+        with self._lock:
+            self._tiles.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+
+# Shared by every caller in the process
+caption_cache = CaptionCache()
@@ -1,46 +1,201 @@
 from PIL import Image, ImageDraw, ImageFont
-import os
-from text_translator import detect_language  # Ensure this import is correct
+import logging
+from functools import lru_cache
+from language_detector import detect_language
 
-def create_captioned_image(text: str, font_size: int = 360, top_margin_pct: float = 0.1, bottom_margin_pct: float = 0.3, left_margin_pct: float = 0.1, right_margin_pct: float = 0.1, background_opacity: int = 200) -> Image.Image:
+logger = logging.getLogger(__name__)
+
+# Smallest font size the fitting search will go down to
+MIN_FONT_SIZE = 6
+
+
+@lru_cache(maxsize=256)
+def load_font(font_path: str, font_size: int) -> ImageFont.ImageFont:
+    """
+    Load a TrueType font once per (path, size) and reuse it afterwards.
+
+    Parameters:
+        font_path (str): Path or name of the TrueType font.
+        font_size (int): Font size in pixels.
+
+    Returns:
+        ImageFont: The loaded font, or Pillow's default font at that size if the file is missing.
+    """
+    try:
+        return ImageFont.truetype(font_path, font_size)
+    except IOError:
+        logger.warning("TTF font %s not found, using default font.", font_path)
+        return ImageFont.load_default(font_size)
+
+def select_font_path(language: str) -> str:
+    """Return the font file used for captions in the given language."""
+    if language == 'ja':  # If Japanese is detected
+        return 'NotoSansJP-Regular.ttf'  # Replace with your Japanese font path
+    return 'arial.ttf'  # Replace with your standard font path
+
+def wrap_text(text: str, font: ImageFont.ImageFont, max_width: int) -> list:
+    """
+    Greedily wrap text into lines no wider than `max_width`.
+
+    Text with spaces is wrapped between words; text without spaces (e.g. Japanese) is
+    wrapped between characters. A single word wider than `max_width` stays on its own line.
+
+    Parameters:
+        text (str): The text to wrap.
+        font (ImageFont): The font used to measure the text.
+        max_width (int): Available width in pixels.
+
+    Returns:
+        list: The wrapped lines.
+    """
+    separator = ' ' if ' ' in text.strip() else ''
+    tokens = text.split() if separator else list(text)
+
+    lines = []
+    current = ''
+    for token in tokens:
+        candidate = current + separator + token if current else token
+        if current and font.getlength(candidate) > max_width:
+            lines.append(current)
+            current = token
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+def fit_text_to_box(text: str, font_path: str, box_width: int, box_height: int, top_margin_pct: float = 0.1, bottom_margin_pct: float = 0.3, left_margin_pct: float = 0.1, right_margin_pct: float = 0.1, line_spacing_pct: float = 0.1) -> tuple:
+    """
+    Find the largest font size at which the wrapped text fits inside a box.
+
+    Parameters:
+        text (str): The text to fit.
+        font_path (str): Path or name of the TrueType font.
+        box_width (int): Box width in pixels.
+        box_height (int): Box height in pixels.
+        top_margin_pct, bottom_margin_pct, left_margin_pct, right_margin_pct (float): Margins as a fraction of the font size.
+        line_spacing_pct (float): Gap between lines as a fraction of the font size.
+
+    Returns:
+        tuple: (font, lines, line_height) for the chosen size.
+    """
+    def layout(size):
+        font = load_font(font_path, size)
+        inner_width = box_width - int(size * (left_margin_pct + right_margin_pct))
+        inner_height = box_height - int(size * (top_margin_pct + bottom_margin_pct))
+        bbox = font.getbbox('Hg国')
+        line_height = bbox[3] - bbox[1]
+        if inner_width <= 0 or inner_height <= 0:
+            return font, [text], line_height, False
+
+        lines = wrap_text(text, font, inner_width)
+        block_height = line_height * len(lines) + int(size * line_spacing_pct) * (len(lines) - 1)
+        fits = block_height <= inner_height and all(font.getlength(line) <= inner_width for line in lines)
+        return font, lines, line_height, fits
+
+    # Binary search over font sizes; larger sizes never fit where a smaller one does not
+    low, high = MIN_FONT_SIZE, max(MIN_FONT_SIZE, box_height)
+    best = None
+    while low <= high:
+        size = (low + high) // 2
+        font, lines, line_height, fits = layout(size)
+        if fits:
+            best = (font, lines, line_height)
+            low = size + 1
+        else:
+            high = size - 1
+
+    if best is None:
+        font, lines, line_height, _ = layout(MIN_FONT_SIZE)
+        best = (font, lines, line_height)
+    return best
+
+def render_caption_in_box(text: str, box_size: tuple, font_path: str, top_margin_pct: float = 0.1, bottom_margin_pct: float = 0.3, left_margin_pct: float = 0.1, right_margin_pct: float = 0.1, background_opacity: int = 200, line_spacing_pct: float = 0.1, text_color='red', background_rgb: tuple = (255, 255, 255)) -> Image.Image:
+    """
+    Render a caption directly at the size of its target box.
+
+    Parameters:
+        text (str): The text to be displayed on the image.
+        box_size (tuple): (width, height) of the final caption in pixels.
+        font_path (str): Path or name of the TrueType font.
+        top_margin_pct, bottom_margin_pct, left_margin_pct, right_margin_pct (float): Margins as a fraction of the font size.
+        background_opacity (int): Opacity of the background color (0-255).
+        line_spacing_pct (float): Gap between lines as a fraction of the font size.
+        text_color: Pillow color of the text.
+        background_rgb (tuple): RGB color of the background.
+
+    Returns:
+        Image: A Pillow RGBA image of exactly `box_size`.
+    """
+    width, height = max(1, int(box_size[0])), max(1, int(box_size[1]))
+    font, lines, line_height = fit_text_to_box(text, font_path, width, height, top_margin_pct, bottom_margin_pct, left_margin_pct, right_margin_pct, line_spacing_pct)
+    font_size = getattr(font, 'size', MIN_FONT_SIZE)
+
+    # Background with specified opacity covering the whole box
+    image = Image.new('RGBA', (width, height), (*background_rgb, background_opacity))
+    draw = ImageDraw.Draw(image)
+
+    # Centre the text block vertically inside the margins
+    top_margin = int(font_size * top_margin_pct)
+    bottom_margin = int(font_size * bottom_margin_pct)
+    line_gap = int(font_size * line_spacing_pct)
+    block_height = line_height * len(lines) + line_gap * (len(lines) - 1)
+    y = top_margin + max(0, (height - top_margin - bottom_margin - block_height) // 2)
+    x = int(font_size * left_margin_pct)
+
+    # getbbox offsets the glyphs from the anchor, so shift each line to start at its top
+    y_offset = font.getbbox('Hg国')[1]
+    for line in lines:
+        draw.text((x, y - y_offset), line, fill=text_color, font=font)
+        y += line_height + line_gap
+
+    logger.debug("Captioned image rendered at %sx%s with font size %s over %s line(s).", width, height, font_size, len(lines))
+    return image
+
+def create_captioned_image(text: str, font_size: int = 360, top_margin_pct: float = 0.1, bottom_margin_pct: float = 0.3, left_margin_pct: float = 0.1, right_margin_pct: float = 0.1, background_opacity: int = 200, box_size: tuple = None, font_path: str = None, text_color='red', background_rgb: tuple = (255, 255, 255), language: str = None) -> Image.Image:
     """
     Create an image with a caption.
 
+    When `box_size` is given the font size is chosen so the (wrapped) text fits the box
+    and the caption is rendered directly at that size, so it can be pasted without resizing.
+    Otherwise the caption is rendered at `font_size` and sized to the text.
+
     Parameters:
         text (str): The text to be displayed on the image.
-        font_size (int): The size of the font for the text. Default is 360.
+        font_size (int): The size of the font for the text when no box size is given. Default is 360.
         top_margin_pct (float): Percentage of font size for the top margin. Default is 0.1.
         bottom_margin_pct (float): Percentage of font size for the bottom margin. Default is 0.3.
         left_margin_pct (float): Percentage of font size for the left margin. Default is 0.1.
         right_margin_pct (float): Percentage of font size for the right margin. Default is 0.1.
         background_opacity (int): Opacity of the background color (0-255). Default is 200.
+        box_size (tuple): Target (width, height) in pixels. Default is None.
+        font_path (str): Font to use instead of the one chosen from the detected language. Default is None.
+        text_color: Pillow color of the text. Default is 'red'.
+        background_rgb (tuple): RGB color of the background. Default is white.
+        language (str): Language of the text if already known, to skip detection. Default is None.
 
     Returns:
         Image: A Pillow Image object with the caption.
     """
-    print("Running create_captioned_image from caption_maker")
-    # Detect language of the input text
-    language = detect_language(text)
+    logger.debug("Running create_captioned_image from caption_maker")
+    if font_path is None:
+        # Detect language of the input text unless the caller already knows it
+        if language is None:
+            language = detect_language(text)
+
+        logger.debug('%s (Detected language: %s)', text, language)
+        font_path = select_font_path(language)
 
-    print('%s(Detected language: %s)',text, language)
+    if box_size is not None:
+        return render_caption_in_box(text, box_size, font_path, top_margin_pct, bottom_margin_pct, left_margin_pct, right_margin_pct, background_opacity, text_color=text_color, background_rgb=background_rgb)
 
     # Create a temporary white background image
     temp_image = Image.new('RGBA', (400, 200), (255, 255, 255, 255))  # Initial size with white background
     draw = ImageDraw.Draw(temp_image)
 
-    # Load a TrueType font with the specified size
-    try:
-        if language == 'ja':  # If Japanese is detected
-            font_path = 'NotoSansJP-Regular.ttf'  # Replace with your Japanese font path
-        else:
-            font_path = 'arial.ttf'  # Replace with your standard font path
-            
-        font = ImageFont.truetype(font_path, font_size)
-        print('Loaded font: %s at size: %d', font_path, font_size)
-    except IOError:
-        with open('caption_maker.log','a') as file:
-            file.write("TTF font not found, using default font.")
-        font = ImageFont.load_default()
+    # Load a TrueType font with the specified size (cached per path and size)
+    font = load_font(font_path, font_size)
+    logger.debug('Loaded font: %s at size: %d', font_path, font_size)
 
     # Calculate the bounding box of the text
     bbox = draw.textbbox((0, 0), text, font=font)
@@ -62,7 +217,7 @@ def create_captioned_image(text: str, font_size: int = 360, top_margin_pct: floa
     draw = ImageDraw.Draw(image)
 
     # Draw a semi-transparent background rectangle behind the text
-    background_color = (255, 255, 255, background_opacity)  # White background with specified opacity
+    background_color = (*background_rgb, background_opacity)  # Background with specified opacity
     draw.rectangle(
         [0, 0, final_width, final_height],
         fill=background_color
@@ -70,9 +225,9 @@ def create_captioned_image(text: str, font_size: int = 360, top_margin_pct: floa
 
     # Calculate position to draw the text considering the margins
     position = (left_margin, top_margin)  # Offset by respective margins
-    draw.text(position, text, fill='red', font=font)
+    draw.text(position, text, fill=text_color, font=font)
 
-    print('Captioned image created successfully with dimensions: %dx%d and text: %s', final_width, final_height,text)
+    logger.debug('Captioned image created successfully with dimensions: %dx%d and text: %s', final_width, final_height, text)
     return image
 
 if __name__ == '__main__':
@@ -81,4 +236,6 @@ if __name__ == '__main__':
     # Example usage
     captioned_image = create_captioned_image('I Like FUTIMON')  # Example Japanese text
     captioned_image.show()  # To display the image
+    fitted_image = create_captioned_image('I Like FUTIMON', box_size=(200, 60))  # Rendered to fit a 200x60 box
+    fitted_image.show()
     # captioned_image.save('captioned_image.png')  # To save the image
@@ -0,0 +1,159 @@
+import logging
+import socket
+import threading
+import time
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectivityMonitor:
+    """
+    Cached internet connectivity check with circuit-breaker semantics.
+
+    A probe result is reused for `ttl` seconds. Once it expires the last known state is
+    returned while a background thread re-probes. After `failure_threshold` consecutive
+    failures (failed probes or failures reported by the online backend) the breaker opens
+    and the monitor reports offline, without probing, until `cooldown` seconds have passed.
+    """
+
+    def __init__(self, host: str = 'www.google.com', port: int = 80, timeout: float = 2.0,
+                 ttl: float = 30.0, failure_threshold: int = 1, cooldown: float = 60.0):
+        """
+        Args:
+            host (str): Host to open a TCP connection to.
+            port (int): Port to connect to.
+            timeout (float): Timeout in seconds for one probe.
+            ttl (float): Seconds a probe result is trusted.
+            failure_threshold (int): Consecutive failures that open the breaker.
+            cooldown (float): Seconds the breaker stays open before the next probe.
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.ttl = ttl
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._online = None
+        self._checked_at = 0.0
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_thread = None
+
+    def configure(self, host: str = None, port: int = None, **settings):
+        """
+        Change the probe target or any timing setting and forget the cached state.
+
+        Args:
+            host (str): New host to probe.
+            port (int): New port to probe.
+            **settings: Any of timeout, ttl, failure_threshold, cooldown.
+        """
+        with self._lock:
+            if host is not None:
+                self.host = host
+            if port is not None:
+                self.port = port
+            for name, value in settings.items():
+                if name not in ('timeout', 'ttl', 'failure_threshold', 'cooldown'):
+                    raise ValueError(f"Unknown connectivity setting: {name}")
+                setattr(self, name, value)
+        self.reset()
+
+    def probe(self) -> bool:
+        """
+        Open (and close) one TCP connection to the probe target and record the outcome.
+
+        Returns:
+            bool: True if the connection succeeded.
+        """
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self.timeout):
+                pass
+            online = True
+        except OSError:
+            online = False
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if online:
+                self._online = True
+                self._failures = 0
+                self._open_until = 0.0
+            else:
+                self._record_failure_locked()
+        return online
+
+    def is_online(self) -> bool:
+        """
+        Return the cached connectivity state, probing only when needed.
+
+        Returns:
+            bool: True if the online backend should be used.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._open_until:
+                return False
+            if self._online is not None and now - self._checked_at < self.ttl and self._failures < self.failure_threshold:
+                return self._online
+            first_check = self._online is None or self._open_until > 0.0
+
+            if not first_check:
+                # Serve the stale state and refresh it in the background
+                if self._probe_thread is None or not self._probe_thread.is_alive():
+                    self._probe_thread = threading.Thread(target=self.probe, name='connectivity-probe', daemon=True)
+                    self._probe_thread.start()
+                return self._online
+
+        # No usable state yet (or the cooldown just ended): the caller has to wait for one probe
+        return self.probe()
+
+    def record_failure(self):
+        """Count a failure reported by the online backend, e.g. a request that errored."""
+        with self._lock:
+            self._record_failure_locked()
+
+    def record_success(self):
+        """Count a successful online request, closing the breaker."""
+        with self._lock:
+            self._online = True
+            self._checked_at = time.monotonic()
+            self._failures = 0
+            self._open_until = 0.0
+
+    def _record_failure_locked(self):
+        """Update failure state. Caller holds the lock."""
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._online = False
+            self._open_until = time.monotonic() + self.cooldown
+            metrics.increment('connectivity.breaker_open')
+            logger.warning("Connectivity breaker open for %gs after %s failure(s).", self.cooldown, self._failures)
+
+    def reset(self):
+        """Forget the cached state and close the breaker."""
+        with self._lock:
+            self._online = None
+            self._checked_at = 0.0
+            self._failures = 0
+            self._open_until = 0.0
+
+    def state(self) -> dict:
+        """Return a snapshot of the monitor state for logging."""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'online': self._online,
+                'age_seconds': now - self._checked_at if self._checked_at else None,
+                'failures': self._failures,
+                'breaker_open': now < self._open_until,
+                'cooldown_remaining': max(0.0, self._open_until - now),
+                'target': f'{self.host}:{self.port}',
+            }
+
+
+# Shared by every caller in the process
+monitor = ConnectivityMonitor()
@@ -1,54 +1,296 @@
-import easyocr
 from PIL import Image
 import numpy as np
-import cv2  # Optional: For displaying images if needed
-import os
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+import metrics
+from ocr_results import OCRResults
 
+if TYPE_CHECKING:
+    # Annotations only; the real import is deferred to get_reader
+    import easyocr
 
-def extract_japanese_text(image: Image.Image) -> list:
+logger = logging.getLogger(__name__)
+
+
+# Readers are expensive to build (detector + recognizer weights), so keep one per language set
+_readers = {}
+_reader_locks = {}
+_reader_stats = {}
+_registry_lock = threading.Lock()
+
+
+def get_reader(languages: tuple = ('ja',)) -> 'easyocr.Reader':
+    """
+    Return the shared EasyOCR reader for a language set, loading it on first use.
+
+    Args:
+        languages (tuple): Language codes understood by EasyOCR, e.g. ('ja',) or ('ja', 'en').
+
+    Returns:
+        easyocr.Reader: A reader that is reused by every later call with the same languages.
+    """
+    key = tuple(languages)
+    reader = _readers.get(key)
+    if reader is not None:
+        return reader
+
+    with _registry_lock:
+        # Another thread may have finished loading while we waited for the lock
+        reader = _readers.get(key)
+        if reader is None:
+            # Imported here: torch and EasyOCR take seconds to import, so startup does not pay for them
+            import easyocr
+
+            start = time.perf_counter()
+            reader = easyocr.Reader(list(key))
+            load_seconds = time.perf_counter() - start
+
+            _reader_locks[key] = threading.Lock()
+            _reader_stats[key] = {'load_seconds': load_seconds, 'calls': 0, 'inference_seconds': 0.0}
+            _readers[key] = reader
+            metrics.record('ocr_reader_load', load_seconds)
+            logger.info("Loaded EasyOCR reader for %s in %.2fs.", list(key), load_seconds)
+    return reader
+
+def warm_up_reader(languages: tuple = ('ja',), background: bool = True):
+    """
+    Load the reader for a language set ahead of the first frame.
+
+    Args:
+        languages (tuple): Language codes to load.
+        background (bool): Load on a daemon thread and return immediately if True.
+
+    Returns:
+        threading.Thread | None: The loading thread when running in the background, otherwise None.
+    """
+    if not background:
+        get_reader(languages)
+        return None
+
+    thread = threading.Thread(target=get_reader, args=(tuple(languages),), name='ocr-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def init_worker(languages: tuple = ('ja',), threads_per_worker: int = None):
+    """
+    Prepare an OCR worker process: give it a share of the CPU threads and one warm reader.
+
+    Meant as the `initializer` of a process pool, so every task of the worker reuses the reader.
+
+    Args:
+        languages (tuple): Language codes of the reader to load.
+        threads_per_worker (int): Torch threads for this process; None keeps torch's default.
+    """
+    if threads_per_worker is not None:
+        try:
+            import torch
+            torch.set_num_threads(threads_per_worker)
+        except ImportError:
+            pass
+    warm_up_reader(languages, background=False)
+
+def get_reader_stats() -> dict:
+    """
+    Report load time and accumulated inference time for every loaded reader.
+
+    Returns:
+        dict: Maps each language tuple to its 'load_seconds', 'calls', 'inference_seconds'
+              and 'mean_inference_seconds'.
+    """
+    with _registry_lock:
+        stats = {key: dict(value) for key, value in _reader_stats.items()}
+    for value in stats.values():
+        value['mean_inference_seconds'] = value['inference_seconds'] / value['calls'] if value['calls'] else 0.0
+    return stats
+
+
+def extract_japanese_text(image: Image.Image, languages: tuple = ('ja',), max_side: int = None) -> list:
     """
     Extract Japanese text from a given Pillow image.
 
     Args:
-        image (Image.Image): The image from which to extract text.
+        image (Image.Image): The image from which to extract text, or an RGB (or grayscale) uint8
+                             array, which is read without a copy (e.g. a view into shared memory).
+        languages (tuple): Language codes for the shared reader. Default is ('ja',).
+        max_side (int): Run text detection on a copy downscaled to this longest side, then
+                        recognize the detected boxes at full resolution. None (the default) or
+                        a size at least as large as the image reads it in one pass.
 
     Returns:
         list: A list of dictionaries containing detected text,
               coordinates (x1, x2, y1, y2), and confidence.
     """
-    # Convert the Pillow image to a NumPy array
-    image_np = np.array(image)
+    return extract_results(image, languages, max_side).to_dicts()
+
+def extract_results(image, languages: tuple = ('ja',), max_side: int = None) -> OCRResults:
+    """
+    extract_japanese_text returning an OCRResults instead of a list of dicts.
 
-    # Create a reader for Japanese
-    reader = easyocr.Reader(['ja'])  # You can specify multiple languages here, e.g., ['ja', 'en']
+    Arguments are the same as extract_japanese_text.
+    """
+    image_np = _as_array(image)
+    height, width = image_np.shape[:2]
+    scale = max_side / max(height, width) if max_side else 1.0
+
+    if scale < 1.0:
+        # Resize and convert before taking the reader lock, so another frame's inference can overlap them
+        with metrics.span('ocr.prepare'):
+            small, grey = _two_pass_inputs(image_np, scale)
+        results, inference_seconds = _run(languages, lambda reader: _read_two_pass(reader, small, grey, scale))
+    else:
+        results, inference_seconds = _run(languages, lambda reader: reader.readtext(image_np))
+    extracted = OCRResults.from_easyocr(results)
+
+    logger.info("Extracted %s text items from the image in %.2fs.", len(extracted), inference_seconds)
+    return extracted
 
-    # Read the text from the image
-    results = reader.readtext(image_np)
+def _as_array(image) -> np.ndarray:
+    """Return a Pillow image as an RGB (or grayscale) array; arrays are returned as they are."""
+    if isinstance(image, np.ndarray):
+        return image
+    return np.asarray(image.convert('RGB') if image.mode not in ('RGB', 'L') else image)
+
+def _run(languages: tuple, inference) -> tuple:
+    """
+    Run `inference(reader)` on the shared reader for a language set, timed and counted.
 
-    # Collecting extracted text and coordinates in x1, x2, y1, y2 format
+    Returns:
+        tuple: (the inference's return value, seconds it took).
+    """
+    # Reuse the warm reader instead of loading the models for every frame
+    key = tuple(languages)
+    reader = get_reader(key)
+
+    # One inference at a time per reader since the hotkey thread can overlap
+    with _reader_locks[key]:
+        start = time.perf_counter()
+        results = inference(reader)
+        inference_seconds = time.perf_counter() - start
+
+    with _registry_lock:
+        _reader_stats[key]['calls'] += 1
+        _reader_stats[key]['inference_seconds'] += inference_seconds
+    metrics.record('ocr', inference_seconds)
+    return results, inference_seconds
+
+def detect_text_boxes(image, languages: tuple = ('ja',)) -> list:
+    """
+    Run only the text detector, so boxes can be recognized later in any order or grouping.
+
+    Args:
+        image: Pillow image or RGB (or grayscale) uint8 array.
+        languages (tuple): Language codes for the shared reader.
+
+    Returns:
+        list: Boxes as dicts with 'coordinates' (x1, x2, y1, y2) and 'polygon', the four corner
+              points of a rotated box or None for an axis-aligned one.
+    """
+    image_np = _as_array(image)
+    (horizontal_list, free_list), seconds = _run(languages, lambda reader: reader.detect(image_np))
+    boxes = [{'coordinates': {'x1': int(x1), 'x2': int(x2), 'y1': int(y1), 'y2': int(y2)}, 'polygon': None}
+             for x1, x2, y1, y2 in horizontal_list[0]]
+    for polygon in free_list[0]:
+        xs = [point[0] for point in polygon]
+        ys = [point[1] for point in polygon]
+        boxes.append({'coordinates': {'x1': int(min(xs)), 'x2': int(max(xs)), 'y1': int(min(ys)), 'y2': int(max(ys))},
+                      'polygon': [[int(x), int(y)] for x, y in polygon]})
+    logger.debug("Detected %s text boxes in %.2fs.", len(boxes), seconds)
+    return boxes
+
+def recognize_boxes(image, boxes: list, languages: tuple = ('ja',), grey: np.ndarray = None) -> list:
+    """
+    Read the text of boxes found by detect_text_boxes.
+
+    Args:
+        image: Pillow image or RGB (or grayscale) uint8 array the boxes were detected on.
+        boxes (list): Boxes from detect_text_boxes.
+        languages (tuple): Language codes for the shared reader.
+        grey (np.ndarray): The image already converted to grayscale, to skip converting it again
+                           when recognizing several groups of boxes of one frame.
+
+    Returns:
+        list: Results in the extract_japanese_text format.
+    """
+    if not boxes:
+        return []
+    if grey is None:
+        grey = to_grey(image)
+    horizontal_list = [[box['coordinates'][name] for name in ('x1', 'x2', 'y1', 'y2')] for box in boxes if box['polygon'] is None]
+    free_list = [box['polygon'] for box in boxes if box['polygon'] is not None]
+    results, _ = _run(languages, lambda reader: reader.recognize(grey, horizontal_list, free_list))
+    return OCRResults.from_easyocr(results).to_dicts()
+
+def to_grey(image) -> np.ndarray:
+    """Return the grayscale array EasyOCR's recognizer crops boxes from."""
+    import cv2
+
+    image_np = _as_array(image)
+    return image_np if image_np.ndim == 2 else cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
+
+def _two_pass_inputs(image_np: np.ndarray, scale: float) -> tuple:
+    """Return the (downscaled detection frame, full-resolution grayscale frame) of _read_two_pass."""
+    import cv2
+
+    height, width = image_np.shape[:2]
+    small = cv2.resize(image_np, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    return small, to_grey(image_np)
+
+def _read_two_pass(reader: 'easyocr.Reader', small: np.ndarray, grey: np.ndarray, scale: float) -> list:
+    """
+    Detect text on a downscaled copy and recognize the boxes at full resolution.
+
+    Detection cost grows with the pixel count while recognition only needs the boxes, so large
+    captures are detected at `scale` and the boxes, mapped back to full-resolution coordinates,
+    are recognized from the original pixels. EasyOCR crops them straight out of the grayscale frame.
+
+    Args:
+        reader (easyocr.Reader): The reader; the caller holds its lock.
+        small (np.ndarray): The frame downscaled by `scale`, for detection.
+        grey (np.ndarray): The full-resolution grayscale frame, for recognition.
+        scale (float): Detection scale, below 1.
+
+    Returns:
+        list: (bbox, text, confidence) tuples in full-resolution coordinates, like readtext.
+    """
+    height, width = grey.shape[:2]
+    horizontal_list, free_list = reader.detect(small)
+    horizontal_list, free_list = horizontal_list[0], free_list[0]
+
+    # Map boxes back, widening each by one detection pixel to absorb the rounding of the downscale
+    horizontal_list = [[max(0, int((x1 - 1) / scale)), min(width, int((x2 + 1) / scale)),
+                        max(0, int((y1 - 1) / scale)), min(height, int((y2 + 1) / scale))]
+                       for x1, x2, y1, y2 in horizontal_list]
+    free_list = [[[min(width, max(0, int(x / scale))), min(height, max(0, int(y / scale)))] for x, y in box]
+                 for box in free_list]
+
+    return reader.recognize(grey, horizontal_list, free_list)
+
+def extract_text_in_regions(image: Image.Image, regions: list, languages: tuple = ('ja',)) -> list:
+    """
+    Extract text from rectangular regions of an image only.
+
+    Args:
+        image (Image.Image): The full image.
+        regions (list): Regions as (x1, x2, y1, y2) tuples in image coordinates.
+        languages (tuple): Language codes for the shared reader. Default is ('ja',).
+
+    Returns:
+        list: Results in the same format as extract_japanese_text, with coordinates
+              mapped back to the full image.
+    """
     extracted_text = []
-    for (bbox, text, prob) in results:
-        # Convert coordinates from list of points to x1, x2, y1, y2
-        x_coordinates = [point[0] for point in bbox]
-        y_coordinates = [point[1] for point in bbox]
-
-        x1 = min(x_coordinates)
-        x2 = max(x_coordinates)
-        y1 = min(y_coordinates)
-        y2 = max(y_coordinates)
-
-        extracted_text.append({
-            'text': text,
-            'coordinates': {
-                'x1': int(x1),
-                'x2': int(x2),
-                'y1': int(y1),
-                'y2': int(y2)
-            },
-            'confidence': float(prob)
-        })
-
-    print(f"Extracted {len(extracted_text)} text items from the image.")
+    for x1, x2, y1, y2 in regions:
+        if x2 <= x1 or y2 <= y1:
+            continue
+        for item in extract_japanese_text(image.crop((x1, y1, x2, y2)), languages):
+            coords = item['coordinates']
+            coords['x1'] += x1
+            coords['x2'] += x1
+            coords['y1'] += y1
+            coords['y2'] += y1
+            extracted_text.append(item)
     return extracted_text
 
 def display_image_with_boxes(image: Image.Image, results: list):
@@ -59,6 +301,8 @@ def display_image_with_boxes(image: Image.Image, results: list):
         image (Image.Image): The image to display.
         results (list): The list of results containing detected text and coordinates.
     """
+    import cv2
+
     # Convert the Pillow image to a NumPy array for OpenCV
     image_np = np.array(image)
 
@@ -85,6 +329,7 @@ def display_image_with_boxes(image: Image.Image, results: list):
     cv2.destroyAllWindows()
 
 if __name__ == '__main__':
+    metrics.setup_logging()
 
 
 
@@ -98,5 +343,7 @@ if __name__ == '__main__':
         print(f"Detected text: {result['text']} with confidence {result['confidence']:.2f}")
         print(f"Bounding box: x1={result['coordinates']['x1']}, x2={result['coordinates']['x2']}, y1={result['coordinates']['y1']}, y2={result['coordinates']['y2']}")
 
+    print(f"Reader timings: {get_reader_stats()}")
+
     # Optionally display the image with bounding boxes
     display_image_with_boxes(img, extracted_results)
@@ -0,0 +1,298 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+import metrics
+from incremental_ocr import changed_tiles
+from ocr_results import OCRResults
+
+logger = logging.getLogger(__name__)
+
+
+def dhash(image, hash_size: int = 16) -> int:
+    """
+    Difference hash of an image: one bit per horizontal brightness step of a tiny grayscale copy.
+
+    Recompression noise, cursor blinks and small animations flip few bits, while a different screen
+    flips many, so the Hamming distance between two hashes measures how alike two frames look.
+
+    Args:
+        image: Pillow image or RGB (or grayscale) uint8 array.
+        hash_size (int): The hash has hash_size * hash_size bits.
+
+    Returns:
+        int: The hash as an unsigned integer.
+    """
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    small = np.asarray(image.convert('L').resize((hash_size + 1, hash_size), Image.BOX), dtype=np.int16)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming(first: int, second: int) -> int:
+    """Return the number of bits that differ between two hashes."""
+    return bin(first ^ second).count('1')
+
+def thumbnail(image, side: int = 320) -> np.ndarray:
+    """
+    Return a grayscale copy of an image scaled down to `side` pixels on its longest edge.
+
+    The size depends only on the image size, so thumbnails of frames of one size compare directly.
+    """
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    scale = min(1.0, side / max(image.width, image.height))
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return np.asarray(image.convert('L').resize(size, Image.BOX))
+
+
+class FrameCache:
+    """
+    Cache of finished frames keyed by a perceptual hash of the captured image.
+
+    A frame whose hash lies within `tolerance` bits of a stored frame of the same size, and whose
+    grayscale thumbnail has no tile changed from the stored one, reuses that frame's translated
+    results and overlay, skipping OCR, translation and rendering. The hash only finds candidates:
+    one new line in a dialogue box can flip fewer bits than the tolerance, but it changes tiles of
+    the thumbnail. Overlays and
+    results are kept in a memory-bounded LRU. With a `path`, the translated results (not the overlays)
+    also go to SQLite and survive restarts; a frame found only on disk is re-rendered from them,
+    which still skips OCR and translation.
+
+    Entries do not record the target language or OCR settings; use one cache per configuration.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, tolerance: int = 2, hash_size: int = 16,
+                 path: str = None, max_disk_entries: int = 5000, thumbnail_side: int = 320,
+                 tile_size: int = 8, threshold: int = 24):
+        """
+        Args:
+            max_bytes (int): Memory for overlays and results; least recently used frames are dropped beyond it.
+            tolerance (int): Largest Hamming distance, in bits, between hashes of the same screen.
+                             0 only matches identical hashes.
+            hash_size (int): dhash size; hashes have hash_size squared bits.
+            path (str): Optional SQLite file to persist translated results between sessions.
+            max_disk_entries (int): Frames kept on disk; the least recently used are deleted beyond it.
+            thumbnail_side (int): Longest edge of the thumbnails that confirm a hash match.
+            tile_size (int): Tile edge, in thumbnail pixels, of the confirming comparison.
+            threshold (int): Thumbnail pixel difference above which a tile counts as changed.
+        """
+        self.max_bytes = max_bytes
+        self.tolerance = tolerance
+        self.hash_size = hash_size
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.thumbnail_side = thumbnail_side
+        self.tile_size = tile_size
+        self.threshold = threshold
+
+        self._frames = OrderedDict()  # (width, height, hash) -> [results, overlay, thumbnail, seconds, render_seconds, nbytes]
+        self._bytes = 0
+        self._disk_keys = set()
+        self._lock = threading.Lock()
+        self._connection = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+        if path is not None:
+            with self._lock:
+                self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database and read the stored frame keys. Caller holds the lock."""
+        if self._connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            columns = {row[1] for row in self._connection.execute('PRAGMA table_info(frames)')}
+            if columns and 'thumbnail' not in columns:
+                # Written before frames carried thumbnails; the entries cannot be confirmed
+                logger.info("Discarding frame cache %s from an older version.", self.path)
+                self._connection.execute('DROP TABLE frames')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS frames ('
+                ' width INTEGER NOT NULL, height INTEGER NOT NULL, hash TEXT NOT NULL,'
+                ' results BLOB NOT NULL, thumbnail BLOB NOT NULL, seconds REAL NOT NULL,'
+                ' render_seconds REAL NOT NULL, last_used REAL NOT NULL,'
+                ' PRIMARY KEY (width, height, hash))'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS frames_last_used ON frames (last_used)')
+            self._connection.commit()
+            self._disk_keys = {(width, height, int(value, 16))
+                               for width, height, value in self._connection.execute('SELECT width, height, hash FROM frames')}
+        return self._connection
+
+    def key(self, image) -> tuple:
+        """
+        Return the cache key of an image: (width, height, hash, thumbnail).
+
+        Frames are stored under the first three fields; the thumbnail confirms hash matches.
+        """
+        height, width = image.shape[:2] if isinstance(image, np.ndarray) else (image.height, image.width)
+        return (width, height, dhash(image, self.hash_size), thumbnail(image, self.thumbnail_side))
+
+    def _candidates(self, key: tuple, keys) -> list:
+        """Return the stored keys within the tolerance of `key`, closest first."""
+        width, height, value = key[:3]
+        if not self.tolerance:
+            return [key[:3]] if key[:3] in keys else []
+        distances = [(hamming(value, candidate[2]), candidate) for candidate in keys
+                     if candidate[0] == width and candidate[1] == height]
+        return [candidate for distance, candidate in sorted(distances) if distance <= self.tolerance]
+
+    def _same_screen(self, stored: np.ndarray, current: np.ndarray) -> bool:
+        """Confirm a hash match: True if no tile of the thumbnails differs."""
+        if stored.shape != current.shape or changed_tiles(stored, current, self.tile_size, self.threshold).any():
+            self.rejected += 1
+            return False
+        return True
+
+    def get(self, image, key: tuple = None) -> tuple:
+        """
+        Look up a frame.
+
+        Args:
+            image: The captured frame (Pillow image or array).
+            key (tuple): Its key, if already computed.
+
+        Returns:
+            tuple: (key, hit). The key is passed to put on a miss. The hit is None on a miss,
+                   otherwise a dict with 'results' (an OCRResults, translated), 'overlay' (a copy
+                   of the stored overlay, or None when the frame was found on disk only and must
+                   be rendered from the results), 'seconds' (what the frame originally took) and
+                   'render_seconds' (the part of it spent rendering).
+        """
+        start = time.perf_counter()
+        key = key or self.key(image)
+        with self._lock:
+            for found in self._candidates(key, self._frames):
+                results, overlay, stored, seconds, render_seconds, _ = self._frames[found]
+                if not self._same_screen(stored, key[3]):
+                    continue
+                self._frames.move_to_end(found)
+                self.hits += 1
+                self.saved_seconds += max(0.0, seconds - (time.perf_counter() - start))
+                metrics.increment('frame_cache.hit')
+                return key, {'results': results, 'overlay': overlay.copy(), 'seconds': seconds,
+                             'render_seconds': render_seconds}
+
+            for found in self._candidates(key, self._disk_keys) if self._connection is not None else ():
+                if found in self._frames:
+                    # Already compared in memory
+                    continue
+                row = self._connection.execute(
+                    'SELECT results, thumbnail, seconds, render_seconds FROM frames WHERE width = ? AND height = ? AND hash = ?',
+                    (found[0], found[1], format(found[2], 'x'))
+                ).fetchone()
+                if row is None or not self._same_screen(np.frombuffer(row[1], dtype=np.uint8).reshape(key[3].shape), key[3]):
+                    continue
+                self._connection.execute(
+                    'UPDATE frames SET last_used = ? WHERE width = ? AND height = ? AND hash = ?',
+                    (time.time(), found[0], found[1], format(found[2], 'x'))
+                )
+                self._connection.commit()
+                self.disk_hits += 1
+                # Rendering is still to do, so only OCR and translation count as saved
+                self.saved_seconds += max(0.0, row[2] - row[3] - (time.perf_counter() - start))
+                metrics.increment('frame_cache.hit')
+                return key, {'results': OCRResults.from_bytes(row[0]), 'overlay': None, 'seconds': row[2],
+                             'render_seconds': row[3]}
+
+            self.misses += 1
+        metrics.increment('frame_cache.miss')
+        return key, None
+
+    def put(self, key: tuple, results, overlay, seconds: float, render_seconds: float = 0.0):
+        """
+        Store a finished frame.
+
+        Args:
+            key (tuple): The key returned by get for the captured frame.
+            results: Its translated results, as an OCRResults or a list of dicts.
+            overlay: The overlaid frame (Pillow image or array). It is stored as is; do not draw on it afterwards.
+            seconds (float): What producing the frame took, reported as saved on every memory hit.
+            render_seconds (float): The part of `seconds` spent rendering, which a disk hit still pays.
+        """
+        results = OCRResults.from_dicts(results)
+        data = results.to_bytes()
+        stored = key[3]
+        nbytes = len(data) + stored.nbytes + (overlay.nbytes if isinstance(overlay, np.ndarray) else overlay.width * overlay.height * len(overlay.getbands()))
+        with self._lock:
+            if nbytes <= self.max_bytes:
+                previous = self._frames.pop(key[:3], None)
+                if previous is not None:
+                    self._bytes -= previous[5]
+                self._frames[key[:3]] = [results, overlay, stored, seconds, render_seconds, nbytes]
+                self._bytes += nbytes
+                while self._bytes > self.max_bytes and self._frames:
+                    _, evicted = self._frames.popitem(last=False)
+                    self._bytes -= evicted[5]
+                    self.evictions += 1
+
+            if self._connection is not None:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO frames (width, height, hash, results, thumbnail, seconds, render_seconds, last_used)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key[0], key[1], format(key[2], 'x'), data, stored.tobytes(), seconds, render_seconds, time.time())
+                )
+                self._connection.commit()
+                self._disk_keys.add(key[:3])
+                if len(self._disk_keys) > self.max_disk_entries:
+                    self._trim()
+
+    def _trim(self):
+        """Delete the least recently used frames on disk above `max_disk_entries`. Caller holds the lock."""
+        excess = len(self._disk_keys) - self.max_disk_entries
+        rows = self._connection.execute('SELECT width, height, hash FROM frames ORDER BY last_used ASC LIMIT ?', (excess,)).fetchall()
+        self._connection.executemany('DELETE FROM frames WHERE width = ? AND height = ? AND hash = ?', rows)
+        self._connection.commit()
+        for width, height, value in rows:
+            self._disk_keys.discard((width, height, int(value, 16)))
+
+    def stats(self) -> dict:
+        """Return hit/miss counters, hash matches rejected by the thumbnail check, the hit rate, the time saved and the memory in use."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'rejected': self.rejected,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'saved_seconds': self.saved_seconds,
+                'evictions': self.evictions,
+                'entries': len(self._frames),
+                'disk_entries': len(self._disk_keys),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self):
+        """Drop every stored frame, on disk too, and reset the counters."""
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+            if self._connection is not None:
+                self._connection.execute('DELETE FROM frames')
+                self._connection.commit()
+                self._disk_keys.clear()
+            self.hits = self.disk_hits = self.misses = self.rejected = self.evictions = 0
+            self.saved_seconds = 0.0
+
+    def close(self):
+        """Close the database connection, if any. The memory tier stays usable."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,209 @@
+import logging
+import numpy as np
+from PIL import Image
+import extract_image_text
+
+logger = logging.getLogger(__name__)
+
+
+def changed_tiles(previous: np.ndarray, current: np.ndarray, tile_size: int = 32, threshold: int = 24) -> np.ndarray:
+    """
+    Find the tiles that differ between two grayscale frames of the same size.
+
+    Args:
+        previous (np.ndarray): Previous frame as a 2-D uint8 array.
+        current (np.ndarray): Current frame as a 2-D uint8 array.
+        tile_size (int): Edge length of a tile in pixels.
+        threshold (int): Per-pixel difference above which a tile counts as changed.
+
+    Returns:
+        np.ndarray: Boolean grid of shape (ceil(H / tile_size), ceil(W / tile_size)).
+    """
+    diff = np.abs(current.astype(np.int16) - previous.astype(np.int16)).astype(np.uint8)
+
+    # Pad to a whole number of tiles so the frame can be viewed as a grid of tiles
+    height, width = diff.shape
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    padded = np.zeros((rows * tile_size, cols * tile_size), dtype=np.uint8)
+    padded[:height, :width] = diff
+
+    tile_max = padded.reshape(rows, tile_size, cols, tile_size).max(axis=(1, 3))
+    return tile_max > threshold
+
+def tile_regions(dirty: np.ndarray) -> list:
+    """
+    Group dirty tiles into bounding rectangles of 4-connected components.
+
+    Args:
+        dirty (np.ndarray): Boolean tile grid from changed_tiles.
+
+    Returns:
+        list: Rectangles as (col1, col2, row1, row2) in tile units, end-exclusive.
+    """
+    seen = np.zeros_like(dirty)
+    regions = []
+    for row, col in zip(*np.nonzero(dirty)):
+        if seen[row, col]:
+            continue
+        seen[row, col] = True
+        stack = [(row, col)]
+        r1, r2, c1, c2 = row, row, col, col
+        while stack:
+            r, c = stack.pop()
+            r1, r2, c1, c2 = min(r1, r), max(r2, r), min(c1, c), max(c2, c)
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if 0 <= nr < dirty.shape[0] and 0 <= nc < dirty.shape[1] and dirty[nr, nc] and not seen[nr, nc]:
+                    seen[nr, nc] = True
+                    stack.append((nr, nc))
+        regions.append((int(c1), int(c2) + 1, int(r1), int(r2) + 1))
+    return regions
+
+def _overlaps(a: tuple, b: tuple) -> bool:
+    """Check whether two (x1, x2, y1, y2) rectangles intersect."""
+    return a[0] < b[1] and b[0] < a[1] and a[2] < b[3] and b[2] < a[3]
+
+def _union(a: tuple, b: tuple) -> tuple:
+    """Return the bounding rectangle of two (x1, x2, y1, y2) rectangles."""
+    return (min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3]))
+
+def merge_regions(regions: list) -> list:
+    """Merge (x1, x2, y1, y2) rectangles until none of them overlap."""
+    regions = list(regions)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                if _overlaps(regions[i], regions[j]):
+                    regions[i] = _union(regions[i], regions.pop(j))
+                    merged = True
+                    break
+            if merged:
+                break
+    return regions
+
+def _box(item: dict) -> tuple:
+    """Return an OCR result's box as (x1, x2, y1, y2)."""
+    coords = item['coordinates']
+    return (coords['x1'], coords['x2'], coords['y1'], coords['y2'])
+
+
+class IncrementalOCR:
+    """
+    OCR that only re-reads the parts of a frame that changed since the previous frame.
+
+    The previous frame and its results are kept. Each new frame is diffed tile by tile,
+    changed tiles are grouped into regions, padded (and grown to cover any previous text box
+    they touch, so text is not cut) and only those regions are sent to OCR. Results outside
+    the dirty regions are carried over from the previous frame.
+    """
+
+    def __init__(self, tile_size: int = 32, threshold: int = 24, pad: int = 16,
+                 full_rescan_ratio: float = 0.6, languages: tuple = ('ja',)):
+        """
+        Args:
+            tile_size (int): Edge length of a diff tile in pixels.
+            threshold (int): Per-pixel difference above which a tile counts as changed.
+            pad (int): Pixels added around each dirty region before OCR.
+            full_rescan_ratio (float): Run a full OCR pass instead when dirty regions cover more than this fraction of the frame.
+            languages (tuple): Language codes for the shared reader.
+        """
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.pad = pad
+        self.full_rescan_ratio = full_rescan_ratio
+        self.languages = tuple(languages)
+
+        self._previous = None
+        self._results = []
+
+        self.frames = 0
+        self.full_passes = 0
+        self.pixels_scanned = 0
+        self.pixels_total = 0
+
+    def reset(self):
+        """Forget the previous frame so the next one gets a full OCR pass."""
+        self._previous = None
+        self._results = []
+
+    def dirty_regions(self, frame: np.ndarray) -> list:
+        """
+        Compute the padded pixel regions of a grayscale frame that need OCR.
+
+        Args:
+            frame (np.ndarray): Current frame as a 2-D uint8 array, same size as the previous one.
+
+        Returns:
+            list: Non-overlapping (x1, x2, y1, y2) regions clipped to the frame.
+        """
+        height, width = frame.shape
+        dirty = changed_tiles(self._previous, frame, self.tile_size, self.threshold)
+
+        regions = []
+        for c1, c2, r1, r2 in tile_regions(dirty):
+            regions.append((max(0, c1 * self.tile_size - self.pad), min(width, c2 * self.tile_size + self.pad),
+                            max(0, r1 * self.tile_size - self.pad), min(height, r2 * self.tile_size + self.pad)))
+        regions = merge_regions(regions)
+
+        # Grow regions over previous text boxes they touch, so a changed line is re-read whole
+        grown = True
+        while grown:
+            grown = False
+            for i, region in enumerate(regions):
+                for item in self._results:
+                    box = _box(item)
+                    if _overlaps(region, box) and _union(region, box) != region:
+                        regions[i] = _union(region, box)
+                        grown = True
+                        region = regions[i]
+            regions = merge_regions(regions)
+        return regions
+
+    def process(self, image: Image.Image) -> list:
+        """
+        OCR a frame, reusing results for the unchanged parts of the previous frame.
+
+        Args:
+            image (Image.Image): The current frame.
+
+        Returns:
+            list: Results in the same format as extract_image_text.extract_japanese_text.
+                  The dictionaries are copies, so callers may modify them.
+        """
+        frame = np.asarray(image.convert('L'))
+        height, width = frame.shape
+        self.frames += 1
+        self.pixels_total += height * width
+
+        if self._previous is None or self._previous.shape != frame.shape:
+            regions = None
+        else:
+            regions = self.dirty_regions(frame)
+            area = sum((x2 - x1) * (y2 - y1) for x1, x2, y1, y2 in regions)
+            if area > self.full_rescan_ratio * height * width:
+                regions = None
+
+        if regions is None:
+            results = extract_image_text.extract_japanese_text(image, self.languages)
+            self.full_passes += 1
+            self.pixels_scanned += height * width
+        else:
+            carried = [item for item in self._results if not any(_overlaps(_box(item), region) for region in regions)]
+            fresh = extract_image_text.extract_text_in_regions(image, regions, self.languages)
+            self.pixels_scanned += sum((x2 - x1) * (y2 - y1) for x1, x2, y1, y2 in regions)
+            results = carried + fresh
+            logger.debug("Incremental OCR: %s dirty region(s), %s result(s) carried over.", len(regions), len(carried))
+
+        self._previous = frame
+        self._results = results
+        return [dict(item, coordinates=dict(item['coordinates'])) for item in results]
+
+    def stats(self) -> dict:
+        """Return frame counts and the fraction of pixels actually sent to OCR."""
+        return {
+            'frames': self.frames,
+            'full_passes': self.full_passes,
+            'scanned_fraction': self.pixels_scanned / self.pixels_total if self.pixels_total else 0.0,
+        }
@@ -0,0 +1,93 @@
+from functools import lru_cache
+
+# Returned when neither the script nor langdetect can identify the language
+UNKNOWN_LANGUAGE = "Could not detect the language"
+
+# (first code point, last code point, script name)
+SCRIPT_RANGES = (
+    (0x3040, 0x309F, 'kana'),        # Hiragana
+    (0x30A0, 0x30FF, 'kana'),        # Katakana
+    (0x31F0, 0x31FF, 'kana'),        # Katakana phonetic extensions
+    (0xFF66, 0xFF9F, 'kana'),        # Half-width katakana
+    (0x1100, 0x11FF, 'hangul'),      # Hangul Jamo
+    (0x3130, 0x318F, 'hangul'),      # Hangul compatibility Jamo
+    (0xAC00, 0xD7AF, 'hangul'),      # Hangul syllables
+    (0x3400, 0x4DBF, 'han'),         # CJK extension A
+    (0x4E00, 0x9FFF, 'han'),         # CJK unified ideographs
+    (0xF900, 0xFAFF, 'han'),         # CJK compatibility ideographs
+    (0x0041, 0x005A, 'latin'),
+    (0x0061, 0x007A, 'latin'),
+    (0x00C0, 0x024F, 'latin'),       # Latin-1 supplement and extended letters
+    (0xFF21, 0xFF3A, 'latin'),       # Full-width Latin
+    (0xFF41, 0xFF5A, 'latin'),
+    (0x0370, 0x03FF, 'greek'),
+    (0x0400, 0x04FF, 'cyrillic'),
+    (0x0590, 0x05FF, 'hebrew'),
+    (0x0600, 0x06FF, 'arabic'),
+    (0x0900, 0x097F, 'devanagari'),
+    (0x0E00, 0x0E7F, 'thai'),
+)
+
+# Scripts that identify a single language on their own
+SCRIPT_LANGUAGES = {'kana': 'ja', 'hangul': 'ko', 'greek': 'el', 'hebrew': 'he', 'thai': 'th'}
+
+
+def char_script(char: str) -> str:
+    """Return the script name of a character, or None for digits, punctuation and unknown scripts."""
+    code = ord(char)
+    for first, last, script in SCRIPT_RANGES:
+        if first <= code <= last:
+            return script
+    return None
+
+def script_counts(text: str) -> dict:
+    """Count the letters of each script in a string."""
+    counts = {}
+    for char in text:
+        script = char_script(char)
+        if script is not None:
+            counts[script] = counts.get(script, 0) + 1
+    return counts
+
+@lru_cache(maxsize=16384)
+def detect_language(text: str, han_language: str = 'ja') -> str:
+    """
+    Detect the language of a string, by Unicode script first and langdetect only when ambiguous.
+
+    Any kana means Japanese and any Hangul means Korean. Text written only in Han ideographs
+    is reported as `han_language`, since the OCR reader is set up for Japanese. Latin, Cyrillic,
+    Arabic and Devanagari text is shared by several languages and goes to langdetect. Results
+    are memoized, so repeated dialogue lines are classified once.
+
+    Args:
+        text (str): The input text.
+        han_language (str): Language reported for ideograph-only text. Default is 'ja'.
+
+    Returns:
+        str: The language code, or UNKNOWN_LANGUAGE.
+    """
+    counts = script_counts(text)
+    if not counts:
+        return UNKNOWN_LANGUAGE
+
+    if 'kana' in counts:
+        return 'ja'
+    if 'hangul' in counts:
+        return 'ko'
+
+    dominant = max(counts, key=counts.get)
+    if dominant == 'han':
+        return han_language
+    if dominant in SCRIPT_LANGUAGES:
+        return SCRIPT_LANGUAGES[dominant]
+
+    # Ambiguous script: fall back to the probabilistic detector
+    from langdetect import detect, DetectorFactory
+    from langdetect.lang_detect_exception import LangDetectException
+
+    # Set seed to ensure consistent language detection results
+    DetectorFactory.seed = 0
+    try:
+        return detect(text)
+    except LangDetectException:
+        return UNKNOWN_LANGUAGE
@@ -0,0 +1,202 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Samples kept per span name for percentile estimates
+MAX_SAMPLES = 4096
+
+_lock = threading.Lock()
+_spans = {}     # name -> {'count', 'total', 'samples'}
+_counters = {}  # name -> int
+_listener = None
+
+
+def record(name: str, seconds: float):
+    """
+    Record one duration for a span name.
+
+    Args:
+        name (str): Span name, e.g. 'ocr' or 'translate'.
+        seconds (float): Duration in seconds.
+    """
+    with _lock:
+        span_stats = _spans.get(name)
+        if span_stats is None:
+            span_stats = _spans[name] = {'count': 0, 'total': 0.0, 'samples': deque(maxlen=MAX_SAMPLES)}
+        span_stats['count'] += 1
+        span_stats['total'] += seconds
+        span_stats['samples'].append(seconds)
+
+@contextmanager
+def span(name: str):
+    """
+    Time the enclosed block and record it under `name`.
+
+    Example:
+        with metrics.span('ocr'):
+            results = reader.readtext(image_np)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+def increment(name: str, value: int = 1):
+    """Add `value` to a counter, e.g. 'translation_memory.hit' or 'translate.offline_fallback'."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def _summary(span_stats: dict) -> dict:
+    """Summarise one span's samples in milliseconds."""
+    ordered = sorted(span_stats['samples'])
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000 if ordered else 0.0
+
+    return {
+        'count': span_stats['count'],
+        'total_ms': span_stats['total'] * 1000,
+        'mean_ms': span_stats['total'] / span_stats['count'] * 1000 if span_stats['count'] else 0.0,
+        'p50_ms': pick(0.50),
+        'p90_ms': pick(0.90),
+        'p99_ms': pick(0.99),
+        'max_ms': ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+def histogram(name: str, buckets_ms: tuple = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)) -> dict:
+    """
+    Bucket the recent samples of a span.
+
+    Args:
+        name (str): Span name.
+        buckets_ms (tuple): Upper bucket bounds in milliseconds; slower samples go to 'inf'.
+
+    Returns:
+        dict: Maps '<=N ms' labels (and 'inf') to sample counts.
+    """
+    with _lock:
+        samples = list(_spans[name]['samples']) if name in _spans else []
+    counts = {f'<={bound}ms': 0 for bound in buckets_ms}
+    counts['inf'] = 0
+    for seconds in samples:
+        for bound in buckets_ms:
+            if seconds * 1000 <= bound:
+                counts[f'<={bound}ms'] += 1
+                break
+        else:
+            counts['inf'] += 1
+    return counts
+
+def snapshot() -> dict:
+    """Return every span summary, span histogram and counter."""
+    with _lock:
+        spans = {name: _summary(span_stats) for name, span_stats in _spans.items()}
+        counters = dict(_counters)
+    return {
+        'spans': spans,
+        'histograms': {name: histogram(name) for name in spans},
+        'counters': counters,
+    }
+
+def report() -> str:
+    """Format the current metrics as a plain-text table."""
+    data = snapshot()
+    lines = [f"{'span':<20}{'count':>8}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)"]
+    for name, summary in sorted(data['spans'].items()):
+        lines.append(f"{name:<20}{summary['count']:>8}{summary['mean_ms']:>10.1f}{summary['p50_ms']:>10.1f}"
+                     f"{summary['p90_ms']:>10.1f}{summary['p99_ms']:>10.1f}{summary['max_ms']:>10.1f}")
+    for name, value in sorted(data['counters'].items()):
+        lines.append(f"{name:<40}{value:>8}")
+    return '\n'.join(lines)
+
+def dump(path: str = 'metrics.json'):
+    """Write the current metrics snapshot as JSON."""
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(snapshot(), file, indent=2)
+
+def reset():
+    """Forget every span and counter."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+def serve(host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """
+    Serve the metrics on a local HTTP endpoint from a daemon thread.
+
+    GET /metrics returns the JSON snapshot and GET /report the plain-text table.
+
+    Args:
+        host (str): Interface to bind; keep it local.
+        port (int): Port to listen on (0 picks a free one).
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith('/metrics'):
+                body, content_type = json.dumps(snapshot()).encode('utf-8'), 'application/json'
+            elif self.path.startswith('/report'):
+                body, content_type = report().encode('utf-8'), 'text/plain; charset=utf-8'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.getLogger(__name__).debug(format, *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logging.getLogger(__name__).info("Serving metrics on http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+def setup_logging(level: int = logging.INFO, log_file: str = 'live_translation.log', console: bool = True):
+    """
+    Route all logging through a queue so the hot path never waits on disk or console I/O.
+
+    Records are put on an in-memory queue by a QueueHandler on the root logger; a background
+    QueueListener writes them to the log file (WARNING and above) and the console.
+
+    Args:
+        level (int): Root logger level.
+        log_file (str): File receiving warnings and errors; None disables it.
+        console (bool): Also print records to the console.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = []
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setLevel(logging.WARNING)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,277 @@
+import glob
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def model_key(source_lang: str, target_lang: str) -> str:
+    """Build the registry key for a language pair, e.g. 'opus-mt-ja-en'."""
+    return f'opus-mt-{source_lang}-{target_lang}'
+
+def _name(key: tuple) -> str:
+    """Name a cached model for logs and listings, e.g. 'opus-mt-ja-en-int8'."""
+    pair_key, quantize = key
+    return f'{pair_key}-int8' if quantize else pair_key
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of MarianMT tokenizer/model pairs.
+
+    Models are kept in least-recently-used order. When more than `max_models` are resident the
+    least recently used unpinned model is dropped. Models idle for longer than `idle_timeout`
+    seconds are unloaded by a background reaper thread. A quantized model has its Linear layers
+    converted to int8 dynamic quantization, and the converted model is cached on disk. Float32 and
+    int8 models of one pair are cached side by side, so asking for one never evicts the other;
+    pinning a pair keeps both resident.
+    """
+
+    def __init__(self, max_models: int = 2, idle_timeout: float = None, model_prefix: str = 'Helsinki-NLP/',
+                 quantize: bool = False, quantized_dir: str = 'marian_int8'):
+        """
+        Args:
+            max_models (int): Number of models allowed to stay resident. Pinned models may exceed it.
+            idle_timeout (float): Seconds after which an unused, unpinned model is unloaded. None disables it.
+            model_prefix (str): Hub namespace (or local directory) the models are loaded from.
+            quantize (bool): Load int8 dynamic-quantized models by default instead of float32 ones.
+            quantized_dir (str): Directory caching the converted int8 models.
+        """
+        self.max_models = max_models
+        self.idle_timeout = idle_timeout
+        self.model_prefix = model_prefix
+        self.quantize = quantize
+        self.quantized_dir = quantized_dir
+
+        self._models = OrderedDict()  # (pair key, quantize) -> (tokenizer, model)
+        self._last_used = {}
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> lock, so two threads never load the same pair twice
+        self._reaper = None
+        self._stop_reaper = threading.Event()
+
+        if idle_timeout is not None:
+            self._start_reaper()
+
+    def get(self, source_lang: str, target_lang: str = 'en', quantize: bool = None) -> tuple:
+        """
+        Return the (tokenizer, model) pair for a language pair, loading it if needed.
+
+        Args:
+            source_lang (str): The source language code.
+            target_lang (str): The target language code.
+            quantize (bool): Return the int8 model. None uses the registry's `quantize`.
+
+        Returns:
+            tuple: (MarianTokenizer, MarianMTModel)
+        """
+        key = (model_key(source_lang, target_lang), self.quantize if quantize is None else quantize)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self._last_used[key] = time.monotonic()
+                return self._models[key]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self._last_used[key] = time.monotonic()
+                    return self._models[key]
+
+            logger.info("Loading offline model %s.", _name(key))
+            start = time.perf_counter()
+            try:
+                pair = self._load(*key)
+                load_seconds = time.perf_counter() - start
+                metrics.record('model_load', load_seconds)
+                logger.info("Loaded %s in %.2fs.", _name(key), load_seconds)
+
+                with self._lock:
+                    self._models[key] = pair
+                    self._last_used[key] = time.monotonic()
+                    self._evict()
+            finally:
+                # Also after a failed load, which reaches the caller; the next get tries again
+                with self._lock:
+                    self._loading.pop(key, None)
+        return pair
+
+    def _load(self, key: str, quantize: bool) -> tuple:
+        """Load the tokenizer and model for a pair key, as int8 with `quantize`."""
+        # Imported on first load: transformers and torch dominate import time
+        from transformers import MarianMTModel, MarianTokenizer
+
+        model_name = self.model_prefix + key
+        tokenizer = MarianTokenizer.from_pretrained(model_name)
+        model = self._load_quantized(key, model_name) if quantize else MarianMTModel.from_pretrained(model_name)
+        model.eval()
+        return tokenizer, model
+
+    def _load_quantized(self, key: str, model_name: str):
+        """
+        Return the int8 dynamic-quantized model, converting and caching it on first use.
+
+        The converted module is pickled whole, so later loads skip both the float32 weights and the
+        conversion. Pickled modules are only valid for the library versions and the weights they were
+        made from, so the file name carries the model revision and the torch and transformers versions.
+        A cached file that cannot be loaded is deleted and the model converted again, and converting
+        removes the files left by other revisions or versions.
+        """
+        import torch
+        import transformers
+        from transformers import AutoConfig, MarianMTModel
+
+        # The hub commit of the weights; a local directory has none
+        revision = getattr(AutoConfig.from_pretrained(model_name), '_commit_hash', None) or 'local'
+        name = f'{key}@{revision}-torch{torch.__version__}-transformers{transformers.__version__}.pt'
+        path = os.path.join(self.quantized_dir, name)
+        if os.path.exists(path):
+            try:
+                model = torch.load(path, weights_only=False)
+                if not isinstance(model, MarianMTModel):
+                    raise TypeError(f"expected a MarianMTModel, found {type(model).__name__}")
+                return model
+            except Exception as err:
+                logger.warning("Discarding unreadable quantized model %s and converting %s again: %s", path, key, err)
+                os.remove(path)
+
+        model = MarianMTModel.from_pretrained(model_name)
+        model.eval()
+        start = time.perf_counter()
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("Quantized %s to int8 in %.2fs.", key, time.perf_counter() - start)
+
+        os.makedirs(self.quantized_dir, exist_ok=True)
+        temporary_path = path + '.tmp'
+        torch.save(quantized, temporary_path)
+        os.replace(temporary_path, path)
+        for stale in glob.glob(os.path.join(glob.escape(self.quantized_dir), glob.escape(key) + '@*.pt')):
+            if stale != path:
+                logger.info("Removing quantized model %s made for another revision or library version.", stale)
+                os.remove(stale)
+        return quantized
+
+    def set_quantize(self, quantize: bool):
+        """Change the default between float32 and int8 models; models of the other kind stay cached."""
+        with self._lock:
+            self.quantize = quantize
+
+    def _evict(self):
+        """Drop least recently used unpinned models until the cap is respected. Caller holds the lock."""
+        for key in list(self._models):
+            if len(self._models) <= self.max_models:
+                break
+            if key[0] in self._pinned:
+                continue
+            self._drop(key)
+            metrics.increment('model_registry.evictions')
+            logger.info("Evicted offline model %s (limit %s).", _name(key), self.max_models)
+
+    def _drop(self, key: tuple):
+        """Forget a model. Caller holds the lock."""
+        self._models.pop(key, None)
+        self._last_used.pop(key, None)
+
+    def pin(self, source_lang: str, target_lang: str = 'en', preload: bool = True):
+        """
+        Keep a language pair resident regardless of LRU order and idle time.
+
+        Args:
+            source_lang (str): The source language code.
+            target_lang (str): The target language code.
+            preload (bool): Load the model now instead of on first use.
+        """
+        with self._lock:
+            self._pinned.add(model_key(source_lang, target_lang))
+        if preload:
+            self.get(source_lang, target_lang)
+
+    def unpin(self, source_lang: str, target_lang: str = 'en'):
+        """Make a pinned language pair evictable again."""
+        with self._lock:
+            self._pinned.discard(model_key(source_lang, target_lang))
+            self._evict()
+
+    def unload(self, source_lang: str, target_lang: str = 'en') -> bool:
+        """
+        Unload a language pair immediately, float32 and int8, even if it is pinned.
+
+        Returns:
+            bool: True if a model of the pair was resident.
+        """
+        key = model_key(source_lang, target_lang)
+        with self._lock:
+            self._pinned.discard(key)
+            resident = [cached for cached in self._models if cached[0] == key]
+            for cached in resident:
+                self._drop(cached)
+        return bool(resident)
+
+    def unload_idle(self) -> list:
+        """
+        Unload every unpinned model that has not been used for `idle_timeout` seconds.
+
+        Returns:
+            list: The names of the models that were unloaded.
+        """
+        if self.idle_timeout is None:
+            return []
+
+        now = time.monotonic()
+        unloaded = []
+        with self._lock:
+            for key in list(self._models):
+                if key[0] not in self._pinned and now - self._last_used[key] >= self.idle_timeout:
+                    self._drop(key)
+                    unloaded.append(_name(key))
+        for key in unloaded:
+            logger.info("Unloaded idle offline model %s.", key)
+        return unloaded
+
+    def set_max_models(self, max_models: int):
+        """Change the residency cap, evicting immediately if it shrank."""
+        with self._lock:
+            self.max_models = max_models
+            self._evict()
+
+    def loaded(self) -> list:
+        """Return resident model names from least to most recently used; int8 ones end in '-int8'."""
+        with self._lock:
+            return [_name(key) for key in self._models]
+
+    def clear(self):
+        """Unload every model, pinned or not."""
+        with self._lock:
+            self._models.clear()
+            self._last_used.clear()
+            self._pinned.clear()
+
+    def close(self):
+        """Stop the idle reaper thread."""
+        self._stop_reaper.set()
+        if self._reaper is not None:
+            self._reaper.join()
+            self._reaper = None
+
+    def _start_reaper(self):
+        """Periodically unload idle models on a daemon thread."""
+        interval = max(1.0, self.idle_timeout / 2)
+
+        def reap():
+            while not self._stop_reaper.wait(interval):
+                self.unload_idle()
+
+        self._reaper = threading.Thread(target=reap, name='model-reaper', daemon=True)
+        self._reaper.start()
+
+
+# Shared by every caller in the process
+registry = ModelRegistry()
@@ -0,0 +1,242 @@
+import json
+import struct
+import numpy as np
+
+# Column order of OCRResults.boxes, the same as the 'coordinates' dicts
+BOX_COLUMNS = ('x1', 'x2', 'y1', 'y2')
+
+# Binary layout: magic, format version and row count, then the arrays, then the strings as JSON
+_MAGIC = b'OCRR'
+_HEADER = struct.Struct('<4sHI')
+_FORMAT_VERSION = 1
+
+# Sort keys for OCRResults.sort, applied with np.lexsort (last key first)
+_ORDERS = {
+    'reading': lambda results: (results.boxes[:, 0], results.boxes[:, 2]),
+    'confidence': lambda results: (-results.confidences,),
+    'area': lambda results: (-results.areas(),),
+}
+
+
+class OCRResults:
+    """
+    Column-oriented OCR results: one row per text box.
+
+    Boxes are an (N, 4) int32 array in x1, x2, y1, y2 order and confidences an (N,) float32 array,
+    so geometry is filtered, sorted and clipped with vectorized NumPy. Texts stay Python strings.
+    A row's translation, its source language and the language of the displayed text are None until
+    translated.
+
+    Rows convert to and from the dicts returned by extract_japanese_text (to_dicts / from_dicts),
+    and iterating yields those dicts, so code written for lists of results keeps working.
+    Results serialize to a compact binary form (to_bytes) or to columnar JSON (to_json) for caching,
+    sending to other processes and replaying in benchmarks.
+    """
+
+    __slots__ = ('boxes', 'confidences', 'texts', 'translations', 'source_languages', 'languages')
+
+    def __init__(self, boxes=None, confidences=None, texts: list = None, translations: list = None,
+                 source_languages: list = None, languages: list = None):
+        """
+        Args:
+            boxes: (N, 4) boxes as x1, x2, y1, y2.
+            confidences: N confidences; default 0.
+            texts (list): N recognized texts; default empty strings.
+            translations (list): N translations or None.
+            source_languages (list): N detected source languages or None.
+            languages (list): N languages of the displayed text or None.
+
+        Raises:
+            ValueError: If the columns do not have the same length.
+        """
+        self.boxes = np.ascontiguousarray(np.asarray(boxes if boxes is not None else (), dtype=np.int32).reshape(-1, 4))
+        count = len(self.boxes)
+        self.confidences = np.ascontiguousarray(confidences if confidences is not None else np.zeros(count), dtype=np.float32)
+        self.texts = list(texts) if texts is not None else [''] * count
+        self.translations = list(translations) if translations is not None else [None] * count
+        self.source_languages = list(source_languages) if source_languages is not None else [None] * count
+        self.languages = list(languages) if languages is not None else [None] * count
+
+        lengths = {len(self.confidences), len(self.texts), len(self.translations), len(self.source_languages), len(self.languages)}
+        if lengths != {count}:
+            raise ValueError(f"OCRResults columns have different lengths: {count} boxes, {sorted(lengths)} other rows.")
+
+    @classmethod
+    def from_easyocr(cls, raw: list) -> 'OCRResults':
+        """Build results from EasyOCR (bbox points, text, confidence) tuples."""
+        if not raw:
+            return cls()
+        points = np.array([bbox for bbox, _, _ in raw], dtype=np.float64).reshape(len(raw), -1, 2)
+        minimum, maximum = points.min(axis=1), points.max(axis=1)
+        # Truncate like int() did for each coordinate
+        boxes = np.stack([minimum[:, 0], maximum[:, 0], minimum[:, 1], maximum[:, 1]], axis=1).astype(np.int32)
+        return cls(boxes, [prob for _, _, prob in raw], [text for _, text, _ in raw])
+
+    @classmethod
+    def from_dicts(cls, results: list) -> 'OCRResults':
+        """
+        Build results from extract_japanese_text dicts, translated or not.
+
+        Only the columns are kept; other keys (e.g. 'fragments' or 'cap img obj') are dropped.
+        """
+        if isinstance(results, cls):
+            return results
+        boxes = [[item['coordinates'][name] for name in BOX_COLUMNS] for item in results]
+        translated = ['original_text' in item for item in results]
+        return cls(
+            boxes,
+            [item.get('confidence', 0.0) for item in results],
+            [item['original_text'] if done else item['text'] for item, done in zip(results, translated)],
+            [item['text'] if done else None for item, done in zip(results, translated)],
+            [item.get('source_language') for item in results],
+            [item.get('language') for item in results],
+        )
+
+    def _row(self, index: int) -> dict:
+        x1, x2, y1, y2 = (int(value) for value in self.boxes[index])
+        row = {
+            'text': self.display_text(index),
+            'coordinates': {'x1': x1, 'x2': x2, 'y1': y1, 'y2': y2},
+            'confidence': float(self.confidences[index]),
+        }
+        if self.translations[index] is not None:
+            row['original_text'] = self.texts[index]
+        if self.source_languages[index] is not None:
+            row['source_language'] = self.source_languages[index]
+        if self.languages[index] is not None:
+            row['language'] = self.languages[index]
+        return row
+
+    def to_dicts(self) -> list:
+        """Return the rows as extract_japanese_text dicts; translated rows carry the translation as 'text'."""
+        return [self._row(index) for index in range(len(self))]
+
+    def display_text(self, index: int) -> str:
+        """Return the text shown for a row: its translation if there is one, otherwise the OCR text."""
+        translation = self.translations[index]
+        return self.texts[index] if translation is None else translation
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def __iter__(self):
+        return (self._row(index) for index in range(len(self)))
+
+    def __getitem__(self, index):
+        """An integer returns the row as a dict; a slice, index array or boolean mask returns an OCRResults."""
+        if isinstance(index, (int, np.integer)):
+            return self._row(index)
+        rows = np.arange(len(self))[index]
+        return OCRResults(
+            self.boxes[rows],
+            self.confidences[rows],
+            [self.texts[row] for row in rows],
+            [self.translations[row] for row in rows],
+            [self.source_languages[row] for row in rows],
+            [self.languages[row] for row in rows],
+        )
+
+    def __repr__(self) -> str:
+        return f"OCRResults({len(self)} boxes)"
+
+    def widths(self) -> np.ndarray:
+        return self.boxes[:, 1] - self.boxes[:, 0]
+
+    def heights(self) -> np.ndarray:
+        return self.boxes[:, 3] - self.boxes[:, 2]
+
+    def areas(self) -> np.ndarray:
+        """Return the box areas, zero for empty boxes, as int64."""
+        return np.maximum(self.widths(), 0).astype(np.int64) * np.maximum(self.heights(), 0)
+
+    def filter(self, mask) -> 'OCRResults':
+        """Return the rows selected by a boolean mask, e.g. results.filter(results.confidences >= 0.3)."""
+        return self[np.asarray(mask, dtype=bool)]
+
+    def sort(self, order: str = 'reading') -> 'OCRResults':
+        """
+        Return the rows sorted by 'reading' (top to bottom, then left to right), 'confidence' or
+        'area' (both highest first).
+        """
+        return self[np.lexsort(_ORDERS[order](self))] if len(self) else self
+
+    def clip(self, width: int, height: int, drop_empty: bool = True) -> 'OCRResults':
+        """
+        Return the results with boxes clipped to a width x height image.
+
+        Args:
+            width (int): Image width.
+            height (int): Image height.
+            drop_empty (bool): Drop rows whose box lies entirely outside the image.
+        """
+        clipped = self[:]
+        np.clip(clipped.boxes[:, :2], 0, width, out=clipped.boxes[:, :2])
+        np.clip(clipped.boxes[:, 2:], 0, height, out=clipped.boxes[:, 2:])
+        if drop_empty:
+            clipped = clipped.filter((clipped.widths() > 0) & (clipped.heights() > 0))
+        return clipped
+
+    def set_translations(self, translations: list, source_languages: list, target_language: str):
+        """
+        Record translations in place, as text_translator.translate_results does for dicts.
+
+        Rows whose translation is the unchanged text (a failed translation) keep the source language
+        as their display language, so the caption font still matches.
+        """
+        self.translations = list(translations)
+        self.source_languages = list(source_languages)
+        self.languages = [source if translation == text else target_language
+                          for text, translation, source in zip(self.texts, self.translations, self.source_languages)]
+
+    def _strings(self) -> dict:
+        return {
+            'texts': self.texts,
+            'translations': self.translations,
+            'source_languages': self.source_languages,
+            'languages': self.languages,
+        }
+
+    def to_bytes(self) -> bytes:
+        """Serialize to a compact binary form: little-endian arrays followed by the strings as UTF-8 JSON."""
+        return b''.join((
+            _HEADER.pack(_MAGIC, _FORMAT_VERSION, len(self)),
+            self.boxes.astype('<i4', copy=False).tobytes(),
+            self.confidences.astype('<f4', copy=False).tobytes(),
+            json.dumps(self._strings(), ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'OCRResults':
+        """
+        Deserialize results written by to_bytes.
+
+        Raises:
+            ValueError: If the data is not in the OCRResults binary format.
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Data is too short to hold OCRResults.")
+        magic, version, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"Not OCRResults data (magic {magic!r}, version {version}).")
+        offset = _HEADER.size
+        # Copied so the arrays are writable and do not keep `data` alive
+        boxes = np.frombuffer(data, dtype='<i4', count=count * 4, offset=offset).reshape(count, 4).copy()
+        offset += boxes.nbytes
+        confidences = np.frombuffer(data, dtype='<f4', count=count, offset=offset).copy()
+        offset += confidences.nbytes
+        strings = json.loads(bytes(data[offset:]).decode('utf-8'))
+        return cls(boxes, confidences, **strings)
+
+    def to_json(self) -> str:
+        """Serialize to columnar JSON; float32 confidences are rounded to 6 digits."""
+        return json.dumps({
+            'boxes': self.boxes.tolist(),
+            'confidences': [round(float(value), 6) for value in self.confidences],
+            **self._strings(),
+        }, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'OCRResults':
+        """Deserialize results written by to_json."""
+        columns = json.loads(text)
+        return cls(columns.pop('boxes'), columns.pop('confidences'), **columns)
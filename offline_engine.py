@@ -0,0 +1,210 @@
+import argparse
+import json
+import logging
+import time
+from difflib import SequenceMatcher
+import metrics
+from model_registry import ModelRegistry, registry as shared_registry
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineEngine:
+    """
+    CPU inference settings for the offline MarianMT backend.
+
+    Generation runs under torch.inference_mode. Decoding (greedy with num_beams=1, or beam
+    search), the output length, the torch thread count and int8 quantization are configurable;
+    settings left at None keep the model's own generation defaults. Quantization is a setting of the
+    engine, not of its registry: engines with different settings share one registry without
+    evicting each other's models.
+    """
+
+    def __init__(self, registry=shared_registry, num_beams: int = None, max_new_tokens: int = None,
+                 num_threads: int = None, quantize: bool = None):
+        """
+        Args:
+            registry (ModelRegistry): Where the tokenizer/model pairs come from.
+            num_beams (int): Beams for decoding; 1 is greedy. None keeps the model default.
+            max_new_tokens (int): Longest translation in tokens. None keeps the model default.
+            num_threads (int): Torch intra-op threads. None leaves torch's setting alone.
+            quantize (bool): Use int8 dynamic-quantized models (cached on disk after conversion).
+                             None follows the registry's default.
+        """
+        self.registry = registry
+        self.quantize = None
+        self.num_beams = None
+        self.max_new_tokens = None
+        self.num_threads = None
+        self.configure(num_beams=num_beams, max_new_tokens=max_new_tokens, num_threads=num_threads, quantize=quantize)
+
+    def configure(self, num_beams: int = None, max_new_tokens: int = None, num_threads: int = None, quantize: bool = None):
+        """Change the settings given; arguments left at None are not changed."""
+        if num_beams is not None:
+            self.num_beams = num_beams
+        if max_new_tokens is not None:
+            self.max_new_tokens = max_new_tokens
+        if num_threads is not None:
+            import torch
+            torch.set_num_threads(num_threads)
+            self.num_threads = num_threads
+        if quantize is not None:
+            self.quantize = quantize
+
+    def settings(self) -> dict:
+        """Return the current settings."""
+        return {
+            'num_beams': self.num_beams,
+            'max_new_tokens': self.max_new_tokens,
+            'num_threads': self.num_threads,
+            'quantize': self.registry.quantize if self.quantize is None else self.quantize,
+        }
+
+    def load(self, source_lang: str, target_lang: str = 'en') -> tuple:
+        """Return the (tokenizer, model) pair this engine translates with, loading it if needed."""
+        return self.registry.get(source_lang, target_lang, self.quantize)
+
+    def generate_kwargs(self) -> dict:
+        """Return the keyword arguments passed to model.generate."""
+        kwargs = {}
+        if self.num_beams is not None:
+            kwargs['num_beams'] = self.num_beams
+        if self.max_new_tokens is not None:
+            kwargs['max_new_tokens'] = self.max_new_tokens
+        return kwargs
+
+    def translate(self, texts: list, source_lang: str, target_lang: str = 'en', batch_size: int = 16) -> list:
+        """
+        Translate texts of one language in length-sorted, padded batches.
+
+        Args:
+            texts (list): The texts to translate.
+            source_lang (str): The source language code shared by all texts.
+            target_lang (str): The target language code.
+            batch_size (int): Maximum number of texts per generate call.
+
+        Returns:
+            list: The translated texts, in the same order as `texts`.
+        """
+        import torch
+
+        tokenizer, model = self.load(source_lang, target_lang)
+        generate_kwargs = self.generate_kwargs()
+
+        # Similar lengths per batch waste little compute on padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        translations = [None] * len(texts)
+        with torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                bucket = order[start:start + batch_size]
+                tokenized_batch = tokenizer([texts[i] for i in bucket], return_tensors="pt", padding=True, truncation=True)
+                with metrics.span('offline.generate'):
+                    translated = model.generate(**tokenized_batch, **generate_kwargs)
+                for i, translation in zip(bucket, tokenizer.batch_decode(translated, skip_special_tokens=True)):
+                    translations[i] = translation
+        return translations
+
+
+def similarity(candidate: str, reference: str) -> float:
+    """Return a 0-1 character-level similarity between a translation and a reference."""
+    return SequenceMatcher(None, candidate, reference).ratio() if candidate or reference else 1.0
+
+def compare_settings(texts: list, source_lang: str, target_lang: str = 'en', configurations: list = None,
+                     references: list = None, batch_size: int = 16, repeats: int = 3, registry=None) -> list:
+    """
+    Measure latency and quality of several engine settings on the same texts.
+
+    Quality is the mean similarity to `references` when given. Otherwise it is measured against the
+    output of the first configuration, which by default is the float32 path with model defaults,
+    i.e. the path used before the engine settings existed.
+
+    Args:
+        texts (list): Source texts.
+        source_lang (str): Their language code.
+        target_lang (str): The target language code.
+        configurations (list): Dicts of OfflineEngine settings; the first one is the baseline.
+        references (list): Optional reference translations, one per text.
+        batch_size (int): Texts per generate call.
+        repeats (int): Timed runs per configuration, after one warm-up run; the fastest counts.
+        registry (ModelRegistry): Where the models come from. By default a registry of its own, so the
+                                  comparison does not evict the models the application keeps warm.
+
+    Returns:
+        list: One dict per configuration with its settings, 'seconds', 'texts_per_second',
+              'similarity' and 'exact_match'.
+    """
+    configurations = configurations or [
+        {'quantize': False},
+        {'quantize': False, 'num_beams': 1},
+        {'quantize': True},
+        {'quantize': True, 'num_beams': 1},
+    ]
+    rows = []
+    baseline = references
+    own_registry = registry is None
+    registry = ModelRegistry(max_models=1) if own_registry else registry
+    try:
+        for configuration in configurations:
+            engine = OfflineEngine(registry, **configuration)
+            translations = engine.translate(texts, source_lang, target_lang, batch_size)  # also loads the model
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                engine.translate(texts, source_lang, target_lang, batch_size)
+                timings.append(time.perf_counter() - start)
+            if baseline is None:
+                baseline = translations
+
+            seconds = min(timings) if timings else 0.0
+            rows.append({
+                **engine.settings(),
+                'seconds': seconds,
+                'texts_per_second': len(texts) / seconds if seconds else 0.0,
+                'similarity': sum(similarity(t, r) for t, r in zip(translations, baseline)) / len(texts) if texts else 0.0,
+                'exact_match': sum(t == r for t, r in zip(translations, baseline)) / len(texts) if texts else 0.0,
+            })
+            logger.info("%s: %.2fs, similarity %.3f", configuration, seconds, rows[-1]['similarity'])
+    finally:
+        if own_registry:
+            registry.clear()
+    return rows
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Compare offline MarianMT settings for latency and quality.')
+    parser.add_argument('texts', help='File with one source sentence per line.')
+    parser.add_argument('--source', default='ja', help='Source language code.')
+    parser.add_argument('--target', default='en', help='Target language code.')
+    parser.add_argument('--references', help='Optional file with one reference translation per line.')
+    parser.add_argument('--threads', type=int, default=None, help='Torch intra-op threads.')
+    parser.add_argument('--max-new-tokens', type=int, default=None, help='Longest translation in tokens.')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='Also write the comparison as JSON.')
+    args = parser.parse_args(argv)
+
+    with open(args.texts, encoding='utf-8') as file:
+        texts = [line.strip() for line in file if line.strip()]
+    references = None
+    if args.references:
+        with open(args.references, encoding='utf-8') as file:
+            references = [line.strip() for line in file if line.strip()]
+
+    shared = {'num_threads': args.threads, 'max_new_tokens': args.max_new_tokens}
+    configurations = [{**shared, **settings} for settings in (
+        {'quantize': False}, {'quantize': False, 'num_beams': 1}, {'quantize': True}, {'quantize': True, 'num_beams': 1})]
+    rows = compare_settings(texts, args.source, args.target, configurations, references, args.batch_size, args.repeats)
+
+    print(f"{'quantize':<10}{'beams':>7}{'seconds':>10}{'texts/s':>10}{'similarity':>12}{'exact':>8}")
+    for row in rows:
+        print(f"{str(row['quantize']):<10}{str(row['num_beams'] or 'default'):>7}{row['seconds']:>10.2f}"
+              f"{row['texts_per_second']:>10.1f}{row['similarity']:>12.3f}{row['exact_match']:>8.2f}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(rows, file, indent=2)
+
+
+# Settings used by text_translator's offline backend
+engine = OfflineEngine()
+
+if __name__ == '__main__':
+    main()
@@ -1,42 +1,206 @@
 import logging
+import threading
+import numpy as np
 from PIL import Image
-from caption_maker import *
+from caption_cache import CaptionCache, caption_cache
+from ocr_results import OCRResults
+import metrics
 
 
-def overlay_images_with_coordinates(primary_image, input_data) -> Image.Image:
+def premultiply(tile: np.ndarray, channels: int = 4) -> tuple:
     """
-    Overlays secondary images on a primary image based on specified coordinates.
-    
-    :param primary_image: The primary image object (PIL Image).
-    :param input_data: A dictionary containing sentences and their coordinates.
-    
-    :return: The updated primary image object.
+    Precompute the per-tile half of the alpha blend.
+
+    Args:
+        tile (np.ndarray): (h, w, 4) uint8 RGBA tile.
+        channels (int): Channels of the frames the tile is blended into (3 or 4).
+
+    Returns:
+        tuple: (color, inverse_alpha) contiguous (h, w, channels) uint16 arrays holding
+               `src * alpha + 128` and `255 - alpha`.
+    """
+    alpha = tile[..., 3:4].astype(np.uint16)
+    color = tile[..., :channels] * alpha
+    color += 128
+    inverse_alpha = np.repeat(255 - alpha, channels, axis=2)
+    return color, inverse_alpha
+
+def composite_tiles(buffer: np.ndarray, tiles) -> np.ndarray:
+    """
+    Alpha-blend caption tiles into an image buffer in place.
+
+    Tiles are clipped to the buffer, so OCR boxes reaching past the image edges are drawn partially
+    instead of failing. The blend is integer arithmetic on 16-bit temporaries and matches Pillow's
+    masked paste exactly: (src * a + dst * (255 - a) + 127) // 255, with the division done as
+    (v + (v >> 8)) >> 8 on v = src * a + dst * (255 - a) + 128.
+
+    Args:
+        buffer (np.ndarray): Writable (height, width, 3 or 4) uint8 image.
+        tiles: Iterable of (x, y, tile) placed at (x, y), where tile is a (h, w, 4) uint8 RGBA array
+               or the (color, inverse_alpha) planes returned by premultiply for this channel count.
+
+    Returns:
+        np.ndarray: The same buffer.
+    """
+    height, width, channels = buffer.shape
+    for x, y, tile in tiles:
+        color, inverse_alpha = premultiply(tile, channels) if isinstance(tile, np.ndarray) else tile
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + color.shape[1], width), min(y + color.shape[0], height)
+        if x1 >= x2 or y1 >= y2:
+            continue
+
+        target = buffer[y1:y2, x1:x2]
+        window = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+        blended = np.multiply(target, inverse_alpha[window], dtype=np.uint16)
+        blended += color[window]
+        blended += blended >> 8
+        blended >>= 8
+        np.copyto(target, blended, casting='unsafe')
+    return buffer
+
+def caption_tiles(sentences: list, channels: int = 3, cache: CaptionCache = caption_cache):
+    """
+    Yield the (x, y, planes) tile of every sentence, premultiplied for `channels`-channel frames.
+
+    Sentences without a 'cap img obj' get their caption from the caption cache, which keeps the
+    premultiplied planes with the tile; supplied caption images are converted and resized here.
+    `sentences` may also be an OCRResults, whose empty boxes are skipped in one vectorized pass.
     """
-    updated_image = primary_image.copy()
-    logging.info("Starting to overlay images on the primary image.")
+    if isinstance(sentences, OCRResults):
+        widths, heights = sentences.widths(), sentences.heights()
+        for index in np.flatnonzero((widths > 0) & (heights > 0)):
+            planes = cache.get_caption_planes(sentences.display_text(index), (int(widths[index]), int(heights[index])),
+                                              channels, language=sentences.languages[index])
+            yield int(sentences.boxes[index, 0]), int(sentences.boxes[index, 2]), planes
+        return
 
-    for sentence in input_data['sentences']:
-        secondary_image = sentence['cap img obj']
+    for sentence in sentences:
         coords = sentence['coordinates']
         width = coords['x2'] - coords['x1']
         height = coords['y2'] - coords['y1']
-        
-        # Ensure the secondary image is in RGBA mode
-        if secondary_image.mode != 'RGBA':
-            secondary_image = secondary_image.convert('RGBA')
+        if width <= 0 or height <= 0:
+            continue
+
+        secondary_image = sentence.get('cap img obj')
+        if secondary_image is None:
+            planes = cache.get_caption_planes(sentence['text'], (width, height), channels, language=sentence.get('language'))
+        else:
+            if secondary_image.mode != 'RGBA':
+                secondary_image = secondary_image.convert('RGBA')
+            if secondary_image.size != (width, height):
+                secondary_image = secondary_image.resize((width, height), Image.LANCZOS)
+            planes = premultiply(np.asarray(secondary_image), channels)
+        yield coords['x1'], coords['y1'], planes
+
+def _composite_image(image: Image.Image, tiles) -> Image.Image:
+    """
+    Blend tiles into a PIL image in place through one array round trip.
+
+    The frame is converted to an array once, every tile is blended by composite_tiles and the result
+    is pasted back, so each caption costs no more than on an array frame.
+    """
+    buffer = np.array(image)
+    composite_tiles(buffer, tiles)
+    image.paste(Image.fromarray(buffer, image.mode), (0, 0))
+    return image
 
-        # Resize the secondary image to fit the specified coordinates
-        resized_image = secondary_image.resize((width, height), Image.LANCZOS)
+def _channels(frame) -> int:
+    """Return the channel count of an array or an RGB/RGBA image."""
+    return frame.shape[2] if isinstance(frame, np.ndarray) else len(frame.mode)
 
-        x = coords['x1']
-        y = coords['y1']
-        
-        # Paste the resized secondary image onto the updated primary image
-        updated_image.paste(resized_image, (x, y), resized_image)
-        logging.info(f"Pasted image at coordinates: ({x}, {y}) with size: ({width}, {height})")
+def _writable_frame(frame, inplace: bool):
+    """Return the frame to draw on: the frame itself when allowed, otherwise a copy in a supported mode."""
+    if isinstance(frame, np.ndarray):
+        if frame.dtype != np.uint8 or frame.ndim != 3 or frame.shape[2] not in (3, 4):
+            raise ValueError(f"Expected a (height, width, 3 or 4) uint8 array, got {frame.dtype} {frame.shape}.")
+        return frame if inplace and frame.flags.writeable else frame.copy()
+    if frame.mode not in ('RGB', 'RGBA'):
+        return frame.convert('RGB')
+    return frame if inplace else frame.copy()
 
-    logging.info("Image overlay completed successfully.")
-    return updated_image
+
+class Compositor:
+    """
+    Composites caption tiles onto frames, recycling a small ring of output buffers.
+
+    A frame returned by `composite` is overwritten `buffers` calls later, so give the ring one
+    buffer per output that can still be in use downstream (e.g. queued for display).
+    """
+
+    def __init__(self, buffers: int = 2, cache: CaptionCache = caption_cache):
+        """
+        Args:
+            buffers (int): Output buffers kept and reused between frames.
+            cache (CaptionCache): Source of caption tiles.
+        """
+        self.buffers = max(1, buffers)
+        self.cache = cache
+        self._ring = [None] * self.buffers
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def _output_for(self, frame):
+        """Copy the frame into the next ring buffer, reallocating it only when the frame shape changes."""
+        with self._lock:
+            index = self._index
+            self._index = (self._index + 1) % self.buffers
+            output = self._ring[index]
+
+            if isinstance(frame, np.ndarray):
+                if isinstance(output, np.ndarray) and output.shape == frame.shape and output.dtype == frame.dtype:
+                    np.copyto(output, frame)
+                else:
+                    output = _writable_frame(frame, inplace=False)
+            elif frame.mode in ('RGB', 'RGBA') and isinstance(output, Image.Image) \
+                    and output.size == frame.size and output.mode == frame.mode:
+                output.paste(frame, (0, 0))
+            else:
+                output = _writable_frame(frame, inplace=False)
+
+            self._ring[index] = output
+            return output
+
+    def composite(self, frame, input_data, inplace: bool = False):
+        """
+        Overlay the captions of `input_data` on a frame.
+
+        Args:
+            frame: PIL image or (height, width, 3 or 4) uint8 array.
+            input_data: A dictionary with the sentences and their coordinates.
+            inplace (bool): Draw on the frame itself instead of a ring buffer.
+
+        Returns:
+            The composited frame, of the same type as `frame`.
+        """
+        output = _writable_frame(frame, inplace=True) if inplace else self._output_for(frame)
+        tiles = caption_tiles(input_data['sentences'], _channels(output), self.cache)
+        if isinstance(output, np.ndarray):
+            return composite_tiles(output, tiles)
+        return _composite_image(output, tiles)
+
+
+def overlay_images_with_coordinates(primary_image, input_data, inplace: bool = False, compositor: Compositor = None):
+    """
+    Overlays secondary images on a primary image based on specified coordinates.
+    
+    :param primary_image: The primary image object (PIL Image), or a (height, width, 3 or 4) uint8 array.
+    :param input_data: A dictionary containing sentences (a list of dicts or an OCRResults) and their
+                       coordinates. Sentences without a 'cap img obj' get their caption from the shared caption cache.
+    :param inplace: Draw on primary_image itself and skip the full-image copy.
+    :param compositor: Optional Compositor whose output buffers are reused between frames.
+    
+    :return: The updated primary image object, of the same type as primary_image.
+    """
+    with metrics.span('overlay'):
+        if compositor is not None:
+            return compositor.composite(primary_image, input_data, inplace)
+
+        output = _writable_frame(primary_image, inplace)
+        tiles = caption_tiles(input_data['sentences'], _channels(output))
+        if isinstance(output, np.ndarray):
+            return composite_tiles(output, tiles)
+        return _composite_image(output, tiles)
 
 def run(input_data):
     """
@@ -49,17 +213,7 @@ def run(input_data):
     logging.info("Loading primary image.")
     primary_img = Image.open('1.jpg')
 
-    secondary_images = []
-    for sentence in input_data['sentences']:
-        # Load secondary images (make sure these paths are correct)
-        text = sentence['text']
-        secondary_img1 = create_captioned_image(text)
-
-        # Append the secondary image to the list
-        sentence['cap img obj'] = secondary_img1  # Store the captioned image in the sentence dictionary
-        secondary_images.append(secondary_img1)
-
-    # Overlay images
+    # Overlay images; captions are rendered (or reused) from the caption cache while overlaying
     result_image = overlay_images_with_coordinates(primary_img, input_data)
 
     return result_image
@@ -0,0 +1,389 @@
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+from PIL import Image
+import extract_image_text
+import text_layout
+import text_translator
+import overlay_caption_on_image
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the frame stream as it travels through the stages
+STOP = object()
+
+
+class DropOldestQueue:
+    """
+    Bounded queue between two stages.
+
+    With `drop_oldest` set, putting into a full queue discards the oldest waiting frame instead
+    of blocking, so a slow stage always works on the most recent frame and latency stays bounded.
+    `on_drop`, if given, is called with each discarded frame.
+    """
+
+    def __init__(self, maxsize: int = 2, drop_oldest: bool = True, on_drop=None):
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self.drop_oldest = drop_oldest
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item):
+        """Add an item, dropping the oldest one first if the queue is full and dropping is enabled."""
+        if not self.drop_oldest or item is STOP:
+            self._queue.put(item)
+            return
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        dropped = self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        continue
+                    if self.on_drop is not None:
+                        self.on_drop(dropped)
+
+    def get(self):
+        """Remove and return the next item, blocking until one is available."""
+        return self._queue.get()
+
+
+class ImageFileSource:
+    """Frame source reading images from files, for headless runs."""
+
+    def __init__(self, paths):
+        """
+        Args:
+            paths: A directory, a glob pattern, or a list of image paths.
+        """
+        if isinstance(paths, str):
+            pattern = os.path.join(paths, '*') if os.path.isdir(paths) else paths
+            paths = sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+        self.paths = list(paths)
+        self._index = 0
+
+    def read(self):
+        """Return the next frame as a dict, or None when every file has been read."""
+        if self._index >= len(self.paths):
+            return None
+        path = self.paths[self._index]
+        self._index += 1
+        image = Image.open(path)
+        image.load()
+        return {'image': image.convert('RGB'), 'path': path}
+
+    def close(self):
+        pass
+
+
+class ScreenSource:
+    """
+    Frame source capturing a screen region.
+
+    The next capture waits until `update` provides the coordinates to capture, so the
+    display window can get out of the way first. A frame that never reaches the window is
+    handed back with `requeue`, otherwise the next capture would wait forever.
+    """
+
+    def __init__(self, coords: tuple):
+        """
+        Args:
+            coords (tuple): First region to capture as (x1, x2, y1, y2).
+        """
+        self._coords = queue.Queue()
+        self._coords.put(coords)
+        self._closed = threading.Event()
+
+    def update(self, coords: tuple):
+        """Queue the region for the next capture."""
+        self._coords.put(coords)
+
+    def requeue(self, frame: dict):
+        """Capture the region of a dropped or failed frame again."""
+        self._coords.put(frame['coords'])
+
+    def read(self):
+        """Capture the next region as a frame dict, or return None to end the stream."""
+        import screenshot_clicker
+
+        while not self._closed.is_set():
+            try:
+                coords = self._coords.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if coords is None or None in coords:
+                logger.warning("Invalid coordinates: None detected.")
+                return None
+
+            logger.info("Capturing screenshot with coordinates: %s", coords)
+            screenshot = screenshot_clicker.capture_screenshot(coords)
+            if screenshot is None:
+                return None
+            return {'image': screenshot, 'coords': coords}
+        return None
+
+    def close(self):
+        self._closed.set()
+
+
+class DirectorySink:
+    """Frame sink writing overlaid frames as PNG files."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, frame: dict):
+        """Save the overlaid image, named after its source file when there is one."""
+        if 'path' in frame:
+            name = os.path.splitext(os.path.basename(frame['path']))[0] + '.png'
+        else:
+            name = f"frame_{frame['index']:06d}.png"
+        frame['output'].save(os.path.join(self.output_dir, name))
+
+    def close(self):
+        pass
+
+
+class CallbackSink:
+    """Frame sink handing each finished frame to a function."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, frame: dict):
+        self.callback(frame)
+
+    def close(self):
+        pass
+
+
+class WindowSink:
+    """Frame sink showing each frame in a window and feeding the next region back to a ScreenSource."""
+
+    def __init__(self, source: ScreenSource):
+        self.source = source
+
+    def write(self, frame: dict):
+        import window_creator
+
+        coords = frame['coords']
+        click_position, coordinates = window_creator.show_image_in_window(frame['output'], coords[0] - 9, coords[2] - 38)
+        self.source.update(tuple(coordinates))
+
+    def close(self):
+        pass
+
+
+class Pipeline:
+    """
+    Capture -> OCR -> translate -> render -> sink engine with one thread per stage.
+
+    Stages are connected by bounded queues. Frames are dicts that each stage extends:
+    'index' and 'image' from capture, 'results' from OCR, translated 'text' fields from
+    translation, and 'output' (the overlaid image) from rendering.
+    """
+
+    def __init__(self, source, sink, ocr=None, target_language: str = 'en', queue_size: int = 2, drop_oldest: bool = True,
+                 stop_on_error: bool = False, client=None, merge_lines: bool = True, frame_cache=None,
+                 han_language: str = None):
+        """
+        Args:
+            source: Object with read() returning a frame dict (or None at the end) and close().
+            sink: Object with write(frame) and close().
+            ocr: Optional IncrementalOCR; full-frame OCR is used if None.
+            target_language (str): The target language code.
+            queue_size (int): Capacity of each queue between stages.
+            drop_oldest (bool): Drop the oldest queued frame when a stage falls behind. Disable
+                                for file sources where every frame must be processed.
+            stop_on_error (bool): End the stream when a stage fails instead of skipping the frame.
+            client: Optional translation_server.TranslationClient. OCR and translation then run on
+                    the server, where the models stay loaded, and `ocr` is ignored.
+            merge_lines (bool): Merge OCR fragments into lines and paragraphs before translation.
+            frame_cache: Optional frame_cache.FrameCache. Frames matching a stored screen skip OCR,
+                         translation and rendering.
+            han_language (str): Source language of ideograph-only text; None uses text_translator.HAN_LANGUAGE.
+        """
+        self.source = source
+        self.sink = sink
+        self.ocr = ocr
+        self.client = client
+        self.merge_lines = merge_lines
+        self.frame_cache = frame_cache
+        self.target_language = target_language
+        self.han_language = han_language
+        self.stop_on_error = stop_on_error
+
+        self.queues = {name: DropOldestQueue(queue_size, drop_oldest, on_drop=self._lost)
+                       for name in ('ocr', 'translate', 'render', 'sink')}
+        self.stage_seconds = {name: 0.0 for name in ('capture', 'ocr', 'translate', 'render', 'sink')}
+        self.frames_done = 0
+
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _capture(self):
+        index = 0
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                frame = self.source.read()
+                if frame is None:
+                    break
+                self.stage_seconds['capture'] += time.perf_counter() - start
+                frame['index'] = index
+                frame['captured_at'] = time.perf_counter()
+                index += 1
+                self.queues['ocr'].put(frame)
+        except Exception as err:
+            logger.error("Capture stage failed: %s", err)
+        finally:
+            self.queues['ocr'].put(STOP)
+
+    def _ocr(self, frame: dict) -> dict:
+        if self.frame_cache is not None:
+            # Hashed before rendering, which draws on the captured image
+            frame['frame_key'], hit = self.frame_cache.get(frame['image'])
+            if hit is not None:
+                frame['results'] = hit['results'].to_dicts()
+                frame['translated'] = True
+                frame['cached_output'] = hit['overlay']
+                frame['compute_seconds'] = hit['seconds']
+                frame['cached_render_seconds'] = hit['render_seconds']
+                return frame
+
+        if self.client is not None:
+            # The server returns translated results; the translate stage leaves them alone
+            frame['results'] = self.client.extract(frame['image'], self.target_language)
+            frame['translated'] = True
+        elif self.ocr is not None:
+            frame['results'] = self.ocr.process(frame['image'])
+        else:
+            frame['results'] = extract_image_text.extract_japanese_text(frame['image'])
+        if self.merge_lines and not frame.get('translated'):
+            frame['results'] = text_layout.merge_results(frame['results'])
+        return frame
+
+    def _translate(self, frame: dict) -> dict:
+        if frame.get('translated'):
+            return frame
+        text_translator.translate_results(frame['results'], self.target_language, han_language=self.han_language)
+        return frame
+
+    def _render(self, frame: dict) -> dict:
+        if frame.get('cached_output') is not None:
+            frame['output'] = frame['cached_output']
+            return frame
+
+        # The captured image is not used after this stage, so draw on it instead of copying it
+        start = time.perf_counter()
+        frame['output'] = overlay_caption_on_image.overlay_images_with_coordinates(frame['image'], {'sentences': frame['results']}, inplace=True)
+        if self.frame_cache is not None:
+            render_seconds = time.perf_counter() - start
+            if 'compute_seconds' in frame:
+                # Found on disk only: OCR and translation were skipped, rendering was redone
+                seconds = frame['compute_seconds'] - frame['cached_render_seconds'] + render_seconds
+            else:
+                seconds = time.perf_counter() - frame['captured_at']
+            self.frame_cache.put(frame['frame_key'], frame['results'], frame['output'], seconds, render_seconds)
+        return frame
+
+    def _sink(self, frame: dict) -> dict:
+        self.sink.write(frame)
+        self.frames_done += 1
+        frame['latency'] = time.perf_counter() - frame['captured_at']
+        return frame
+
+    def _lost(self, frame: dict):
+        """Hand a frame that will not reach the sink back to sources that wait for it, like ScreenSource."""
+        requeue = getattr(self.source, 'requeue', None)
+        if requeue is not None and not self._stop.is_set():
+            requeue(frame)
+
+    def _stage(self, name: str, function, inbox: DropOldestQueue, outbox: DropOldestQueue = None):
+        """Run one stage until the STOP marker arrives, then pass it on."""
+        while True:
+            frame = inbox.get()
+            if frame is STOP:
+                break
+            start = time.perf_counter()
+            try:
+                frame = function(frame)
+            except Exception as err:
+                metrics.increment(f'pipeline.{name}_errors')
+                logger.error("Stage %s failed on frame %s: %s", name, frame.get('index'), err)
+                if self.stop_on_error:
+                    self.stop()
+                else:
+                    self._lost(frame)
+                continue
+            elapsed = time.perf_counter() - start
+            self.stage_seconds[name] += elapsed
+            metrics.record(f'pipeline.{name}', elapsed)
+            if outbox is not None:
+                outbox.put(frame)
+        if outbox is not None:
+            outbox.put(STOP)
+
+    def start(self):
+        """Start every stage thread and return immediately."""
+        stages = [
+            ('ocr', self._ocr, self.queues['ocr'], self.queues['translate']),
+            ('translate', self._translate, self.queues['translate'], self.queues['render']),
+            ('render', self._render, self.queues['render'], self.queues['sink']),
+            ('sink', self._sink, self.queues['sink'], None),
+        ]
+        self._threads = [threading.Thread(target=self._capture, name='pipeline-capture', daemon=True)]
+        for name, function, inbox, outbox in stages:
+            self._threads.append(threading.Thread(target=self._stage, args=(name, function, inbox, outbox),
+                                                  name=f'pipeline-{name}', daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Ask the capture stage to end the stream; queued frames still drain through the stages."""
+        self._stop.set()
+        self.source.close()
+
+    def join(self, timeout: float = None):
+        """Wait for every stage to finish and close the sink."""
+        for thread in self._threads:
+            thread.join(timeout)
+        self.sink.close()
+
+    def run(self):
+        """Run the pipeline until the source is exhausted or stop() is called."""
+        self.start()
+        try:
+            self.join()
+        except KeyboardInterrupt:
+            self.stop()
+            self.join()
+        return self.stats()
+
+    def stats(self) -> dict:
+        """Return processed and dropped frame counts, the total seconds spent per stage and the frame cache stats."""
+        stats = {
+            'frames': self.frames_done,
+            'dropped': {name: q.dropped for name, q in self.queues.items()},
+            'stage_seconds': dict(self.stage_seconds),
+        }
+        if self.frame_cache is not None:
+            stats['frame_cache'] = self.frame_cache.stats()
+        return stats
+
+
+if __name__ == '__main__':
+    # Example usage: translate every image in a directory headlessly
+    metrics.setup_logging()
+    pipeline = Pipeline(ImageFileSource('images'), DirectorySink('translated'), drop_oldest=False)
+    print(pipeline.run())
@@ -0,0 +1,138 @@
+import logging
+import time
+import numpy as np
+from PIL import Image
+import extract_image_text
+import text_layout
+import text_translator
+import overlay_caption_on_image
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _group_area(group: list) -> int:
+    box = text_layout.union_box([item['coordinates'] for item in group])
+    return (box['x2'] - box['x1']) * (box['y2'] - box['y1'])
+
+# Sort keys for the order groups are finished in; groups arrive in reading order already
+ORDERS = {
+    'reading': None,
+    # Large text first: dialogue and titles before small print
+    'priority': lambda group: -_group_area(group),
+}
+
+
+def group_boxes(boxes: list, merge_lines: bool = True, order='reading') -> list:
+    """
+    Split detected boxes into the groups that are recognized, translated and drawn together.
+
+    Args:
+        boxes (list): Boxes or results with 'coordinates'.
+        merge_lines (bool): Group the boxes of a paragraph together so it is translated once, in
+                            context; otherwise every box is its own group.
+        order: 'reading' (top to bottom, left to right), 'priority' (largest first) or a sort key
+               taking a group.
+
+    Returns:
+        list: Groups as lists of boxes in reading order.
+    """
+    if merge_lines:
+        paragraphs = text_layout.group_paragraphs(text_layout.group_lines(boxes))
+        groups = [[box for line in paragraph for box in line['items']] for paragraph in paragraphs]
+    else:
+        groups = [[box] for box in sorted(boxes, key=lambda box: (box['coordinates']['y1'], box['coordinates']['x1']))]
+
+    key = ORDERS[order] if isinstance(order, str) else order
+    if key is not None:
+        groups.sort(key=key)
+    return groups
+
+def stream_overlays(image, languages: tuple = ('ja',), target_language: str = 'en', merge_lines: bool = True,
+                    order='reading', results: list = None, use_google: bool = True):
+    """
+    Translate an image group by group, yielding the overlay after every group.
+
+    Text is detected once over the whole image; each group of boxes (a paragraph, or a single box)
+    is then recognized, translated and drawn before the next one starts, so the first captions are
+    ready long before the last.
+
+    Args:
+        image: Pillow image or RGB uint8 array. It is not modified.
+        languages (tuple): OCR language codes.
+        target_language (str): The target language code.
+        merge_lines (bool): Translate whole paragraphs; see group_boxes.
+        order: Order the groups are finished in; see group_boxes.
+        results (list): Results already extracted (e.g. by IncrementalOCR); only translation and
+                        drawing are then streamed.
+        use_google (bool): Allow the online backend when connected.
+
+    Yields:
+        dict: Updates with 'image' (the overlay so far), 'results' (the items just drawn),
+              'box' (the region they cover, or None), 'done' and 'total' (groups) and 'elapsed'
+              (seconds since the call) and 'render_seconds' (of those, the seconds spent drawing).
+              The first update comes at once with the untouched image.
+              The same image object is updated in place; copy it to keep an intermediate state.
+    """
+    start = time.perf_counter()
+    if isinstance(image, np.ndarray):
+        frame = image.copy()
+    else:
+        frame = image.convert('RGB') if image.mode != 'RGB' else image.copy()
+    yield {'image': frame, 'results': [], 'box': None, 'done': 0, 'total': None, 'elapsed': time.perf_counter() - start,
+           'render_seconds': 0.0}
+
+    if results is None:
+        with metrics.span('stream.detect'):
+            items = extract_image_text.detect_text_boxes(image, languages)
+        grey = extract_image_text.to_grey(image) if items else None
+    else:
+        items = results
+    groups = group_boxes(items, merge_lines, order)
+
+    render_seconds = 0.0
+    for done, group in enumerate(groups, 1):
+        if results is None:
+            group = extract_image_text.recognize_boxes(image, group, languages, grey)
+        if merge_lines:
+            group = text_layout.merge_results(group)
+        text_translator.translate_results(group, target_language, use_google)
+        render_start = time.perf_counter()
+        overlay_caption_on_image.overlay_images_with_coordinates(frame, {'sentences': group}, inplace=True)
+        render_seconds += time.perf_counter() - render_start
+
+        elapsed = time.perf_counter() - start
+        if done == 1:
+            metrics.record('stream.first_caption', elapsed)
+        yield {
+            'image': frame,
+            'results': group,
+            'box': text_layout.union_box([item['coordinates'] for item in group]) if group else None,
+            'done': done,
+            'total': len(groups),
+            'elapsed': elapsed,
+            'render_seconds': render_seconds,
+        }
+
+    metrics.record('stream.frame', time.perf_counter() - start)
+    logger.info("Streamed %s caption group(s) in %.2fs.", len(groups), time.perf_counter() - start)
+
+def run(image, callback, **kwargs):
+    """
+    Callback form of stream_overlays: call `callback(update)` for every update.
+
+    Returns:
+        The finished overlay.
+    """
+    frame = None
+    for update in stream_overlays(image, **kwargs):
+        callback(update)
+        frame = update['image']
+    return frame
+
+
+if __name__ == '__main__':
+    # Example usage: print when each caption group of an image is ready
+    metrics.setup_logging()
+    final = run(Image.open('1.jpg'), lambda update: print(f"{update['done']}/{update['total']} at {update['elapsed']:.2f}s"))
+    final.show()
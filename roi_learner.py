@@ -0,0 +1,189 @@
+import logging
+import os
+import re
+import numpy as np
+from PIL import Image
+import extract_image_text
+from incremental_ocr import tile_regions, merge_regions
+
+logger = logging.getLogger(__name__)
+
+
+def active_window_profile(default: str = 'default') -> str:
+    """
+    Build a profile name from the title of the active window.
+
+    Args:
+        default (str): Name returned when the title cannot be read.
+
+    Returns:
+        str: A file-name-safe profile name.
+    """
+    try:
+        import pygetwindow
+        window = pygetwindow.getActiveWindow()
+        title = window.title if window is not None else ''
+    except Exception:
+        title = ''
+    name = re.sub(r'[^\w.-]+', '_', title).strip('_')[:80]
+    return name or default
+
+
+class RegionOfInterestOCR:
+    """
+    OCR restricted to the screen areas where text has appeared before.
+
+    Every OCR box adds heat to a coarse grid that covers the frame in relative coordinates,
+    so the map survives changes in capture size. Cells above `threshold` times the hottest
+    cell form the regions of interest and only those are read. A full-frame pass runs
+    every `rescan_interval` frames (and until the map has any heat) to discover new regions.
+    The map is saved per application/window profile.
+    """
+
+    def __init__(self, profile: str = None, profiles_dir: str = 'roi_profiles', grid_shape: tuple = (48, 64),
+                 threshold: float = 0.05, decay: float = 0.995, rescan_interval: int = 30, pad: int = 12,
+                 max_coverage: float = 0.7, save_interval: int = 50, languages: tuple = ('ja',)):
+        """
+        Args:
+            profile (str): Profile name; the active window title is used if None.
+            profiles_dir (str): Directory holding one .npz heatmap per profile.
+            grid_shape (tuple): (rows, cols) of the heatmap grid.
+            threshold (float): Fraction of the hottest cell's heat a cell needs to be a region of interest.
+            decay (float): Factor applied to the heatmap each frame so stale regions fade out.
+            rescan_interval (int): Run a full-frame pass every this many frames.
+            pad (int): Pixels added around each region before OCR.
+            max_coverage (float): Fall back to a full pass when regions cover more than this fraction of the frame.
+            save_interval (int): Save the profile every this many frames; 0 disables autosave.
+            languages (tuple): Language codes for the shared reader.
+        """
+        self.profile = profile or active_window_profile()
+        self.profiles_dir = profiles_dir
+        self.grid_shape = tuple(grid_shape)
+        self.threshold = threshold
+        self.decay = decay
+        self.rescan_interval = rescan_interval
+        self.pad = pad
+        self.max_coverage = max_coverage
+        self.save_interval = save_interval
+        self.languages = tuple(languages)
+
+        self.heatmap = np.zeros(self.grid_shape, dtype=np.float32)
+        self.frames = 0
+        self.full_passes = 0
+        self.pixels_scanned = 0
+        self.pixels_total = 0
+        self.load()
+
+    @property
+    def profile_path(self) -> str:
+        """Path of the .npz file holding this profile's heatmap."""
+        return os.path.join(self.profiles_dir, f'{self.profile}.npz')
+
+    def load(self) -> bool:
+        """
+        Load the saved heatmap for the profile, if there is one with a matching grid.
+
+        Returns:
+            bool: True if a saved map was loaded.
+        """
+        if not os.path.exists(self.profile_path):
+            return False
+        with np.load(self.profile_path) as data:
+            heatmap = data['heatmap']
+        if heatmap.shape != self.grid_shape:
+            return False
+        self.heatmap = heatmap.astype(np.float32)
+        logger.info("Loaded ROI profile '%s' from %s.", self.profile, self.profile_path)
+        return True
+
+    def save(self):
+        """Write the heatmap to the profile file."""
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        np.savez_compressed(self.profile_path, heatmap=self.heatmap)
+
+    def learn(self, results: list, frame_size: tuple):
+        """
+        Add the boxes of an OCR pass to the heatmap.
+
+        Args:
+            results (list): Results in the extract_japanese_text format.
+            frame_size (tuple): (width, height) of the frame the results belong to.
+        """
+        width, height = frame_size
+        rows, cols = self.grid_shape
+        self.heatmap *= self.decay
+        for item in results:
+            coords = item['coordinates']
+            c1 = int(np.clip(coords['x1'] * cols // max(1, width), 0, cols - 1))
+            c2 = int(np.clip(-(-coords['x2'] * cols // max(1, width)), c1 + 1, cols))
+            r1 = int(np.clip(coords['y1'] * rows // max(1, height), 0, rows - 1))
+            r2 = int(np.clip(-(-coords['y2'] * rows // max(1, height)), r1 + 1, rows))
+            self.heatmap[r1:r2, c1:c2] += 1.0
+
+    def regions(self, frame_size: tuple) -> list:
+        """
+        Return the learned regions of interest in pixel coordinates of a frame.
+
+        Args:
+            frame_size (tuple): (width, height) of the frame.
+
+        Returns:
+            list: Non-overlapping (x1, x2, y1, y2) rectangles clipped to the frame.
+        """
+        peak = float(self.heatmap.max())
+        if peak <= 0.0:
+            return []
+
+        width, height = frame_size
+        rows, cols = self.grid_shape
+        hot = self.heatmap >= self.threshold * peak
+
+        regions = []
+        for c1, c2, r1, r2 in tile_regions(hot):
+            regions.append((max(0, c1 * width // cols - self.pad), min(width, -(-c2 * width // cols) + self.pad),
+                            max(0, r1 * height // rows - self.pad), min(height, -(-r2 * height // rows) + self.pad)))
+        return merge_regions(regions)
+
+    def process(self, image: Image.Image) -> list:
+        """
+        OCR a frame, reading only the regions of interest except on periodic full rescans.
+
+        Args:
+            image (Image.Image): The current frame.
+
+        Returns:
+            list: Results in the same format as extract_image_text.extract_japanese_text.
+        """
+        width, height = image.size
+        regions = self.regions((width, height))
+        area = sum((x2 - x1) * (y2 - y1) for x1, x2, y1, y2 in regions)
+        full_pass = (not regions or self.frames % self.rescan_interval == 0
+                     or area > self.max_coverage * width * height)
+
+        if full_pass:
+            results = extract_image_text.extract_japanese_text(image, self.languages)
+            self.full_passes += 1
+            area = width * height
+        else:
+            results = extract_image_text.extract_text_in_regions(image, regions, self.languages)
+            logger.debug("ROI OCR: read %d region(s) covering %.0f%% of the frame.", len(regions), 100 * area / (width * height))
+
+        self.learn(results, (width, height))
+        self.frames += 1
+        self.pixels_scanned += area
+        self.pixels_total += width * height
+
+        if self.save_interval and self.frames % self.save_interval == 0:
+            self.save()
+        return results
+
+    def stats(self) -> dict:
+        """Return frame counts, the number of regions and the fraction of pixels sent to OCR."""
+        peak = float(self.heatmap.max())
+        return {
+            'profile': self.profile,
+            'frames': self.frames,
+            'full_passes': self.full_passes,
+            'regions': len(tile_regions(self.heatmap >= self.threshold * peak)) if peak > 0 else 0,
+            'scanned_fraction': self.pixels_scanned / self.pixels_total if self.pixels_total else 0.0,
+        }
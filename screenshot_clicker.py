@@ -1,11 +1,13 @@
 from PIL import Image
 import pyautogui
-import os
+import logging
+import metrics
+
+logger = logging.getLogger(__name__)
 
 
 def capture_screenshot(coords: tuple) -> Image.Image:
-    with open(os.path.basename(__file__).replace('.py', '.log'),'a') as file:
-        file.write(f"Received coordinates: {coords}")
+    logger.debug("Received coordinates: %s", coords)
     
     x1, x2, y1, y2 = coords
     # Calculate the width and height from the coordinates
@@ -14,20 +16,21 @@ def capture_screenshot(coords: tuple) -> Image.Image:
 
     try:
         # Capture the screenshot of the specific region
-        print(f"Capturing screenshot for region: (x1: {x1}, y1: {y1}, width: {width}, height: {height})")
-        screenshot = pyautogui.screenshot(region=(x1, y1, width, height))
+        logger.debug("Capturing screenshot for region: (x1: %s, y1: %s, width: %s, height: %s)", x1, y1, width, height)
+        with metrics.span('capture'):
+            screenshot = pyautogui.screenshot(region=(x1, y1, width, height))
 
-        # Convert the screenshot to a PIL Image object
-        img = screenshot.convert("RGB")
-        print("Screenshot captured successfully.")
+            # Convert the screenshot to a PIL Image object
+            img = screenshot.convert("RGB")
+        logger.debug("Screenshot captured successfully.")
         
         return img
     except Exception as e:
-        with open(os.path.basename(__file__).replace('.py', '.log'),'a') as file:
-            file.write(f"Failed to capture screenshot: {e}")
+        logger.error("Failed to capture screenshot: %s", e)
         return None
 
 if __name__ == '__main__':
+    metrics.setup_logging()
     # Example usage:
     # Capture an image between (100, 100) and (500, 400)
     region = (100, 500, 100, 400)  # (x1, x2, y1, y2)
@@ -36,5 +39,4 @@ if __name__ == '__main__':
     if image:
         image.show()  # Opens the captured image using the default viewer
     else:
-        with open(os.path.basename(__file__).replace('.py', '.log'),'a') as file:
-            file.write("Screenshot could not be displayed due to capture failure.")
+        logger.error("Screenshot could not be displayed due to capture failure.")
@@ -0,0 +1,109 @@
+import argparse
+import logging
+import subprocess
+import sys
+import threading
+import time
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up(languages: tuple = ('ja',), translation_pairs: tuple = (('ja', 'en'),), background: bool = True):
+    """
+    Load the OCR reader and the offline translation models ahead of the first request.
+
+    Heavy libraries are imported at first use, so the caller (e.g. the hotkey listener) is ready
+    at once while this runs; a request arriving early simply waits on the loads in progress.
+
+    Args:
+        languages (tuple): OCR language codes of the reader to load.
+        translation_pairs (tuple): (source, target) pairs of MarianMT models to load.
+        background (bool): Load on a daemon thread and return it; otherwise load before returning.
+
+    Returns:
+        threading.Thread | None: The warm-up thread, or None when loading synchronously.
+    """
+    def load():
+        import extract_image_text
+        from offline_engine import engine
+
+        start = time.perf_counter()
+        extract_image_text.warm_up_reader(languages, background=False)
+        for source_lang, target_lang in translation_pairs:
+            try:
+                engine.load(source_lang, target_lang)
+            except Exception as err:
+                logger.warning("Could not preload the %s-%s model: %s", source_lang, target_lang, err)
+        elapsed = time.perf_counter() - start
+        metrics.record('warm_up', elapsed)
+        logger.info("Models warmed up in %.2fs.", elapsed)
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def import_times(module: str = 'app', python: str = sys.executable) -> dict:
+    """
+    Measure how long importing a module takes in a fresh interpreter, broken down by package.
+
+    Runs `python -X importtime -c "import <module>"` and charges every imported module's own
+    time to its top-level package, so the per-package times add up to the total.
+
+    Args:
+        module (str): Module to import, e.g. 'app' or 'text_translator'.
+        python (str): Interpreter to run.
+
+    Returns:
+        dict: 'total_ms' (the module's cumulative import time), 'packages' as (package, ms, modules)
+              tuples from slowest to fastest, and 'error' with the import's stderr tail if it failed.
+    """
+    completed = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True)
+    packages = {}
+    total_us = 0
+    error_lines = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            error_lines.append(line)
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Column header
+        self_us, cumulative_us, name = int(fields[0]), int(fields[1]), fields[2].strip()
+        package = name.split('.')[0]
+        seconds, count = packages.get(package, (0, 0))
+        packages[package] = (seconds + self_us, count + 1)
+        if name == module:
+            total_us = cumulative_us
+
+    ranked = sorted(((package, us / 1000, count) for package, (us, count) in packages.items()), key=lambda row: -row[1])
+    report = {'total_ms': total_us / 1000, 'packages': ranked}
+    if completed.returncode != 0:
+        report['error'] = '\n'.join(error_lines[-5:])
+    return report
+
+def print_import_report(module: str = 'app', top: int = 15):
+    """Print the slowest packages imported by `module`."""
+    report = import_times(module)
+    print(f"import {module}: {report['total_ms']:.0f} ms")
+    print(f"{'package':<24}{'ms':>10}{'modules':>10}")
+    for package, milliseconds, count in report['packages'][:top]:
+        print(f"{package:<24}{milliseconds:>10.1f}{count:>10}")
+    if 'error' in report:
+        print(f"Import failed:\n{report['error']}")
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Report the import time of a module, by package.')
+    parser.add_argument('modules', nargs='*', default=['app'], help='Modules to import, e.g. app text_translator.')
+    parser.add_argument('--top', type=int, default=15, help='Packages listed per module.')
+    args = parser.parse_args(argv)
+    for module in args.modules:
+        print_import_report(module, args.top)
+        print()
+
+
+if __name__ == '__main__':
+    main()
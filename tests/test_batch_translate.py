@@ -0,0 +1,71 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import batch_translate
+import extract_image_text
+import text_translator
+from batch_translate import page_chunks, translation_failed
+
+
+def test_chunks_keep_whole_pages_within_the_budget():
+    pages = [{'path': name} for name in 'abcd']
+    results_by_path = {'a': [{'text': 'x' * 6}], 'b': [{'text': 'x' * 3}, {'text': 'x' * 2}], 'c': [{'text': 'x' * 12}], 'd': [{'text': 'x'}]}
+    chunks = page_chunks(pages, results_by_path, max_chars=10)
+    # 'c' alone is over the budget and still forms a chunk of its own
+    assert [[page['path'] for page in chunk] for chunk in chunks] == [['a'], ['b'], ['c'], ['d']]
+    assert [[page['path'] for page in chunk] for chunk in page_chunks(pages, results_by_path, max_chars=100)] == [list('abcd')]
+
+def test_unchanged_text_is_not_a_failure():
+    results = [{'text': 'Tanaka', 'original_text': 'Tanaka', 'source_language': 'ja'}]
+    assert not translation_failed(results, set())
+    assert translation_failed(results, {'Tanaka'})
+    assert translation_failed([{'text': ' ', 'original_text': 'こんにちは'}], set())
+
+def _fake_ocr_page(path, cache_path, languages, max_side=None):
+    results = [{'text': os.path.basename(path), 'coordinates': [[0, 0], [1, 0], [1, 1], [0, 1]]}]
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as file:
+        json.dump(results, file)
+    return path, results
+
+def _fake_render_page(path, results, image_path, json_path):
+    with open(json_path, 'w', encoding='utf-8') as file:
+        json.dump({'source': path, 'sentences': results}, file)
+    return path
+
+def test_failed_pages_are_retried_on_resume(monkeypatch, tmp_path):
+    for name in ('one', 'two', 'three'):
+        Image.new('RGB', (4, 4)).save(tmp_path / f'{name}.png')
+    output = tmp_path / 'out'
+    monkeypatch.setattr(batch_translate, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(extract_image_text, 'init_worker', lambda languages, threads: None)
+    monkeypatch.setattr(batch_translate, '_ocr_page', _fake_ocr_page)
+    monkeypatch.setattr(batch_translate, '_render_page', _fake_render_page)
+
+    calls, unavailable = [], {'two.png'}
+
+    def translate_results(results, target_language='en', USE_GOOGLE=True, han_language=None, failed=None):
+        calls.append([item['text'] for item in results])
+        for item in results:
+            item['original_text'] = item['text']
+            if item['text'] in unavailable:
+                failed.add(item['text'])
+            else:
+                item['text'] = item['text'].upper()
+        return results
+
+    monkeypatch.setattr(text_translator, 'translate_results', translate_results)
+    summary = batch_translate.translate_directory([str(tmp_path / '*.png')], str(output), workers=1, chunk_chars=7)
+    # One call per chunk of whole pages within seven characters
+    assert calls == [['one.png'], ['three.png'], ['two.png']]
+    assert (summary['pages'], summary['failed']) == (2, 1)
+    assert not (output / 'two.json').exists()
+
+    calls.clear()
+    unavailable.clear()
+    summary = batch_translate.translate_directory([str(tmp_path / '*.png')], str(output), workers=1, chunk_chars=7)
+    # Only the failed page is translated again, from its cached OCR results
+    assert calls == [['two.png']]
+    assert (summary['pages'], summary['skipped'], summary['failed']) == (1, 2, 0)
+    assert json.loads((output / 'two.json').read_text())['sentences'][0]['text'] == 'TWO.PNG'
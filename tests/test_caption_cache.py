@@ -0,0 +1,42 @@
+from PIL import Image
+from caption_cache import CaptionCache
+
+FONT = 'no-such-font.ttf'
+
+
+def tile(width: int, height: int) -> Image.Image:
+    return Image.new('RGBA', (width, height))
+
+def test_repeated_captions_are_rendered_once():
+    cache = CaptionCache()
+    first = cache.get_caption('Hello', (80, 30), font_path=FONT)
+    assert first.size == (80, 30) and first.mode == 'RGBA'
+    assert cache.get_caption('Hello', (80, 30), font_path=FONT) is first
+    assert cache.get_caption('Hello', (81, 30), font_path=FONT) is not first
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 2)
+
+def test_least_recently_used_tiles_are_evicted_past_the_budget():
+    cache = CaptionCache(max_bytes=2 * CaptionCache.tile_bytes(tile(10, 10)))
+    a = cache.get_caption('a', (10, 10), font_path=FONT)
+    cache.get_caption('b', (10, 10), font_path=FONT)
+    assert cache.get_caption('a', (10, 10), font_path=FONT) is a  # 'b' is now the least recently used
+    cache.get_caption('c', (10, 10), font_path=FONT)
+
+    stats = cache.stats()
+    assert (stats['entries'], stats['evictions'], stats['bytes']) == (2, 1, stats['max_bytes'])
+    assert cache.get_caption('a', (10, 10), font_path=FONT) is a
+    misses = cache.stats()['misses']
+    cache.get_caption('b', (10, 10), font_path=FONT)
+    assert cache.stats()['misses'] == misses + 1
+
+def test_tiles_larger_than_the_budget_are_not_cached():
+    cache = CaptionCache(max_bytes=100)
+    cache.put('big', tile(10, 10))
+    assert cache.stats()['entries'] == 0
+
+def test_replacing_a_key_does_not_count_twice():
+    cache = CaptionCache()
+    cache.put('a', tile(10, 10))
+    cache.put('a', tile(20, 10))
+    assert cache.stats()['bytes'] == CaptionCache.tile_bytes(tile(20, 10))
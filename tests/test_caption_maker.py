@@ -0,0 +1,47 @@
+import pytest
+from caption_maker import MIN_FONT_SIZE, fit_text_to_box, load_font, wrap_text
+
+# Missing font files fall back to Pillow's scalable default font, so the tests need no fonts installed
+FONT = 'no-such-font.ttf'
+
+
+def fits(font, lines, line_height, box_width, box_height, margins=(0.1, 0.3, 0.1, 0.1), line_spacing=0.1):
+    top, bottom, left, right = margins
+    inner_width = box_width - int(font.size * (left + right))
+    inner_height = box_height - int(font.size * (top + bottom))
+    block_height = line_height * len(lines) + int(font.size * line_spacing) * (len(lines) - 1)
+    return block_height <= inner_height and all(font.getlength(line) <= inner_width for line in lines)
+
+@pytest.mark.parametrize('text, box', [
+    ('Hello there, how are you doing today?', (300, 80)),
+    ('A short one', (120, 40)),
+    ('こんにちは、今日はいい天気ですね', (160, 90)),
+])
+def test_chosen_size_fits_and_the_next_does_not(text, box):
+    font, lines, line_height = fit_text_to_box(text, FONT, *box)
+    assert fits(font, lines, line_height, *box)
+    assert ''.join(lines).replace(' ', '') == text.replace(' ', '')
+
+    # One size up no longer fits, so the search found the largest size
+    larger = load_font(FONT, font.size + 1)
+    bbox = larger.getbbox('Hg国')
+    inner_width = box[0] - int((font.size + 1) * 0.2)
+    larger_lines = wrap_text(text, larger, inner_width)
+    assert not fits(larger, larger_lines, bbox[3] - bbox[1], *box)
+
+def test_larger_boxes_never_get_smaller_fonts():
+    text = 'The quick brown fox jumps over the lazy dog'
+    sizes = [fit_text_to_box(text, FONT, width, 100)[0].size for width in (80, 160, 320, 640)]
+    assert sizes == sorted(sizes)
+
+def test_text_that_never_fits_uses_the_smallest_size():
+    font, lines, _ = fit_text_to_box('word ' * 200, FONT, 40, 12)
+    assert font.size == MIN_FONT_SIZE
+    assert lines
+
+def test_wrap_text_splits_words_or_characters():
+    font = load_font(FONT, 20)
+    width = font.getlength('hello world') - 1
+    assert wrap_text('hello world again', font, width) == ['hello', 'world', 'again']
+    assert ''.join(wrap_text('日本語のテキスト', font, font.getlength('日本語'))) == '日本語のテキスト'
+    assert wrap_text('unbreakable word', font, 5) == ['unbreakable', 'word']
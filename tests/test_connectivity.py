@@ -0,0 +1,61 @@
+import socket
+import time
+import pytest
+from connectivity import ConnectivityMonitor
+
+
+@pytest.fixture
+def server():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(8)
+    yield listener
+    listener.close()
+
+def closed_port() -> int:
+    """Return a local port nothing listens on."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+def test_online_when_the_target_accepts(server):
+    monitor = ConnectivityMonitor('127.0.0.1', server.getsockname()[1], timeout=1.0)
+    assert monitor.is_online()
+    assert monitor.state()['failures'] == 0
+
+def test_cached_state_is_reused_within_ttl(server):
+    monitor = ConnectivityMonitor('127.0.0.1', server.getsockname()[1], timeout=1.0, ttl=60.0)
+    assert monitor.is_online()
+    server.close()
+    # The probe result is trusted for ttl seconds, so the closed server is not noticed yet
+    assert monitor.is_online()
+
+def test_breaker_opens_and_recovers_after_cooldown(server):
+    port = closed_port()
+    monitor = ConnectivityMonitor('127.0.0.1', port, timeout=1.0, cooldown=0.2)
+    assert not monitor.is_online()
+    assert monitor.state()['breaker_open']
+
+    monitor.configure(port=server.getsockname()[1])
+    assert monitor.is_online()
+
+    monitor.record_failure()
+    assert not monitor.is_online()
+    time.sleep(0.3)
+    # The cooldown is over: the next call probes again and finds the server
+    assert monitor.is_online()
+    assert not monitor.state()['breaker_open']
+
+def test_failure_threshold_counts_reported_failures(server):
+    monitor = ConnectivityMonitor('127.0.0.1', server.getsockname()[1], timeout=1.0, failure_threshold=2)
+    assert monitor.is_online()
+    monitor.record_failure()
+    assert not monitor.state()['breaker_open']
+    monitor.record_failure()
+    assert monitor.state()['breaker_open']
+    monitor.record_success()
+    assert monitor.is_online()
+
+def test_unknown_setting_is_rejected():
+    with pytest.raises(ValueError):
+        ConnectivityMonitor().configure(retries=3)
@@ -0,0 +1,36 @@
+import sys
+import types
+import numpy as np
+import extract_image_text
+
+
+class FakeReader:
+    """Stands in for easyocr.Reader: detects one box and records what recognize is given."""
+
+    def __init__(self, languages):
+        self.detected, self.recognized = [], []
+
+    def detect(self, image):
+        self.detected.append(image.shape)
+        return [[[10, 20, 5, 15]]], [[]]
+
+    def recognize(self, grey, horizontal_list, free_list):
+        self.recognized.append((grey, horizontal_list))
+        x1, x2, y1, y2 = horizontal_list[0]
+        return [([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], 'テスト', 0.9)]
+
+
+def test_two_pass_detects_small_and_recognizes_the_grey_frame(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'easyocr', types.SimpleNamespace(Reader=FakeReader))
+    for name in ('_readers', '_reader_locks', '_reader_stats'):
+        monkeypatch.setattr(extract_image_text, name, {})
+
+    frame = np.zeros((400, 800, 3), dtype=np.uint8)
+    results = extract_image_text.extract_japanese_text(frame, max_side=200)
+    reader = extract_image_text.get_reader(('ja',))
+    assert reader.detected == [(100, 200, 3)]
+    grey, horizontal_list = reader.recognized[0]
+    assert grey.shape == (400, 800)
+    # Boxes come back in full-resolution pixels, widened by one detection pixel
+    assert horizontal_list == [[36, 84, 16, 64]]
+    assert results[0]['coordinates'] == {'x1': 36, 'x2': 84, 'y1': 16, 'y2': 64}
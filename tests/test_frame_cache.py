@@ -0,0 +1,78 @@
+import sqlite3
+import numpy as np
+from PIL import Image
+from frame_cache import FrameCache, dhash, hamming
+
+RESULTS = [{'text': 'Hello', 'original_text': 'こんにちは', 'coordinates': {'x1': 10, 'x2': 90, 'y1': 10, 'y2': 30},
+            'confidence': 0.9, 'source_language': 'ja', 'language': 'en'}]
+
+
+def screen() -> Image.Image:
+    """A steep left-to-right gradient: every dHash bit is set with a wide margin."""
+    row = np.linspace(20, 235, 1280).astype(np.uint8)
+    return Image.fromarray(np.repeat(np.repeat(row[None, :, None], 720, axis=0), 3, axis=2))
+
+def with_new_line(image: Image.Image) -> Image.Image:
+    """The same screen with one short dark line of text added."""
+    pixels = np.array(image)
+    pixels[600:608, 500:520] = 0
+    return Image.fromarray(pixels)
+
+def test_identical_frame_hits():
+    cache = FrameCache()
+    key, hit = cache.get(screen())
+    assert hit is None
+    overlay = screen()
+    cache.put(key, RESULTS, overlay, 1.0, 0.25)
+
+    _, hit = cache.get(screen())
+    assert hit is not None
+    assert hit['results'].to_dicts()[0]['text'] == 'Hello'
+    assert hit['overlay'] is not overlay and hit['overlay'].size == overlay.size
+    assert cache.stats()['hits'] == 1 and cache.stats()['saved_seconds'] > 0.9
+
+def test_same_hash_with_a_changed_tile_misses():
+    changed = with_new_line(screen())
+    assert hamming(dhash(screen()), dhash(changed)) == 0
+
+    cache = FrameCache(tolerance=2)
+    key, _ = cache.get(screen())
+    cache.put(key, RESULTS, screen(), 1.0)
+    _, hit = cache.get(changed)
+    assert hit is None
+    assert cache.stats()['rejected'] == 1
+
+def test_disk_tier_round_trips_and_counts_only_skipped_work(tmp_path):
+    path = str(tmp_path / 'frames.sqlite3')
+    cache = FrameCache(path=path)
+    key, _ = cache.get(screen())
+    cache.put(key, RESULTS, screen(), 1.0, 0.25)
+    cache.close()
+
+    reopened = FrameCache(path=path)
+    assert reopened.stats()['disk_entries'] == 1
+    _, hit = reopened.get(screen())
+    assert hit['overlay'] is None  # overlays are not persisted
+    assert hit['results'].to_dicts()[0]['original_text'] == 'こんにちは'
+    assert (hit['seconds'], hit['render_seconds']) == (1.0, 0.25)
+    # Rendering still has to run, so only OCR and translation count as saved
+    assert reopened.stats()['saved_seconds'] <= 0.75
+    assert reopened.get(with_new_line(screen()))[1] is None
+    reopened.close()
+
+def test_files_without_thumbnails_are_discarded(tmp_path):
+    path = str(tmp_path / 'frames.sqlite3')
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            'CREATE TABLE frames (width INTEGER NOT NULL, height INTEGER NOT NULL, hash TEXT NOT NULL,'
+            ' results BLOB NOT NULL, seconds REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (width, height, hash))')
+        connection.execute('INSERT INTO frames VALUES (1280, 720, ?, ?, 1.0, 0.0)', (format(dhash(screen()), 'x'), b''))
+    connection.close()
+
+    cache = FrameCache(path=path)
+    assert cache.stats()['disk_entries'] == 0
+    assert cache.get(screen())[1] is None
+    key, _ = cache.get(screen())
+    cache.put(key, RESULTS, screen(), 1.0)
+    assert cache.stats()['disk_entries'] == 1
+    cache.close()
@@ -0,0 +1,68 @@
+import numpy as np
+from PIL import Image
+import extract_image_text
+from incremental_ocr import IncrementalOCR, changed_tiles, merge_regions, tile_regions
+
+
+def test_changed_tiles_marks_only_tiles_above_the_threshold():
+    previous = np.zeros((64, 96), dtype=np.uint8)
+    current = previous.copy()
+    current[5, 40] = 200          # tile (0, 1)
+    current[40:44, 70:72] = 20    # below the threshold
+    current[63, 95] = 25          # tile (1, 2), the last pixel
+    dirty = changed_tiles(previous, current, tile_size=32, threshold=24)
+    assert dirty.tolist() == [[False, True, False], [False, False, True]]
+
+def test_changed_tiles_pads_partial_tiles():
+    previous = np.zeros((50, 50), dtype=np.uint8)
+    current = previous.copy()
+    current[49, 49] = 255
+    assert changed_tiles(previous, current, tile_size=32).shape == (2, 2)
+    assert changed_tiles(previous, current, tile_size=32)[1, 1]
+
+def test_tile_regions_groups_connected_tiles():
+    dirty = np.zeros((4, 5), dtype=bool)
+    dirty[0, 0] = dirty[0, 1] = dirty[1, 1] = True   # an L shape
+    dirty[3, 4] = True
+    assert sorted(tile_regions(dirty)) == [(0, 2, 0, 2), (4, 5, 3, 4)]
+
+def test_merge_regions_until_nothing_overlaps():
+    regions = [(0, 10, 0, 10), (5, 15, 5, 15), (14, 20, 14, 20), (30, 40, 0, 5)]
+    assert sorted(merge_regions(regions)) == [(0, 20, 0, 20), (30, 40, 0, 5)]
+    # Touching edges do not overlap
+    assert sorted(merge_regions([(0, 10, 0, 10), (10, 20, 0, 10)])) == [(0, 10, 0, 10), (10, 20, 0, 10)]
+
+def box(text, x1, x2, y1, y2):
+    return {'text': text, 'coordinates': {'x1': x1, 'x2': x2, 'y1': y1, 'y2': y2}, 'confidence': 0.9}
+
+def test_only_changed_regions_are_read_again(monkeypatch):
+    full, regional = [], []
+    monkeypatch.setattr(extract_image_text, 'extract_japanese_text',
+                        lambda image, languages=('ja',): full.append(image) or [box('old', 10, 60, 10, 30), box('kept', 200, 260, 200, 220)])
+    monkeypatch.setattr(extract_image_text, 'extract_text_in_regions',
+                        lambda image, regions, languages=('ja',): regional.append(regions) or [box('new', 10, 70, 10, 30)])
+
+    ocr = IncrementalOCR(tile_size=32, pad=4)
+    frame = np.zeros((256, 320), dtype=np.uint8)
+    ocr.process(Image.fromarray(frame))
+    assert len(full) == 1
+
+    frame[15:25, 40:50] = 255  # inside the first box only
+    results = ocr.process(Image.fromarray(frame))
+    assert len(full) == 1 and len(regional) == 1
+    region = regional[0][0]
+    # The dirty tile is grown over the whole previous box it touches
+    assert region[0] <= 10 and region[1] >= 60 and region[2] <= 10 and region[3] >= 30
+    assert sorted(item['text'] for item in results) == ['kept', 'new']
+
+def test_large_changes_fall_back_to_a_full_pass(monkeypatch):
+    calls = []
+    monkeypatch.setattr(extract_image_text, 'extract_japanese_text', lambda image, languages=('ja',): calls.append('full') or [])
+    monkeypatch.setattr(extract_image_text, 'extract_text_in_regions', lambda image, regions, languages=('ja',): calls.append('regions') or [])
+
+    ocr = IncrementalOCR(full_rescan_ratio=0.5)
+    ocr.process(Image.new('L', (128, 128), 0))
+    ocr.process(Image.new('L', (128, 128), 255))
+    ocr.process(Image.new('L', (128, 128), 255))
+    ocr.process(Image.new('L', (64, 64), 255))   # a new size has no previous frame to diff
+    assert calls == ['full', 'full', 'regions', 'full']
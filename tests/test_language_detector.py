@@ -0,0 +1,37 @@
+import pytest
+from language_detector import UNKNOWN_LANGUAGE, char_script, detect_language, script_counts
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('こんにちは', 'ja'),
+    ('カタカナ', 'ja'),
+    ('ｶﾀｶﾅ', 'ja'),
+    ('今日は雨です', 'ja'),      # kanji with kana
+    ('안녕하세요', 'ko'),
+    ('漢字と한글', 'ja'),        # any kana wins
+    ('韓國語한국어', 'ko'),
+    ('Καλημέρα', 'el'),
+    ('שלום', 'he'),
+    ('สวัสดี', 'th'),
+])
+def test_script_decides_the_language(text, expected):
+    assert detect_language(text) == expected
+
+def test_han_only_text_follows_the_reader_language():
+    assert detect_language('東京大学') == 'ja'
+    assert detect_language('東京大学', han_language='zh-cn') == 'zh-cn'
+
+@pytest.mark.parametrize('text', ['', '12345', '99/99', '!?…', '   '])
+def test_text_without_letters_is_unknown(text):
+    assert detect_language(text) == UNKNOWN_LANGUAGE
+
+def test_latin_text_goes_to_langdetect():
+    pytest.importorskip('langdetect')
+    assert detect_language('This is a sentence written in English.') == 'en'
+
+def test_char_script():
+    assert char_script('あ') == 'kana'
+    assert char_script('字') == 'han'
+    assert char_script('Ａ') == 'latin'
+    assert char_script('7') is None
+    assert script_counts('ABCあい1') == {'latin': 3, 'kana': 2}
@@ -0,0 +1,132 @@
+import os
+import pickle
+import sys
+import threading
+import time
+import types
+import pytest
+from model_registry import ModelRegistry
+
+
+class FakeRegistry(ModelRegistry):
+    """Loads placeholder models; the first `failures` loads raise like a failed download."""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.delay = delay
+        self.loads = 0
+
+    def _load(self, key: str, quantize: bool) -> tuple:
+        self.loads += 1
+        time.sleep(self.delay)
+        if self.loads <= self.failures:
+            raise OSError(f'could not download {key}')
+        return ('tokenizer', f'model:{key}')
+
+
+def test_failed_load_raises_and_is_retried():
+    registry = FakeRegistry(failures=1)
+    with pytest.raises(OSError):
+        registry.get('ja', 'en')
+    assert registry._loading == {}
+    assert registry.loaded() == []
+
+    assert registry.get('ja', 'en') == ('tokenizer', 'model:opus-mt-ja-en')
+    assert registry.loaded() == ['opus-mt-ja-en']
+    assert registry.loads == 2
+
+def test_every_waiting_caller_sees_the_failure():
+    registry = FakeRegistry(failures=3, delay=0.05)
+    errors = []
+
+    def get():
+        try:
+            registry.get('ja', 'en')
+        except OSError as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=get) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert len(errors) == 3
+    assert registry._loading == {}
+    assert registry.get('ja', 'en') == ('tokenizer', 'model:opus-mt-ja-en')
+
+def test_concurrent_callers_share_one_load():
+    registry = FakeRegistry(delay=0.05)
+    threads = [threading.Thread(target=registry.get, args=('ja', 'en')) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert registry.loads == 1
+    assert registry._loading == {}
+
+def test_least_recently_used_unpinned_model_is_evicted():
+    registry = FakeRegistry(max_models=2)
+    registry.pin('ja', 'en')
+    for source in ('ja', 'zh', 'ko'):
+        registry.get(source, 'en')
+    assert registry.loaded() == ['opus-mt-ja-en', 'opus-mt-ko-en']
+
+class FakeMarianMTModel:
+    conversions = 0
+
+    @classmethod
+    def from_pretrained(cls, name):
+        return cls()
+
+    def eval(self):
+        return self
+
+
+def fake_quantization_modules(monkeypatch, commit_hash: str, transformers_version: str = '4.40.0'):
+    """Install torch and transformers stand-ins that pickle models and count conversions."""
+    def quantize_dynamic(model, layers, dtype):
+        FakeMarianMTModel.conversions += 1
+        return model
+
+    def load(path, weights_only=True):
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    def save(model, path):
+        with open(path, 'wb') as file:
+            pickle.dump(model, file)
+
+    torch = types.SimpleNamespace(__version__='2.3.0', load=load, save=save, nn=types.SimpleNamespace(Linear=object), qint8='qint8',
+                                  ao=types.SimpleNamespace(quantization=types.SimpleNamespace(quantize_dynamic=quantize_dynamic)))
+    config = types.SimpleNamespace(_commit_hash=commit_hash)
+    transformers = types.SimpleNamespace(__version__=transformers_version, MarianMTModel=FakeMarianMTModel,
+                                         AutoConfig=types.SimpleNamespace(from_pretrained=lambda name: config))
+    monkeypatch.setitem(sys.modules, 'torch', torch)
+    monkeypatch.setitem(sys.modules, 'transformers', transformers)
+
+def test_quantized_models_are_keyed_by_revision_and_versions(monkeypatch, tmp_path):
+    FakeMarianMTModel.conversions = 0
+    registry = ModelRegistry(quantized_dir=str(tmp_path))
+    fake_quantization_modules(monkeypatch, 'abc123')
+    registry._load_quantized('opus-mt-ja-en', 'Helsinki-NLP/opus-mt-ja-en')
+    registry._load_quantized('opus-mt-ja-en', 'Helsinki-NLP/opus-mt-ja-en')
+    assert FakeMarianMTModel.conversions == 1
+    assert os.listdir(tmp_path) == ['opus-mt-ja-en@abc123-torch2.3.0-transformers4.40.0.pt']
+
+    # New weights on the hub: converted again, and the stale file is removed
+    fake_quantization_modules(monkeypatch, 'def456')
+    registry._load_quantized('opus-mt-ja-en', 'Helsinki-NLP/opus-mt-ja-en')
+    assert FakeMarianMTModel.conversions == 2
+    assert os.listdir(tmp_path) == ['opus-mt-ja-en@def456-torch2.3.0-transformers4.40.0.pt']
+
+def test_unreadable_quantized_model_is_converted_again(monkeypatch, tmp_path):
+    FakeMarianMTModel.conversions = 0
+    registry = ModelRegistry(quantized_dir=str(tmp_path))
+    fake_quantization_modules(monkeypatch, 'abc123')
+    path = tmp_path / 'opus-mt-ja-en@abc123-torch2.3.0-transformers4.40.0.pt'
+    path.write_bytes(b'not a pickle')
+    assert isinstance(registry._load_quantized('opus-mt-ja-en', 'Helsinki-NLP/opus-mt-ja-en'), FakeMarianMTModel)
+    assert FakeMarianMTModel.conversions == 1
+    with open(path, 'rb') as file:
+        assert isinstance(pickle.load(file), FakeMarianMTModel)
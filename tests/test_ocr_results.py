@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from ocr_results import OCRResults
+
+
+def sample() -> OCRResults:
+    results = OCRResults(
+        [[10, 90, 5, 25], [0, 40, 30, 50], [100, 180, 60, 75]],
+        [0.9, 0.25, 0.75],
+        ['こんにちは', '', '「元気？」'],
+    )
+    results.set_translations(['Hello', '', '"How are you?"'], ['ja', 'Could not detect the language', 'ja'], 'en')
+    return results
+
+def assert_same(first: OCRResults, second: OCRResults):
+    np.testing.assert_array_equal(first.boxes, second.boxes)
+    np.testing.assert_array_equal(first.confidences, second.confidences)
+    assert first.texts == second.texts
+    assert first.translations == second.translations
+    assert first.source_languages == second.source_languages
+    assert first.languages == second.languages
+
+def test_bytes_round_trip():
+    results = sample()
+    restored = OCRResults.from_bytes(results.to_bytes())
+    assert_same(results, restored)
+    assert restored.boxes.dtype == np.int32 and restored.confidences.dtype == np.float32
+    # The arrays are copies, not read-only views of the serialized data
+    assert restored.boxes.flags.writeable and restored.confidences.flags.writeable
+
+def test_untranslated_and_empty_round_trip():
+    for results in (OCRResults(), OCRResults([[1, 2, 3, 4]], [0.5], ['text'])):
+        assert_same(results, OCRResults.from_bytes(results.to_bytes()))
+        assert_same(results, OCRResults.from_json(results.to_json()))
+
+def test_from_bytes_accepts_memoryview():
+    results = sample()
+    assert_same(results, OCRResults.from_bytes(memoryview(results.to_bytes())))
+
+@pytest.mark.parametrize('data', [b'', b'OCRR', b'XXXX' + bytes(16)])
+def test_from_bytes_rejects_other_data(data):
+    with pytest.raises(ValueError):
+        OCRResults.from_bytes(data)
+
+def test_dicts_round_trip():
+    results = sample()
+    assert_same(results, OCRResults.from_dicts(results.to_dicts()))
+    assert results.to_dicts()[0] == {
+        'text': 'Hello',
+        'coordinates': {'x1': 10, 'x2': 90, 'y1': 5, 'y2': 25},
+        'confidence': pytest.approx(0.9),
+        'original_text': 'こんにちは',
+        'source_language': 'ja',
+        'language': 'en',
+    }
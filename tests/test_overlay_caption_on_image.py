@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from PIL import Image
+from overlay_caption_on_image import _composite_image, composite_tiles, premultiply
+
+
+def random_tile(rng, height: int, width: int) -> np.ndarray:
+    tile = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+    # Fully transparent and fully opaque pixels are the common cases in captions
+    tile[0, :, 3] = 0
+    tile[-1, :, 3] = 255
+    return tile
+
+def pillow_paste(buffer: np.ndarray, placements: list) -> np.ndarray:
+    image = Image.fromarray(buffer)
+    for x, y, tile in placements:
+        overlay = Image.fromarray(tile, 'RGBA')
+        image.paste(overlay, (x, y), overlay)
+    return np.asarray(image)
+
+@pytest.mark.parametrize('mode', ['RGB', 'RGBA'])
+def test_matches_pillow_masked_paste(mode):
+    rng = np.random.default_rng(0)
+    channels = len(mode)
+    buffer = rng.integers(0, 256, (60, 80, channels), dtype=np.uint8)
+    # Inside, overlapping each other, and reaching past every edge
+    placements = [(5, 5, random_tile(rng, 20, 30)), (20, 10, random_tile(rng, 25, 25)),
+                  (-10, -5, random_tile(rng, 15, 20)), (70, 50, random_tile(rng, 20, 20))]
+
+    expected = pillow_paste(buffer, placements)
+    result = composite_tiles(buffer.copy(), placements)
+    np.testing.assert_array_equal(result, expected)
+
+def test_premultiplied_planes_match_raw_tiles():
+    rng = np.random.default_rng(1)
+    buffer = rng.integers(0, 256, (40, 40, 3), dtype=np.uint8)
+    tile = random_tile(rng, 16, 24)
+
+    raw = composite_tiles(buffer.copy(), [(8, 12, tile)])
+    planes = composite_tiles(buffer.copy(), [(8, 12, premultiply(tile, 3))])
+    np.testing.assert_array_equal(raw, planes)
+
+def test_premultiply_planes():
+    tile = np.array([[[200, 100, 50, 0], [200, 100, 50, 255], [10, 20, 30, 128]]], dtype=np.uint8)
+    color, inverse_alpha = premultiply(tile, 3)
+    assert color.dtype == np.uint16 and inverse_alpha.dtype == np.uint16
+    assert color[0, 0].tolist() == [128, 128, 128]
+    assert color[0, 1].tolist() == [200 * 255 + 128, 100 * 255 + 128, 50 * 255 + 128]
+    assert inverse_alpha[0].tolist() == [[255] * 3, [0] * 3, [127] * 3]
+
+def test_tiles_outside_the_buffer_are_skipped():
+    buffer = np.full((10, 10, 3), 7, dtype=np.uint8)
+    tile = np.full((4, 4, 4), 255, dtype=np.uint8)
+    composite_tiles(buffer, [(20, 0, tile), (-4, 0, tile), (0, 10, tile)])
+    assert (buffer == 7).all()
+
+@pytest.mark.parametrize('mode', ['RGB', 'RGBA'])
+def test_pil_frames_match_array_frames(mode):
+    rng = np.random.default_rng(2)
+    buffer = rng.integers(0, 256, (30, 40, len(mode)), dtype=np.uint8)
+    placements = [(4, 4, random_tile(rng, 10, 12)), (-3, 25, random_tile(rng, 8, 8))]
+
+    image = Image.fromarray(buffer.copy(), mode)
+    assert _composite_image(image, placements) is image
+    np.testing.assert_array_equal(np.asarray(image), composite_tiles(buffer.copy(), placements))
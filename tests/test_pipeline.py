@@ -0,0 +1,116 @@
+import sys
+import threading
+import types
+from PIL import Image
+import text_translator
+from pipeline import STOP, CallbackSink, DropOldestQueue, ImageFileSource, Pipeline, ScreenSource
+
+
+def test_full_queue_drops_oldest():
+    queue = DropOldestQueue(maxsize=2)
+    for item in (1, 2, 3, 4):
+        queue.put(item)
+    assert queue.dropped == 2
+    assert [queue.get(), queue.get()] == [3, 4]
+
+def test_dropped_items_are_reported():
+    dropped = []
+    queue = DropOldestQueue(maxsize=1, on_drop=dropped.append)
+    for item in (1, 2, 3):
+        queue.put(item)
+    assert dropped == [1, 2]
+
+def test_stop_is_never_dropped():
+    queue = DropOldestQueue(maxsize=2)
+    queue.put(1)
+    queue.put(2)
+    # STOP waits for room on a full queue instead of replacing a frame
+    putter = threading.Thread(target=queue.put, args=(STOP,))
+    putter.start()
+    assert queue.get() == 1
+    putter.join(timeout=5)
+    assert [queue.get(), queue.get()] == [2, STOP]
+    assert queue.dropped == 0
+
+def test_blocking_queue_keeps_every_item():
+    queue = DropOldestQueue(maxsize=1, drop_oldest=False)
+    putter = threading.Thread(target=lambda: [queue.put(item) for item in (1, 2, 3)])
+    putter.start()
+    received = [queue.get() for _ in range(3)]
+    putter.join(timeout=5)
+    assert received == [1, 2, 3]
+    assert queue.dropped == 0
+
+
+class StubOCR:
+    """Reports one box per frame, without a reader."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, image):
+        self.calls += 1
+        return [{'text': 'こんにちは', 'coordinates': {'x1': 10, 'x2': 90, 'y1': 10, 'y2': 30}, 'confidence': 0.9}]
+
+
+def fake_translate(results, target_language='en', use_google=True, han_language=None):
+    for item in results:
+        item['original_text'] = item['text']
+        item['text'] = 'Hello'
+        item['source_language'] = 'ja'
+        item['language'] = target_language
+    return results
+
+def test_pipeline_runs_every_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_translator, 'translate_results', fake_translate)
+    paths = []
+    for index in range(3):
+        path = tmp_path / f'{index}.png'
+        Image.new('RGB', (120, 60), 'white').save(path)
+        paths.append(str(path))
+
+    frames = []
+    ocr = StubOCR()
+    stats = Pipeline(ImageFileSource(str(tmp_path)), CallbackSink(frames.append), ocr=ocr,
+                     drop_oldest=False, merge_lines=False).run()
+
+    assert ocr.calls == 3
+    assert stats['frames'] == 3
+    assert sum(stats['dropped'].values()) == 0
+    assert [frame['path'] for frame in frames] == paths
+    assert all(frame['results'][0]['text'] == 'Hello' for frame in frames)
+    assert all(frame['output'].size == (120, 60) for frame in frames)
+
+
+class FlakyOCR(StubOCR):
+    """Fails on the second frame, like a reader error on one capture."""
+
+    def process(self, image):
+        if self.calls == 1:
+            self.calls += 1
+            raise RuntimeError('reader failed')
+        return super().process(image)
+
+def test_screen_loop_continues_after_a_failed_frame(monkeypatch):
+    monkeypatch.setattr(text_translator, 'translate_results', fake_translate)
+    monkeypatch.setitem(sys.modules, 'screenshot_clicker',
+                        types.SimpleNamespace(capture_screenshot=lambda coords: Image.new('RGB', (120, 60), 'white')))
+    source = ScreenSource((0, 120, 0, 60))
+    shown = []
+
+    def show(frame):
+        # Stands in for WindowSink: the window hands back the next region, and closes after three frames
+        shown.append(frame)
+        source.update(frame['coords'] if len(shown) < 3 else (None, None, None, None))
+
+    ocr = FlakyOCR()
+    pipeline = Pipeline(source, CallbackSink(show), ocr=ocr, merge_lines=False)
+    runner = threading.Thread(target=pipeline.run, daemon=True)
+    runner.start()
+    runner.join(timeout=10)
+    if runner.is_alive():
+        pipeline.stop()
+    assert not runner.is_alive()
+    # The failed capture is taken again instead of leaving the source waiting for the window
+    assert ocr.calls == 4
+    assert len(shown) == 3
@@ -0,0 +1,59 @@
+from PIL import Image
+import extract_image_text
+from roi_learner import RegionOfInterestOCR
+
+
+def box(x1, x2, y1, y2):
+    return {'text': 'テキスト', 'coordinates': {'x1': x1, 'x2': x2, 'y1': y1, 'y2': y2}, 'confidence': 0.9}
+
+def learner(tmp_path, **settings):
+    return RegionOfInterestOCR(profile='test', profiles_dir=str(tmp_path), grid_shape=(10, 10), pad=0, **settings)
+
+def test_heat_is_added_in_relative_grid_cells(tmp_path):
+    roi = learner(tmp_path, decay=1.0)
+    roi.learn([box(0, 100, 900, 1000)], (1000, 1000))
+    assert roi.heatmap[9, 0] == 1.0
+    assert roi.heatmap.sum() == 1.0
+    # The same relative box at another capture size lands in the same cell
+    roi.learn([box(0, 50, 450, 500)], (500, 500))
+    assert roi.heatmap[9, 0] == 2.0
+
+def test_regions_follow_the_hot_cells(tmp_path):
+    roi = learner(tmp_path, decay=1.0, threshold=0.5)
+    assert roi.regions((1000, 1000)) == []
+    for _ in range(4):
+        roi.learn([box(100, 300, 800, 900)], (1000, 1000))
+    roi.learn([box(700, 800, 0, 100)], (1000, 1000))  # seen once: below half the peak
+    assert roi.regions((1000, 1000)) == [(100, 300, 800, 900)]
+    assert roi.regions((500, 500)) == [(50, 150, 400, 450)]
+
+def test_decay_fades_old_regions(tmp_path):
+    roi = learner(tmp_path, decay=0.5)
+    roi.learn([box(0, 100, 0, 100)], (1000, 1000))
+    for _ in range(3):
+        roi.learn([], (1000, 1000))
+    assert roi.heatmap.max() == 0.125
+
+def test_rescans_run_periodically_and_until_regions_exist(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(extract_image_text, 'extract_japanese_text',
+                        lambda image, languages=('ja',): calls.append('full') or [box(100, 300, 800, 900)])
+    monkeypatch.setattr(extract_image_text, 'extract_text_in_regions',
+                        lambda image, regions, languages=('ja',): calls.append(regions) or [box(100, 300, 800, 900)])
+
+    roi = learner(tmp_path, rescan_interval=3, save_interval=0)
+    frame = Image.new('RGB', (1000, 1000))
+    for _ in range(5):
+        roi.process(frame)
+    assert calls == ['full', [(100, 300, 800, 900)], [(100, 300, 800, 900)], 'full', [(100, 300, 800, 900)]]
+    assert roi.stats()['full_passes'] == 2
+    assert 0.0 < roi.stats()['scanned_fraction'] < 1.0
+
+def test_profiles_are_saved_and_loaded(tmp_path):
+    roi = learner(tmp_path)
+    roi.learn([box(0, 100, 0, 100)], (1000, 1000))
+    roi.save()
+    assert learner(tmp_path).heatmap[0, 0] == roi.heatmap[0, 0] > 0
+    # A map saved with another grid is ignored
+    other = RegionOfInterestOCR(profile='test', profiles_dir=str(tmp_path), grid_shape=(5, 5))
+    assert other.heatmap.max() == 0
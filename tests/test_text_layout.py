@@ -0,0 +1,59 @@
+from text_layout import group_lines, group_paragraphs, join_fragments, merge_results
+
+
+def box(text, x1, x2, y1, y2, confidence=0.9):
+    return {'text': text, 'coordinates': {'x1': x1, 'x2': x2, 'y1': y1, 'y2': y2}, 'confidence': confidence}
+
+def texts(line):
+    return [item['text'] for item in line['items']]
+
+def test_fragments_on_one_baseline_form_a_line_in_reading_order():
+    results = [box('ですね', 130, 190, 12, 32), box('いい天気', 50, 120, 10, 30), box('別の行', 50, 110, 60, 80)]
+    lines = sorted(group_lines(results), key=lambda line: line['box']['y1'])
+    assert [texts(line) for line in lines] == [['いい天気', 'ですね'], ['別の行']]
+    assert lines[0]['box'] == {'x1': 50, 'x2': 190, 'y1': 10, 'y2': 32}
+    assert not lines[0]['vertical']
+
+def test_distant_fragments_stay_separate():
+    # The gap is three line heights, more than gap_factor allows
+    lines = group_lines([box('左', 0, 20, 0, 20), box('右', 80, 100, 0, 20)])
+    assert len(lines) == 2
+
+def test_vertical_columns_read_top_to_bottom_and_right_to_left():
+    results = [
+        box('二列目', 58, 78, 0, 90),
+        box('一列目の下', 80, 100, 100, 190),
+        box('一列目', 80, 100, 0, 90),
+    ]
+    lines = group_lines(results)
+    assert all(line['vertical'] for line in lines)
+    paragraphs = group_paragraphs(lines)
+    assert len(paragraphs) == 1
+    assert [texts(line) for line in paragraphs[0]] == [['一列目', '一列目の下'], ['二列目']]
+
+def test_lines_form_paragraphs_only_when_close_and_alike():
+    lines = group_lines([
+        box('First line of the box', 10, 300, 10, 30),
+        box('second line', 10, 200, 36, 56),
+        box('Far below', 10, 200, 200, 220),
+        box('HUGE TITLE', 10, 300, 60, 140),
+    ])
+    paragraphs = group_paragraphs(lines)
+    assert [[texts(line)[0] for line in paragraph] for paragraph in paragraphs] == [
+        ['First line of the box', 'second line'], ['HUGE TITLE'], ['Far below']]
+
+def test_join_fragments_spaces_only_between_spaced_scripts():
+    assert join_fragments(['今日は', 'いい天気']) == '今日はいい天気'
+    assert join_fragments(['Hello', 'world']) == 'Hello world'
+    assert join_fragments(['Score:', '100点']) == 'Score: 100点'
+    assert join_fragments(['', ' a ', 'b']) == 'a b'
+
+def test_merge_results_unions_boxes_and_weights_confidence():
+    merged = merge_results([box('今日は', 10, 70, 10, 30, 0.5), box('いい天気です', 75, 200, 10, 30, 1.0), box('次', 400, 420, 300, 320)])
+    assert merged[0] == {
+        'text': '今日はいい天気です',
+        'coordinates': {'x1': 10, 'x2': 200, 'y1': 10, 'y2': 30},
+        'confidence': (0.5 * 3 + 1.0 * 6) / 9,
+        'fragments': 2,
+    }
+    assert merged[1]['text'] == '次' and 'fragments' not in merged[1]
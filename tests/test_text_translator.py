@@ -0,0 +1,114 @@
+import sys
+import types
+import pytest
+import text_translator
+from connectivity import ConnectivityMonitor
+from text_translator import ONLINE_MAX_CHARS, ONLINE_MAX_TEXTS, online_chunks
+from translation_memory import TranslationMemory
+
+
+class FakeTranslator:
+    """Stands in for googletrans: prefixes every line, and fails on requests containing '※'."""
+
+    requests = []
+
+    def translate(self, text, dest='en'):
+        FakeTranslator.requests.append(text)
+        if isinstance(text, list):
+            return [self.translate(item, dest) for item in text]
+        if '※' in text:
+            raise RuntimeError('request rejected')
+        return types.SimpleNamespace(text='\n'.join(f'{dest}:{line}' for line in text.split('\n')))
+
+
+@pytest.fixture
+def online(monkeypatch):
+    FakeTranslator.requests = []
+    monkeypatch.setitem(sys.modules, 'googletrans', types.SimpleNamespace(Translator=FakeTranslator))
+    monkeypatch.setattr(text_translator, 'is_connected', lambda: True)
+    # Failed requests trip the breaker; keep that away from the shared monitor
+    monkeypatch.setattr(text_translator, 'monitor', ConnectivityMonitor())
+    return FakeTranslator.requests
+
+@pytest.fixture
+def offline_calls(monkeypatch):
+    calls = []
+
+    def translate_offline_batch(texts, source_lang, target_lang='en', batch_size=16):
+        calls.append((list(texts), source_lang))
+        return [f'marian:{text}' for text in texts]
+
+    monkeypatch.setattr(text_translator, 'translate_offline_batch', translate_offline_batch)
+    return calls
+
+def test_chunks_respect_the_text_limit():
+    texts = [f'line {index}' for index in range(250)]
+    chunks = online_chunks(texts)
+    assert [len(chunk) for chunk in chunks] == [ONLINE_MAX_TEXTS, ONLINE_MAX_TEXTS, 50]
+    assert [text for chunk in chunks for text in chunk] == texts
+
+def test_chunks_respect_the_character_limit():
+    texts = ['あ' * 1000] * 10
+    chunks = online_chunks(texts)
+    # Four texts and their three newlines fit in 4500 characters, a fifth does not
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert all(len('\n'.join(chunk)) <= ONLINE_MAX_CHARS for chunk in chunks)
+
+def test_oversized_text_gets_a_chunk_of_its_own():
+    chunks = online_chunks(['short', 'x' * (ONLINE_MAX_CHARS + 1), 'short'])
+    assert [len(chunk) for chunk in chunks] == [1, 1, 1]
+
+def test_online_batch_sends_one_request_per_chunk(online):
+    texts = [f'こんにちは {index}' for index in range(250)]
+    translations = text_translator.translate_online_batch(texts, 'en')
+    assert len(online) == 3
+    assert translations == [f'en:{text}' for text in texts]
+
+def test_failed_chunk_returns_none_for_its_texts_only(online):
+    texts = [f'文 {index}' for index in range(ONLINE_MAX_TEXTS)] + ['※です'] + [f'文 {index}' for index in range(100, 150)]
+    translations = text_translator.translate_online_batch(texts, 'en')
+    assert translations[:ONLINE_MAX_TEXTS] == [f'en:{text}' for text in texts[:ONLINE_MAX_TEXTS]]
+    assert translations[ONLINE_MAX_TEXTS:] == [None] * 51
+
+def test_failed_chunk_falls_back_to_marian_for_its_own_texts(online, offline_calls):
+    first = [f'こんにちは {index}' for index in range(ONLINE_MAX_TEXTS)]
+    second = ['※します', 'さようなら']
+    translations = text_translator.translate_batch(first + second, 'en', use_memory=False)
+    assert translations[:ONLINE_MAX_TEXTS] == [f'en:{text}' for text in first]
+    assert translations[ONLINE_MAX_TEXTS:] == [f'marian:{text}' for text in second]
+    assert offline_calls == [(second, 'ja')]
+
+def test_unknown_language_comes_back_unchanged_offline(monkeypatch, offline_calls):
+    monkeypatch.setattr(text_translator, 'is_connected', lambda: False)
+    texts = ['12345', '99/99', 'こんにちは']
+    translations = text_translator.translate_batch(texts, 'en', use_memory=False)
+    assert translations == ['12345', '99/99', 'marian:こんにちは']
+    assert offline_calls == [(['こんにちは'], 'ja')]
+    assert text_translator.translate_text('!?', 'en', USE_GOOGLE=False, use_memory=False) == '!?'
+
+def test_unknown_language_in_a_failed_chunk_is_not_sent_offline(online, offline_calls):
+    translations = text_translator.translate_batch(['※123', '456'], 'en', use_memory=False)
+    assert translations == ['※123', '456']
+    assert offline_calls == []
+
+def test_han_only_text_follows_the_configured_language(monkeypatch, offline_calls, tmp_path):
+    monkeypatch.setattr(text_translator, 'is_connected', lambda: False)
+    monkeypatch.setattr(text_translator, 'memory', TranslationMemory(str(tmp_path / 'memory.sqlite3')))
+    results = [{'text': '中文字幕'}, {'text': 'ひらがな'}]
+    text_translator.translate_results(results, 'en', han_language='zh')
+    assert [item['source_language'] for item in results] == ['zh', 'ja']
+    assert offline_calls == [(['中文字幕'], 'zh'), (['ひらがな'], 'ja')]
+
+    monkeypatch.setattr(text_translator, 'HAN_LANGUAGE', 'zh')
+    assert text_translator.detect_language('中文') == 'zh'
+
+def test_only_texts_no_backend_translated_are_reported_failed(monkeypatch, online):
+    def translate_offline_batch(texts, source_lang, target_lang='en', batch_size=16):
+        raise RuntimeError('model missing')
+
+    monkeypatch.setattr(text_translator, 'translate_offline_batch', translate_offline_batch)
+    failed = set()
+    translations = text_translator.translate_batch(['※します', '※123'], 'en', use_memory=False, failed=failed)
+    assert translations == ['※します', '※123']
+    # Unknown-language text is left as it is on purpose, not because a backend failed
+    assert failed == {'※します'}
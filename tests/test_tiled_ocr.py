@@ -0,0 +1,57 @@
+from tiled_ocr import merge_seam_fragments, seam_bands, suppress_duplicates, tile_grid
+
+
+def box(text, x1, x2, y1, y2, confidence=0.9):
+    return {'text': text, 'coordinates': {'x1': x1, 'x2': x2, 'y1': y1, 'y2': y2}, 'confidence': confidence}
+
+def test_tiles_cover_the_image_with_the_overlap():
+    tiles = tile_grid(2000, 900, tile_size=1024, overlap=96)
+    assert tiles == [(0, 1024, 0, 900), (928, 1952, 0, 900), (1856, 2000, 0, 900)]
+    assert seam_bands(tiles) == [{'x1': 928, 'x2': 1024, 'y1': 0, 'y2': 900},
+                                 {'x1': 1856, 'x2': 1952, 'y1': 0, 'y2': 900}]
+
+def test_duplicate_read_inside_a_kept_box_is_dropped():
+    whole = box('今日はいい天気', 900, 1000, 100, 130)
+    partial = box('いい天気', 940, 1000, 101, 129, confidence=0.99)
+    elsewhere = box('別', 10, 40, 10, 40)
+    kept = suppress_duplicates([partial, elsewhere, whole])
+    assert kept == [whole, elsewhere]
+
+def test_line_split_across_a_seam_is_merged_once():
+    tiles = tile_grid(2000, 900, tile_size=1024, overlap=96)
+    # The line is longer than the overlap: each tile reads part of it, both read 'ですね'
+    left = box('今日はいい天気ですね', 700, 1024, 500, 530, confidence=0.8)
+    right = box('ですね、散歩に行こう', 928, 1250, 500, 530, confidence=1.0)
+    other = box('別の行', 100, 200, 100, 130)
+
+    kept = suppress_duplicates([left, right, other])
+    assert len(kept) == 3  # neither half contains the other
+    merged = merge_seam_fragments(kept, seam_bands(tiles))
+    assert other in merged
+    line = next(item for item in merged if item is not other)
+    assert line['text'] == '今日はいい天気ですね、散歩に行こう'
+    assert line['coordinates'] == {'x1': 700, 'x2': 1250, 'y1': 500, 'y2': 530}
+    assert line['fragments'] == 2
+    assert 0.8 < line['confidence'] < 1.0
+
+def test_fragments_on_other_lines_are_not_merged():
+    bands = seam_bands(tile_grid(2000, 900, tile_size=1024, overlap=96))
+    upper = box('上の行', 900, 1000, 100, 130)
+    lower = box('下の行', 950, 1100, 300, 330)
+    assert merge_seam_fragments([upper, lower], bands) == [upper, lower]
+
+def test_fragments_that_only_touch_are_joined_without_dropping_text():
+    bands = [{'x1': 928, 'x2': 1024, 'y1': 0, 'y2': 900}]
+    merged = merge_seam_fragments([box('Hello', 900, 1000, 10, 40), box('world', 1010, 1100, 10, 40)], bands)
+    assert [item['text'] for item in merged] == ['Hello world']
+
+def test_vertical_line_split_across_a_horizontal_seam_is_merged():
+    tiles = tile_grid(900, 2000, tile_size=1024, overlap=96)
+    bands = seam_bands(tiles)
+    assert bands == [{'x1': 0, 'x2': 900, 'y1': 928, 'y2': 1024}, {'x1': 0, 'x2': 900, 'y1': 1856, 'y2': 1952}]
+    upper = box('縦書きの文章が', 400, 430, 700, 1024)
+    lower = box('文章が続きます', 400, 430, 928, 1200)
+    merged = merge_seam_fragments([upper, lower], bands)
+    assert len(merged) == 1
+    assert merged[0]['text'] == '縦書きの文章が続きます'
+    assert merged[0]['coordinates'] == {'x1': 400, 'x2': 430, 'y1': 700, 'y2': 1200}
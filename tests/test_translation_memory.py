@@ -0,0 +1,58 @@
+from translation_memory import TranslationMemory, normalize_text
+
+
+def test_normalization_folds_width_and_spacing():
+    assert normalize_text('  ＡＢＣ　１２３  ') == 'ABC 123'
+    assert normalize_text('こんにちは\n  世界') == 'こんにちは 世界'
+    assert normalize_text('ｶﾀｶﾅ') == 'カタカナ'
+
+def test_lookups_use_the_normalized_text(tmp_path):
+    memory = TranslationMemory(str(tmp_path / 'memory.sqlite3'))
+    memory.put('こんにちは　世界', 'ja', 'en', 'marian', 'Hello world')
+    assert memory.get(' こんにちは 世界 ', 'ja', 'en', 'marian') == 'Hello world'
+
+def test_entries_are_keyed_by_language_and_backend(tmp_path):
+    memory = TranslationMemory(str(tmp_path / 'memory.sqlite3'))
+    memory.put('猫', 'ja', 'en', 'marian', 'cat')
+    assert memory.get('猫', 'ja', 'en', 'google') is None
+    assert memory.get('猫', 'ja', 'fr', 'marian') is None
+    assert memory.get('猫', 'zh', 'en', 'marian') is None
+
+def test_disk_tier_serves_after_the_lru_and_across_instances(tmp_path):
+    path = str(tmp_path / 'memory.sqlite3')
+    memory = TranslationMemory(path, lru_size=1)
+    memory.put('一', 'ja', 'en', 'marian', 'one')
+    memory.put('二', 'ja', 'en', 'marian', 'two')  # pushes '一' out of the LRU
+
+    assert memory.get('二', 'ja', 'en', 'marian') == 'two'
+    assert memory.get('一', 'ja', 'en', 'marian') == 'one'
+    stats = memory.stats()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['memory_entries']) == (1, 1, 1)
+    memory.close()
+
+    reopened = TranslationMemory(path)
+    assert reopened.get('二', 'ja', 'en', 'marian') == 'two'
+    assert reopened.get('三', 'ja', 'en', 'marian') is None
+    assert reopened.stats()['misses'] == 1
+    reopened.close()
+
+def test_trim_drops_the_least_recently_used_rows(tmp_path):
+    memory = TranslationMemory(str(tmp_path / 'memory.sqlite3'), max_entries=3, lru_size=1)
+    for index, text in enumerate(['a', 'b', 'c']):
+        memory.put(text, 'ja', 'en', 'marian', str(index))
+    memory.get('a', 'ja', 'en', 'marian')  # read from disk: 'b' is now the least recently used
+    memory.put('d', 'ja', 'en', 'marian', '3')
+    assert memory.stats()['disk_entries'] == 3
+    memory._lru.clear()
+
+    assert memory.get('b', 'ja', 'en', 'marian') is None
+    assert [memory.get(text, 'ja', 'en', 'marian') for text in 'acd'] == ['0', '2', '3']
+    memory.close()
+
+def test_clear_empties_both_tiers(tmp_path):
+    memory = TranslationMemory(str(tmp_path / 'memory.sqlite3'))
+    memory.put('猫', 'ja', 'en', 'marian', 'cat')
+    memory.clear()
+    assert memory.get('猫', 'ja', 'en', 'marian') is None
+    assert memory.stats()['disk_entries'] == 0
+    memory.close()
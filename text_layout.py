@@ -0,0 +1,201 @@
+from language_detector import char_script
+
+# Boxes this much taller than wide hold vertical text
+VERTICAL_RATIO = 1.5
+
+
+def is_vertical(coords: dict) -> bool:
+    """Return True if an OCR box is a column of vertical text."""
+    return coords['y2'] - coords['y1'] > VERTICAL_RATIO * (coords['x2'] - coords['x1'])
+
+def union_box(boxes: list) -> dict:
+    """Return the coordinates enclosing every box."""
+    return {
+        'x1': min(box['x1'] for box in boxes),
+        'x2': max(box['x2'] for box in boxes),
+        'y1': min(box['y1'] for box in boxes),
+        'y2': max(box['y2'] for box in boxes),
+    }
+
+def box_iou(first: dict, second: dict) -> float:
+    """Return the intersection over union of two coordinate dicts."""
+    width = min(first['x2'], second['x2']) - max(first['x1'], second['x1'])
+    height = min(first['y2'], second['y2']) - max(first['y1'], second['y1'])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    area_first = (first['x2'] - first['x1']) * (first['y2'] - first['y1'])
+    area_second = (second['x2'] - second['x1']) * (second['y2'] - second['y1'])
+    return intersection / (area_first + area_second - intersection)
+
+def _spans(coords: dict, vertical: bool) -> tuple:
+    """Return the (along, across) extents of a box: along the reading direction and across it."""
+    if vertical:
+        return (coords['y1'], coords['y2']), (coords['x1'], coords['x2'])
+    return (coords['x1'], coords['x2']), (coords['y1'], coords['y2'])
+
+def _overlap(first: tuple, second: tuple) -> int:
+    return min(first[1], second[1]) - max(first[0], second[0])
+
+def _no_space(char: str) -> bool:
+    """Return True for characters of scripts written without spaces between words."""
+    return char_script(char) in ('kana', 'han') or 0x3000 <= ord(char) <= 0x303F or 0xFF00 <= ord(char) <= 0xFFEF
+
+def join_fragments(texts: list) -> str:
+    """Join fragments in reading order, with a space only between words of spaced scripts."""
+    joined = ''
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        if joined and not (_no_space(joined[-1]) or _no_space(text[0])):
+            joined += ' '
+        joined += text
+    return joined
+
+def _clusters(count: int, pairs) -> list:
+    """Union-find over `count` elements; returns the groups of indices linked by `pairs`."""
+    parent = list(range(count))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for first, second in pairs:
+        parent[find(first)] = find(second)
+    groups = {}
+    for index in range(count):
+        groups.setdefault(find(index), []).append(index)
+    return list(groups.values())
+
+def group_lines(results: list, gap_factor: float = 1.0, overlap_ratio: float = 0.5) -> list:
+    """
+    Cluster OCR boxes into lines (rows of horizontal text, columns of vertical text).
+
+    Two boxes of the same orientation share a line when they overlap across the reading
+    direction by `overlap_ratio` of the thinner box and the gap between them along it is at most
+    `gap_factor` times the line thickness.
+
+    Args:
+        results (list): extract_japanese_text results.
+        gap_factor (float): Largest gap between fragments, in line thicknesses.
+        overlap_ratio (float): Smallest overlap across the line, as a fraction of its thickness.
+
+    Returns:
+        list: Lines as dicts with 'items' in reading order, 'box', 'vertical' and 'size' (thickness).
+    """
+    def linked(first, second):
+        coords_first, coords_second = results[first]['coordinates'], results[second]['coordinates']
+        vertical = is_vertical(coords_first)
+        if vertical != is_vertical(coords_second):
+            return False
+        along_first, across_first = _spans(coords_first, vertical)
+        along_second, across_second = _spans(coords_second, vertical)
+        size = min(across_first[1] - across_first[0], across_second[1] - across_second[0])
+        return size > 0 and _overlap(across_first, across_second) >= overlap_ratio * size \
+            and -_overlap(along_first, along_second) <= gap_factor * size
+
+    # Sweep boxes sorted by their top edge; boxes far below cannot share a horizontal line
+    order = sorted(range(len(results)), key=lambda index: results[index]['coordinates']['y1'])
+    pairs = []
+    for position, first in enumerate(order):
+        coords_first = results[first]['coordinates']
+        for second in order[position + 1:]:
+            coords_second = results[second]['coordinates']
+            if not is_vertical(coords_first) and coords_second['y1'] >= coords_first['y2']:
+                break
+            if linked(first, second):
+                pairs.append((first, second))
+
+    lines = []
+    for group in _clusters(len(results), pairs):
+        vertical = is_vertical(results[group[0]]['coordinates'])
+        items = sorted((results[index] for index in group), key=lambda item: _spans(item['coordinates'], vertical)[0][0])
+        thicknesses = sorted(across[1] - across[0] for _, across in (_spans(item['coordinates'], vertical) for item in items))
+        lines.append({
+            'items': items,
+            'box': union_box([item['coordinates'] for item in items]),
+            'vertical': vertical,
+            'size': thicknesses[len(thicknesses) // 2],
+        })
+    return lines
+
+def group_paragraphs(lines: list, spacing_factor: float = 0.8, size_tolerance: float = 0.35) -> list:
+    """
+    Cluster lines into paragraphs and order everything for reading.
+
+    Neighbouring lines of the same orientation and similar thickness form a paragraph when the
+    space between them is at most `spacing_factor` line thicknesses and they overlap along the
+    reading direction. Horizontal paragraphs read top to bottom; vertical ones right to left.
+
+    Args:
+        lines (list): Output of group_lines.
+        spacing_factor (float): Largest space between lines, in line thicknesses.
+        size_tolerance (float): Largest relative difference in line thickness.
+
+    Returns:
+        list: Paragraphs as lists of lines in reading order, ordered top to bottom, left to right.
+    """
+    def linked(first, second):
+        if first['vertical'] != second['vertical']:
+            return False
+        size = min(first['size'], second['size'])
+        if size <= 0 or abs(first['size'] - second['size']) > size_tolerance * max(first['size'], second['size']):
+            return False
+        along_first, across_first = _spans(first['box'], first['vertical'])
+        along_second, across_second = _spans(second['box'], second['vertical'])
+        return _overlap(along_first, along_second) > 0 and -_overlap(across_first, across_second) <= spacing_factor * size
+
+    pairs = [(first, second) for first in range(len(lines)) for second in range(first + 1, len(lines))
+             if linked(lines[first], lines[second])]
+    paragraphs = []
+    for group in _clusters(len(lines), pairs):
+        members = [lines[index] for index in group]
+        if members[0]['vertical']:
+            members.sort(key=lambda line: -line['box']['x2'])
+        else:
+            members.sort(key=lambda line: line['box']['y1'])
+        paragraphs.append(members)
+    paragraphs.sort(key=lambda members: (min(line['box']['y1'] for line in members), min(line['box']['x1'] for line in members)))
+    return paragraphs
+
+def merge_results(results: list, paragraphs: bool = True, gap_factor: float = 1.0, spacing_factor: float = 0.8) -> list:
+    """
+    Merge OCR fragments into lines or paragraphs so each sentence is translated once, in context.
+
+    Args:
+        results (list): extract_japanese_text results.
+        paragraphs (bool): Also merge lines into paragraphs; False merges only within lines.
+        gap_factor (float): See group_lines.
+        spacing_factor (float): See group_paragraphs.
+
+    Returns:
+        list: Results in the same format and reading order. Merged items cover the union of their
+              fragments' boxes, carry the length-weighted confidence and a 'fragments' count;
+              items that were not merged are returned unchanged.
+    """
+    if len(results) < 2:
+        return list(results)
+
+    lines = group_lines(results, gap_factor)
+    if paragraphs:
+        groups = group_paragraphs(lines, spacing_factor)
+    else:
+        groups = [[line] for line in sorted(lines, key=lambda line: (line['box']['y1'], line['box']['x1']))]
+
+    merged = []
+    for group in groups:
+        items = [item for line in group for item in line['items']]
+        if len(items) == 1:
+            merged.append(items[0])
+            continue
+        lengths = [max(1, len(item['text'])) for item in items]
+        merged.append({
+            'text': join_fragments([item['text'] for item in items]),
+            'coordinates': union_box([item['coordinates'] for item in items]),
+            'confidence': sum(item.get('confidence', 0.0) * length for item, length in zip(items, lengths)) / sum(lengths),
+            'fragments': len(items),
+        })
+    return merged
@@ -1,13 +1,20 @@
-import socket
-import os
-from langdetect import detect, DetectorFactory
-from langdetect.lang_detect_exception import LangDetectException
-from transformers import MarianMTModel, MarianTokenizer
-from googletrans import Translator
+import logging
+import language_detector
+import metrics
+from connectivity import monitor
+from offline_engine import engine
+from ocr_results import OCRResults
+from translation_memory import memory
 
+logger = logging.getLogger(__name__)
 
-# Set seed to ensure consistent language detection results
-DetectorFactory.seed = 0
+# googletrans rejects requests above 5000 characters; keep each batched request well below it
+ONLINE_MAX_CHARS = 4500
+ONLINE_MAX_TEXTS = 100
+
+# Language of text written only in Han ideographs, which the script alone cannot tell apart.
+# The OCR reader is set up for Japanese; set 'zh' (or pass han_language) for Chinese sources.
+HAN_LANGUAGE = 'ja'
 
 def is_valid_text(text: str) -> bool:
     """Check if the input is a valid text (not empty or random symbols).
@@ -19,47 +26,41 @@ def is_valid_text(text: str) -> bool:
         bool: True if valid, False otherwise.
     """
     valid = bool(text and text.strip())
-    print(f"Validating text: '{text}' - Valid: {valid}")
+    logger.debug("Validating text: '%s' - Valid: %s", text, valid)
     return valid
 
 def detect_language(text: str) -> str:
     """Detect the language of a given string.
     
+    Classifies by Unicode script and only falls back to langdetect for ambiguous
+    scripts; results are memoized (see language_detector).
+    
     Args:
         text (str): The input text to detect the language for.
         
     Returns:
         str: The language code (e.g., 'en' for English), or an error message.
     """
-    try:
-        language = detect(text)
-        print(f"Detected language: {language} for text: '{text}'")
-        return language
-    except LangDetectException:
-        with open(os.path.basename(__file__).replace('.py', '.log'),'a') as file:
-            file.write("Language detection failed.")
-        return "Could not detect the language"
-
-def is_connected(host="www.google.com", port=80, timeout=5) -> bool:
+    language = language_detector.detect_language(text, HAN_LANGUAGE)
+    if language == language_detector.UNKNOWN_LANGUAGE:
+        logger.warning("Language detection failed.")
+    else:
+        logger.debug("Detected language: %s for text: '%s'", language, text)
+    return language
+
+def is_connected() -> bool:
     """Check if the machine is connected to the internet.
     
-    Args:
-        host (str): The host to ping.
-        port (int): The port to connect to.
-        timeout (int): Timeout in seconds for the connection attempt.
+    Uses the shared connectivity monitor, which caches the probe result and keeps
+    reporting offline for a cooldown window after failures.
         
     Returns:
         bool: True if connected, False otherwise.
     """
-    try:
-        socket.setdefaulttimeout(timeout)
-        socket.create_connection((host, port))
-        print("Internet connection established.")
-        return True
-    except OSError:
-        with open(os.path.basename(__file__).replace('.py', '.log'),'a') as file:
-            file.write("No internet connection.")
-        return False
+    online = monitor.is_online()
+    if not online:
+        logger.info("No internet connection.")
+    return online
 
 def translate_offline(text: str, source_lang: str, target_lang: str = 'en') -> str:
     """Translate text using MarianMT offline models.
@@ -72,20 +73,31 @@ def translate_offline(text: str, source_lang: str, target_lang: str = 'en') -> s
     Returns:
         str: The translated text.
     """
-    model_name = f'Helsinki-NLP/opus-mt-{source_lang}-{target_lang}'
-    print(f"Loading offline model for translation from {source_lang} to {target_lang}.")
-    
-    # Load the tokenizer and model
-    tokenizer = MarianTokenizer.from_pretrained(model_name)
-    model = MarianMTModel.from_pretrained(model_name)
-    
-    # Tokenize and translate
-    tokenized_text = tokenizer(text, return_tensors="pt", padding=True)
-    translated = model.generate(**tokenized_text)
-    translation = tokenizer.decode(translated[0], skip_special_tokens=True)
-    print(f"Offline translation result: '{translation}'")
+    # The engine reuses the resident model and applies the configured decoding settings
+    translation = engine.translate([text], source_lang, target_lang)[0]
+    logger.debug("Offline translation result: '%s'", translation)
     return translation
 
+def translate_offline_batch(texts: list, source_lang: str, target_lang: str = 'en', batch_size: int = 16) -> list:
+    """Translate several texts of the same language with padded MarianMT batches.
+    
+    Texts are sorted by length and cut into buckets of `batch_size`, so each padded
+    batch holds strings of similar length and little compute is wasted on padding.
+    Decoding, threads and quantization follow `offline_engine.engine`.
+    
+    Args:
+        texts (list): The texts to translate.
+        source_lang (str): The source language code shared by all texts.
+        target_lang (str): The target language code.
+        batch_size (int): Maximum number of texts per generate call.
+        
+    Returns:
+        list: The translated texts, in the same order as `texts`.
+    """
+    translations = engine.translate(texts, source_lang, target_lang, batch_size)
+    logger.info("Offline batch translated %s texts in %s generate call(s).", len(texts), (len(texts) + batch_size - 1) // batch_size)
+    return translations
+
 def translate_online(text: str, target_language: str = 'en') -> str:
     """Translate text using Google Translate.
     
@@ -96,41 +108,275 @@ def translate_online(text: str, target_language: str = 'en') -> str:
     Returns:
         str: The translated text.
     """
+    from googletrans import Translator
     translator = Translator()
     try:
         translation = translator.translate(text, dest=target_language)
-        print(f"Online translation result: '{translation.text}'")
+        monitor.record_success()
+        logger.debug("Online translation result: '%s'", translation.text)
         return translation.text
     except Exception as e:
-        print(f"Translation error: {e}")
+        # Trips the breaker so the next strings go straight to the offline backend
+        monitor.record_failure()
+        metrics.increment('translate.errors')
+        logger.error("Translation error: %s", e)
         return ""
 
-def translate_text(text: str, target_language: str = 'en', USE_GOOGLE = True) -> str:
+def online_chunks(texts: list, max_chars: int = ONLINE_MAX_CHARS, max_texts: int = ONLINE_MAX_TEXTS) -> list:
+    """Split texts into consecutive chunks whose newline-joined request stays within the limits.
+    
+    A single text longer than `max_chars` gets a chunk of its own.
+    
+    Returns:
+        list: Lists of texts, in order.
+    """
+    chunks, chunk, size = [], [], 0
+    for text in texts:
+        added = len(text) + (1 if chunk else 0)
+        if chunk and (size + added > max_chars or len(chunk) >= max_texts):
+            chunks.append(chunk)
+            chunk, size, added = [], 0, len(text)
+        chunk.append(text)
+        size += added
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def translate_online_batch(texts: list, target_language: str = 'en') -> list:
+    """Translate several texts using Google Translate with as few requests as possible.
+    
+    The texts are split into chunks below the provider's request size (see online_chunks) and
+    each chunk is sent as one newline-joined request. If a reply does not split back into the
+    same number of lines, that chunk is sent as a list instead. A failed chunk does not affect
+    the others.
+    
+    Args:
+        texts (list): The texts to translate.
+        target_language (str): The target language code.
+        
+    Returns:
+        list: The translated texts, in the same order as `texts`. Texts of failed chunks are None.
+    """
+    from googletrans import Translator
+    translator = Translator()
+    translations = []
+    chunks = online_chunks([text.replace('\n', ' ') for text in texts])
+    for chunk in chunks:
+        try:
+            joined = translator.translate('\n'.join(chunk), dest=target_language)
+            lines = joined.text.split('\n')
+            if len(lines) != len(chunk):
+                lines = [translation.text for translation in translator.translate(list(chunk), dest=target_language)]
+            monitor.record_success()
+            translations.extend(lines)
+        except Exception as e:
+            monitor.record_failure()
+            metrics.increment('translate.errors')
+            logger.error("Translation error on a chunk of %s texts: %s", len(chunk), e)
+            translations.extend([None] * len(chunk))
+    logger.info("Online batch translated %s texts in %s request(s).", len(texts), len(chunks))
+    return translations
+
+def translate_text(text: str, target_language: str = 'en', USE_GOOGLE = True, use_memory: bool = True) -> str:
     """Detect language, check internet connectivity, and translate accordingly.
     
     Args:
         text (str): The input text to translate.
         target_language (str): The target language code.
+        use_memory (bool): Serve and store translations through the translation memory.
         
     Returns:
         str: The translated text or an error message.
     """
     if not is_valid_text(text):
-        with open(os.path.basename(__file__).replace('.py', '.log'),'a') as file:
-            file.write("Invalid input text.")
+        logger.warning("Invalid input text.")
         return "Invalid input text."
 
     # Detect language
     language_code = detect_language(text)
     
     # Check if there is an internet connection
-    if is_connected() and USE_GOOGLE:
-        print("Internet connection detected")
-        return translate_online(text, target_language)
+    online = is_connected() and USE_GOOGLE
+    if USE_GOOGLE and not online:
+        metrics.increment('translate.offline_fallback')
+    # Google detects the source language itself, so its entries are keyed on 'auto'
+    backend, source_lang = ('google', 'auto') if online else ('marian', language_code)
+
+    if use_memory:
+        cached = memory.get(text, source_lang, target_language, backend)
+        if cached is not None:
+            return cached
+
+    if online:
+        logger.debug("Internet connection detected")
+        translation = translate_online(text, target_language)
+    elif language_code in (target_language, language_detector.UNKNOWN_LANGUAGE):
+        # Nothing to translate, or no model to translate it with
+        return text
+    else:
+        translation = translate_offline(text, language_code, target_language)
+
+    if use_memory and translation:
+        memory.put(text, source_lang, target_language, backend, translation)
+    return translation
+
+def translate_batch(texts: list, target_language: str = 'en', USE_GOOGLE = True, batch_size: int = 16, use_memory: bool = True, source_languages: list = None, failed: set = None) -> list:
+    """Translate many texts at once, grouping them to minimise backend calls.
+    
+    Duplicate texts are translated once and texts already in the translation memory
+    are not sent at all. Online, the remaining texts go out in as few size-bounded
+    requests as possible, and texts of failed requests are translated offline;
+    offline, they are grouped by detected source language and run through
+    length-bucketed MarianMT batches.
+    
+    Args:
+        texts (list): The input texts to translate.
+        target_language (str): The target language code.
+        USE_GOOGLE (bool): Allow the online backend when connected.
+        batch_size (int): Maximum number of texts per offline generate call.
+        use_memory (bool): Serve and store translations through the translation memory.
+        source_languages (list): Already detected language of each text, so it is not detected again.
+        failed (set): If given, texts that no backend could translate are added to it.
+        
+    Returns:
+        list: The translated texts in input order. Invalid texts give "Invalid input text."
+              Texts whose language is unknown or already the target, and texts whose
+              language group fails to translate, are returned unchanged.
+    """
+    results = [None] * len(texts)
+    known_languages = dict(zip(texts, source_languages)) if source_languages is not None else {}
+    pending = {}  # unique text -> indices in `texts`
+    for i, text in enumerate(texts):
+        if is_valid_text(text):
+            pending.setdefault(text, []).append(i)
+        else:
+            results[i] = "Invalid input text."
+
+    unique_texts = list(pending)
+    if not unique_texts:
+        return results
+
+    online = USE_GOOGLE and is_connected()
+    if USE_GOOGLE and not online:
+        metrics.increment('translate.offline_fallback')
+    if online:
+        logger.debug("Internet connection detected")
+        backend = 'google'
+        source_langs = dict.fromkeys(unique_texts, 'auto')
     else:
-        return translate_offline(text, language_code, target_language)
+        backend = 'marian'
+        source_langs = {text: known_languages.get(text) or detect_language(text) for text in unique_texts}
+
+    translations = {}
+    if use_memory:
+        for text in unique_texts:
+            cached = memory.get(text, source_langs[text], target_language, backend)
+            if cached is not None:
+                translations[text] = cached
+    missing = [text for text in unique_texts if text not in translations]
+
+    fresh = {}  # text -> (translation, source language key, backend) for the translation memory
+    offline_texts = missing
+    offline_languages = source_langs
+    if missing and online:
+        offline_texts = []
+        for text, translation in zip(missing, translate_online_batch(missing, target_language)):
+            if translation is None:
+                offline_texts.append(text)
+            else:
+                fresh[text] = (translation, 'auto', 'google')
+        if offline_texts:
+            # Chunks the provider rejected go to MarianMT instead of coming back blank
+            metrics.increment('translate.offline_fallback')
+            offline_languages = {text: known_languages.get(text) or detect_language(text) for text in offline_texts}
+    if offline_texts:
+        translated = _translate_offline_groups(offline_texts, offline_languages, target_language, batch_size, translations, failed)
+        fresh.update((text, (translation, offline_languages[text], 'marian')) for text, translation in translated.items())
+
+    for text, (translation, source_lang, text_backend) in fresh.items():
+        translations[text] = translation
+        if use_memory and translation:
+            memory.put(text, source_lang, target_language, text_backend, translation)
+
+    for text, indices in pending.items():
+        for i in indices:
+            results[i] = translations[text]
+    return results
+
+def _translate_offline_groups(texts: list, source_langs: dict, target_language: str, batch_size: int, unchanged: dict, failed: set = None) -> dict:
+    """Translate texts with MarianMT, one batch per source language.
+    
+    Texts needing no translation (already in the target language), texts of unknown language
+    (there is no model to load for them) and texts of a group that fails are added to
+    `unchanged` as themselves; those of a failed group are also added to `failed`, if given.
+    
+    Returns:
+        dict: The translated texts, keyed by source text.
+    """
+    groups = {}
+    for text in texts:
+        groups.setdefault(source_langs[text], []).append(text)
+
+    translated = {}
+    for language_code, group in groups.items():
+        if language_code in (target_language, language_detector.UNKNOWN_LANGUAGE):
+            unchanged.update((text, text) for text in group)
+            continue
+        try:
+            translated.update(zip(group, translate_offline_batch(group, language_code, target_language, batch_size)))
+        except Exception as err:
+            metrics.increment('translate.errors')
+            logger.error("Batch translation failed for language %s: %s", language_code, err)
+            unchanged.update((text, text) for text in group)
+            if failed is not None:
+                failed.update(group)
+    return translated
+
+def translate_results(results: list, target_language: str = 'en', USE_GOOGLE = True, han_language: str = None, failed: set = None) -> list:
+    """Translate OCR results in place with one translate_batch call.
+    
+    Each item's 'text' is replaced by its translation and gains 'original_text',
+    'source_language' (detected once here) and 'language' (the language of the text
+    now in 'text'), so later stages such as caption rendering never detect again.
+    An OCRResults is updated through its set_translations instead.
+    
+    Args:
+        results (list): Results in the extract_japanese_text format, or an OCRResults.
+        target_language (str): The target language code.
+        USE_GOOGLE (bool): Allow the online backend when connected.
+        han_language (str): Source language of ideograph-only text. None uses HAN_LANGUAGE.
+        failed (set): If given, source texts that could not be translated are added to it.
+        
+    Returns:
+        list: The same list, updated.
+    """
+    columnar = isinstance(results, OCRResults)
+    texts = list(results.texts) if columnar else [item['text'] for item in results]
+    with metrics.span('detect'):
+        source_languages = [language_detector.detect_language(text, han_language or HAN_LANGUAGE) for text in texts]
+    try:
+        with metrics.span('translate'):
+            translated_texts = translate_batch(texts, target_language, USE_GOOGLE, source_languages=source_languages, failed=failed)
+    except Exception as err:
+        metrics.increment('translate.errors')
+        logger.error("Translation error: %s", err)
+        translated_texts = texts  # Fallback to original text if translation fails
+        if failed is not None:
+            failed.update(texts)
+
+    if columnar:
+        results.set_translations(translated_texts, source_languages, target_language)
+        return results
+    for item, text, source_language, translated_text in zip(results, texts, source_languages, translated_texts):
+        item['text'] = translated_text
+        item['original_text'] = text
+        item['source_language'] = source_language
+        # Untranslated fallbacks keep the source language so the caption font still matches
+        item['language'] = source_language if translated_text == text else target_language
+    return results
 
 if __name__ == '__main__':
+    metrics.setup_logging()
     
     # Example usage
     input_text = "好きなだけ"  # Japanese for "as much as you like"
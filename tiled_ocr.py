@@ -0,0 +1,289 @@
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from PIL import Image
+import metrics
+from text_layout import box_iou, group_lines, join_fragments, union_box
+
+logger = logging.getLogger(__name__)
+
+# Shared memory blocks attached in this worker process, by name
+_attached = {}
+
+
+def tile_grid(width: int, height: int, tile_size: int = 1024, overlap: int = 96) -> list:
+    """
+    Cover an image with overlapping square tiles.
+
+    Neighbouring tiles share `overlap` pixels, so any text line shorter than the overlap lies
+    whole inside at least one tile. Longer lines crossing a seam are rejoined by merge_seam_fragments.
+
+    Returns:
+        list: Tiles as (x1, x2, y1, y2), end-exclusive and clipped to the image.
+    """
+    step = max(1, tile_size - overlap)
+
+    def starts(length):
+        positions = list(range(0, max(1, length - overlap), step))
+        # Align the last tile with the far edge instead of leaving a thin sliver
+        if positions[-1] + tile_size < length:
+            positions.append(length - tile_size)
+        return positions
+
+    return [(x, min(width, x + tile_size), y, min(height, y + tile_size)) for y in starts(height) for x in starts(width)]
+
+def suppress_duplicates(results: list, iou_threshold: float = 0.5, containment: float = 0.7) -> list:
+    """
+    Non-maximum suppression for boxes read twice along tile seams.
+
+    Larger boxes are kept first, since a line cut by a seam is read whole in the tile that contains
+    it. A box is dropped when it overlaps a kept box by `iou_threshold` IoU, or when `containment`
+    of its area lies inside a kept box.
+
+    Returns:
+        list: The kept results, largest first.
+    """
+    def area(coords):
+        return max(0, coords['x2'] - coords['x1']) * max(0, coords['y2'] - coords['y1'])
+
+    kept = []
+    for result in sorted(results, key=lambda result: (area(result['coordinates']), result['confidence']), reverse=True):
+        coords = result['coordinates']
+        duplicate = False
+        for other in kept:
+            other_coords = other['coordinates']
+            width = min(coords['x2'], other_coords['x2']) - max(coords['x1'], other_coords['x1'])
+            height = min(coords['y2'], other_coords['y2']) - max(coords['y1'], other_coords['y1'])
+            if width <= 0 or height <= 0:
+                continue
+            if box_iou(coords, other_coords) >= iou_threshold or width * height >= containment * area(coords):
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(result)
+    return kept
+
+def seam_bands(tiles: list) -> list:
+    """
+    Return the strips shared by neighbouring tiles of a tile_grid.
+
+    Returns:
+        list: Bands as coordinate dicts spanning the whole image across the seam.
+    """
+    width, height = max(tile[1] for tile in tiles), max(tile[3] for tile in tiles)
+    columns, rows = sorted({tile[:2] for tile in tiles}), sorted({tile[2:] for tile in tiles})
+    bands = [{'x1': after[0], 'x2': before[1], 'y1': 0, 'y2': height} for before, after in zip(columns, columns[1:]) if after[0] < before[1]]
+    bands += [{'x1': 0, 'x2': width, 'y1': after[0], 'y2': before[1]} for before, after in zip(rows, rows[1:]) if after[0] < before[1]]
+    return bands
+
+def _join_overlapping(first: dict, second: dict, vertical: bool, size: int) -> str:
+    """
+    Join the texts of two fragments in reading order, dropping the characters both tiles read.
+
+    When the boxes overlap along the line by at least half a character, the longest suffix of the
+    first text that starts the second is read twice and kept once.
+    """
+    end, start = ('y2', 'y1') if vertical else ('x2', 'x1')
+    text_first, text_second = first['text'].strip(), second['text'].strip()
+    if first['coordinates'][end] - second['coordinates'][start] >= size / 2:
+        for count in range(min(len(text_first), len(text_second)), 0, -1):
+            if text_first.endswith(text_second[:count]):
+                return text_first + text_second[count:]
+    return join_fragments([text_first, text_second])
+
+def merge_seam_fragments(results: list, bands: list, gap_factor: float = 1.0) -> list:
+    """
+    Rejoin text lines that a seam cut into a partial box in each tile.
+
+    Suppression keeps both halves of a line longer than the overlap, since neither contains the
+    other. Boxes touching an overlap band are grouped into lines with text_layout.group_lines, and
+    each line of several boxes becomes one result.
+
+    Args:
+        results (list): Results after suppress_duplicates, in frame coordinates.
+        bands (list): The overlap bands from seam_bands.
+        gap_factor (float): Largest gap between fragments, in line thicknesses.
+
+    Returns:
+        list: The results with seam fragments merged; merged items carry a 'fragments' count.
+    """
+    def touches_band(coords):
+        return any(box_iou(coords, band) > 0 for band in bands)
+
+    seam = [result for result in results if touches_band(result['coordinates'])]
+    if len(seam) < 2:
+        return results
+
+    merged = [result for result in results if not touches_band(result['coordinates'])]
+    for line in group_lines(seam, gap_factor):
+        items = line['items']
+        if len(items) == 1:
+            merged.append(items[0])
+            continue
+        text = items[0]['text'].strip()
+        for previous, item in zip(items, items[1:]):
+            text = _join_overlapping({'text': text, 'coordinates': previous['coordinates']}, item, line['vertical'], line['size'])
+        lengths = [max(1, len(item['text'])) for item in items]
+        merged.append({
+            'text': text,
+            'coordinates': union_box([item['coordinates'] for item in items]),
+            'confidence': sum(item.get('confidence', 0.0) * length for item, length in zip(items, lengths)) / sum(lengths),
+            'fragments': len(items),
+        })
+    return merged
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach a shared memory block created by the parent, once per worker."""
+    block = _attached.get(name)
+    if block is None:
+        # Workers share the parent's resource tracker, which unlinks the block with the parent
+        block = shared_memory.SharedMemory(name=name)
+        # Only the current frame's block is needed; the parent replaces it when frames grow
+        for previous in _attached.values():
+            previous.close()
+        _attached.clear()
+        _attached[name] = block
+    return block
+
+def _ocr_tile(name: str, shape: tuple, tile: tuple, languages: tuple) -> list:
+    """OCR one tile of the shared frame in a worker; coordinates are returned in frame pixels."""
+    import extract_image_text
+
+    block = _attach(name)
+    frame = np.ndarray(shape, dtype=np.uint8, buffer=block.buf)
+    x1, x2, y1, y2 = tile
+    results = extract_image_text.extract_japanese_text(frame[y1:y2, x1:x2], languages)
+    for result in results:
+        coords = result['coordinates']
+        coords['x1'] += x1
+        coords['x2'] += x1
+        coords['y1'] += y1
+        coords['y2'] += y1
+    return results
+
+
+class TiledOCR:
+    """
+    OCR of very large images split into overlapping tiles read in parallel.
+
+    The frame is copied once into a shared memory block that the worker processes map, so tiles
+    are never pickled. Each worker keeps its own warm reader. Duplicates along the seams are
+    removed with suppress_duplicates, and lines cut by a seam are rejoined with merge_seam_fragments.
+
+    Example:
+        with TiledOCR(workers=4) as ocr:
+            results = ocr.process(Image.open('page.png'))
+    """
+
+    def __init__(self, workers: int = None, tile_size: int = 1024, overlap: int = 96, languages: tuple = ('ja',),
+                 iou_threshold: float = 0.5):
+        """
+        Args:
+            workers (int): Worker processes; defaults to the CPU count.
+            tile_size (int): Edge of a tile in pixels.
+            overlap (int): Pixels shared by neighbouring tiles; keep it above the text height, so
+                           a line cut by a seam is read in part by both tiles and rejoined.
+            languages (tuple): OCR language codes.
+            iou_threshold (float): IoU above which two seam boxes are the same line.
+        """
+        import extract_image_text
+
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.languages = tuple(languages)
+        self.iou_threshold = iou_threshold
+
+        threads_per_worker = max(1, (os.cpu_count() or 1) // self.workers)
+        self._pool = ProcessPoolExecutor(self.workers, initializer=extract_image_text.init_worker, initargs=(self.languages, threads_per_worker))
+        self._block = None
+
+    def _share(self, frame: np.ndarray) -> np.ndarray:
+        """Copy the frame into the shared block, reallocating it only when it is too small."""
+        if self._block is None or self._block.size < frame.nbytes:
+            self._release()
+            self._block = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        shared = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._block.buf)
+        np.copyto(shared, frame)
+        return shared
+
+    def process(self, image) -> list:
+        """
+        OCR an image tile by tile across the pool.
+
+        Args:
+            image: PIL image or RGB uint8 array.
+
+        Returns:
+            list: Results in the extract_japanese_text format, in frame coordinates.
+        """
+        frame = np.asarray(image.convert('RGB') if isinstance(image, Image.Image) and image.mode != 'RGB' else image)
+        height, width = frame.shape[:2]
+        tiles = tile_grid(width, height, self.tile_size, self.overlap)
+
+        with metrics.span('ocr.tiled'):
+            shared = self._share(frame)
+            futures = [self._pool.submit(_ocr_tile, self._block.name, shared.shape, tile, self.languages) for tile in tiles]
+            results = [result for future in futures for result in future.result()]
+            kept = suppress_duplicates(results, self.iou_threshold)
+            merged = merge_seam_fragments(kept, seam_bands(tiles))
+
+        logger.info("Tiled OCR read %s box(es) from %s tile(s) (%s seam duplicates, %s fragments rejoined).",
+                    len(merged), len(tiles), len(results) - len(kept), len(kept) - len(merged))
+        return merged
+
+    def _release(self):
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        self._pool.shutdown()
+        self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Compare tiled parallel OCR with a single readtext call.')
+    parser.add_argument('images', nargs='+', help='Large images to read.')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+    parser.add_argument('--tile', type=int, default=1024, help='Tile edge in pixels.')
+    parser.add_argument('--overlap', type=int, default=96, help='Overlap between tiles in pixels.')
+    parser.add_argument('--languages', default='ja', help='Comma-separated OCR language codes.')
+    args = parser.parse_args(argv)
+
+    import extract_image_text
+
+    languages = tuple(args.languages.split(','))
+    extract_image_text.warm_up_reader(languages, background=False)
+    with TiledOCR(args.workers, args.tile, args.overlap, languages) as ocr:
+        ocr.process(Image.new('RGB', (64, 64), 'white'))  # Start the workers and load their readers
+        for path in args.images:
+            with Image.open(path) as image:
+                image = image.convert('RGB')
+            start = time.perf_counter()
+            single = extract_image_text.extract_japanese_text(image, languages)
+            single_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            tiled = ocr.process(image)
+            tiled_seconds = time.perf_counter() - start
+
+            matched = sum(any(box_iou(box['coordinates'], other['coordinates']) >= 0.5 for other in tiled) for box in single)
+            print(f"{path}: {image.width}x{image.height}  single {single_seconds:.2f}s ({len(single)} boxes)  "
+                  f"tiled {tiled_seconds:.2f}s ({len(tiled)} boxes, {matched}/{len(single)} matched)  "
+                  f"speed-up {single_seconds / tiled_seconds if tiled_seconds else 0.0:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+import metrics
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a source string so OCR noise in width and spacing maps to the same key.
+
+    Args:
+        text (str): The raw source text.
+
+    Returns:
+        str: NFKC-normalized text with runs of whitespace collapsed and ends stripped.
+    """
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+class TranslationMemory:
+    """Translation cache with an in-process LRU in front of an on-disk SQLite store.
+
+    Entries are keyed by normalized source text, source language, target language and
+    backend, so a translation made by one backend is never served for another.
+    """
+
+    def __init__(self, path: str = 'translation_memory.sqlite3', max_entries: int = 200_000, lru_size: int = 4096):
+        """
+        Args:
+            path (str): SQLite database file. Use ':memory:' for a cache that does not persist.
+            max_entries (int): Rows kept on disk; the least recently used rows are deleted beyond it.
+            lru_size (int): Entries kept in the in-process LRU.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.lru_size = lru_size
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._writes_since_trim = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use. Caller holds the lock."""
+        if self._connection is None:
+            if self.path != ':memory:' and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                ' source TEXT NOT NULL, source_lang TEXT NOT NULL, target_lang TEXT NOT NULL,'
+                ' backend TEXT NOT NULL, translation TEXT NOT NULL, last_used REAL NOT NULL,'
+                ' PRIMARY KEY (source, source_lang, target_lang, backend))'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)')
+            self._connection.commit()
+        return self._connection
+
+    def _remember(self, key: tuple, translation: str):
+        """Insert into the in-process LRU. Caller holds the lock."""
+        self._lru[key] = translation
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, text: str, source_lang: str, target_lang: str, backend: str):
+        """Look up a stored translation.
+
+        Args:
+            text (str): The source text (normalized internally).
+            source_lang (str): The source language code.
+            target_lang (str): The target language code.
+            backend (str): The backend that produced the translation, e.g. 'google' or 'marian'.
+
+        Returns:
+            str | None: The stored translation, or None on a miss.
+        """
+        key = (normalize_text(text), source_lang, target_lang, backend)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                metrics.increment('translation_memory.hit')
+                return self._lru[key]
+
+            connection = self._connect()
+            row = connection.execute(
+                'SELECT translation FROM translations'
+                ' WHERE source = ? AND source_lang = ? AND target_lang = ? AND backend = ?', key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                metrics.increment('translation_memory.miss')
+                return None
+
+            connection.execute(
+                'UPDATE translations SET last_used = ?'
+                ' WHERE source = ? AND source_lang = ? AND target_lang = ? AND backend = ?', (time.time(), *key)
+            )
+            connection.commit()
+            self.disk_hits += 1
+            metrics.increment('translation_memory.hit')
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, text: str, source_lang: str, target_lang: str, backend: str, translation: str):
+        """Store a translation in both tiers.
+
+        Args:
+            text (str): The source text (normalized internally).
+            source_lang (str): The source language code.
+            target_lang (str): The target language code.
+            backend (str): The backend that produced the translation.
+            translation (str): The translated text.
+        """
+        key = (normalize_text(text), source_lang, target_lang, backend)
+        with self._lock:
+            self._remember(key, translation)
+            connection = self._connect()
+            connection.execute(
+                'INSERT OR REPLACE INTO translations (source, source_lang, target_lang, backend, translation, last_used)'
+                ' VALUES (?, ?, ?, ?, ?, ?)', (*key, translation, time.time())
+            )
+            connection.commit()
+
+            # Counting rows on every write would be wasteful, so trim in steps
+            self._writes_since_trim += 1
+            if self._writes_since_trim >= max(1, self.max_entries // 100):
+                self._writes_since_trim = 0
+                self._trim(connection)
+
+    def _trim(self, connection: sqlite3.Connection):
+        """Delete the least recently used rows above `max_entries`. Caller holds the lock."""
+        (count,) = connection.execute('SELECT COUNT(*) FROM translations').fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            connection.execute(
+                'DELETE FROM translations WHERE rowid IN'
+                ' (SELECT rowid FROM translations ORDER BY last_used ASC LIMIT ?)', (excess,)
+            )
+            connection.commit()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current tier sizes."""
+        with self._lock:
+            (disk_entries,) = self._connect().execute('SELECT COUNT(*) FROM translations').fetchone()
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._lru),
+                'disk_entries': disk_entries,
+            }
+
+    def clear(self):
+        """Remove every stored translation and reset the counters."""
+        with self._lock:
+            self._lru.clear()
+            connection = self._connect()
+            connection.execute('DELETE FROM translations')
+            connection.commit()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def close(self):
+        """Close the database connection. It is reopened on the next lookup."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+# Shared by every caller in the process
+memory = TranslationMemory()
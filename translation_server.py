@@ -0,0 +1,406 @@
+import argparse
+import http.client
+import io
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from PIL import Image
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+
+# Marks the end of the batcher's queue
+STOP = object()
+
+
+class TranslationBatcher:
+    """
+    Merges the translation work of concurrent requests into shared batches.
+
+    Each request hands over its items and waits. A single worker thread gathers everything that
+    arrives within `max_wait` seconds (up to `max_items` items) and translates it in one
+    text_translator.translate_results call per (target language, backend), so lines repeated
+    across clients are translated once and the model sees larger batches.
+    """
+
+    def __init__(self, max_wait: float = 0.01, max_items: int = 256):
+        """
+        Args:
+            max_wait (float): Seconds to wait for more requests after the first one arrives.
+            max_items (int): Items that close a batch early.
+        """
+        self.max_wait = max_wait
+        self.max_items = max_items
+        self.batches = 0
+        self.jobs = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='translation-batcher', daemon=True)
+        self._thread.start()
+
+    def translate(self, items: list, target_language: str = 'en', use_google: bool = True) -> list:
+        """
+        Translate result dicts in place, batched with other callers, and return them.
+
+        Raises:
+            Exception: Whatever the batch raised, re-raised in every waiting caller.
+        """
+        if not items:
+            return items
+        job = {'items': items, 'target': target_language, 'google': use_google, 'done': threading.Event(), 'error': None}
+        self._queue.put(job)
+        job['done'].wait()
+        if job['error'] is not None:
+            raise job['error']
+        return items
+
+    def _run(self):
+        import text_translator
+
+        while True:
+            job = self._queue.get()
+            if job is STOP:
+                break
+            jobs = [job]
+            count = len(job['items'])
+            deadline = time.perf_counter() + self.max_wait
+            while count < self.max_items:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if job is STOP:
+                    self._queue.put(STOP)
+                    break
+                jobs.append(job)
+                count += len(job['items'])
+
+            groups = {}
+            for job in jobs:
+                groups.setdefault((job['target'], job['google']), []).append(job)
+            for (target_language, use_google), group in groups.items():
+                try:
+                    with metrics.span('server.translate_batch'):
+                        text_translator.translate_results([item for job in group for item in job['items']],
+                                                          target_language, use_google)
+                except Exception as err:
+                    logger.error("Batched translation failed: %s", err)
+                    for job in group:
+                        job['error'] = err
+                for job in group:
+                    job['done'].set()
+            self.batches += 1
+            self.jobs += len(jobs)
+            metrics.increment('server.batched_requests', len(jobs))
+
+    def close(self):
+        """Stop the worker after the queued jobs are done."""
+        self._queue.put(STOP)
+        self._thread.join()
+
+
+class TranslationRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP API of the translation server.
+
+    GET  /health    Loaded OCR readers and translation models.
+    POST /translate JSON {"texts": [...], "target": "en", "use_google": true} -> {"translations": [...]}
+    POST /extract   Image bytes -> JSON {"sentences": [...]} with translated text and original_text
+    POST /overlay   Image bytes -> PNG with the captions drawn on it
+
+    /extract and /overlay take `target`, `languages` (comma-separated OCR codes), `use_google`
+    and `merge` (0 or 1; merge fragments into lines and paragraphs) as query parameters.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/health':
+            self.send_error(404)
+            return
+        import extract_image_text
+        from model_registry import registry
+
+        self._send_json({
+            'status': 'ok',
+            'readers': {','.join(key): value for key, value in extract_image_text.get_reader_stats().items()},
+            'models': registry.loaded(),
+            'batches': self.server.batcher.batches,
+        })
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._response_started = False
+        try:
+            with metrics.span(f'server{url.path.replace("/", ".")}'):
+                if url.path == '/translate':
+                    self._translate(json.loads(body))
+                elif url.path in ('/extract', '/overlay'):
+                    self._image(url.path, body, params)
+                else:
+                    self.send_error(404)
+        except Exception as err:
+            logger.error("Request %s failed: %s", url.path, err)
+            metrics.increment('server.errors')
+            if self._response_started:
+                # Part of the response is already on the wire; a second one would corrupt it
+                self.close_connection = True
+            else:
+                self._send_json({'error': str(err)}, status=500)
+
+    def _translate(self, request: dict):
+        items = [{'text': text} for text in request['texts']]
+        self.server.batcher.translate(items, request.get('target', 'en'), request.get('use_google', True))
+        self._send_json({
+            'translations': [item['text'] for item in items],
+            'source_languages': [item.get('source_language') for item in items],
+        })
+
+    def _image(self, path: str, body: bytes, params: dict):
+        import extract_image_text
+        import overlay_caption_on_image
+        import text_layout
+
+        languages = tuple(params.get('languages', ','.join(self.server.languages)).split(','))
+        target_language = params.get('target', 'en')
+        use_google = params.get('use_google', '1') != '0'
+
+        image = Image.open(io.BytesIO(body))
+        image = image.convert('RGB') if image.mode not in ('RGB', 'RGBA') else image
+        results = extract_image_text.extract_japanese_text(image, languages)
+        if params.get('merge', '1') != '0':
+            results = text_layout.merge_results(results)
+        self.server.batcher.translate(results, target_language, use_google)
+
+        if path == '/extract':
+            self._send_json({'sentences': results, 'width': image.width, 'height': image.height})
+            return
+        output = overlay_caption_on_image.overlay_images_with_coordinates(image, {'sentences': results}, inplace=True)
+        with io.BytesIO() as buffer:
+            output.save(buffer, format='PNG', compress_level=1)
+            self._send(buffer.getvalue(), 'image/png')
+
+    def _send_json(self, data: dict, status: int = 200):
+        self._send(json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json', status)
+
+    def _send(self, body: bytes, content_type: str, status: int = 200):
+        self._response_started = True
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class _ServerState:
+    """Fields shared by the TCP and Unix socket servers."""
+    daemon_threads = True
+
+    def setup_state(self, batcher: TranslationBatcher, languages: tuple):
+        self.batcher = batcher
+        self.languages = languages
+
+
+class TranslationHTTPServer(_ServerState, ThreadingHTTPServer):
+    pass
+
+
+class TranslationUnixServer(_ServerState, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None, languages: tuple = ('ja',),
+          warm: bool = True, max_wait: float = 0.01, background: bool = True):
+    """
+    Start the translation server, keeping the OCR reader and translation models loaded.
+
+    Args:
+        host (str): Interface to bind; keep it local.
+        port (int): TCP port (0 picks a free one). Ignored when `socket_path` is given.
+        socket_path (str): Serve on this Unix socket instead of TCP.
+        languages (tuple): Default OCR language codes; their reader is loaded at start-up.
+        warm (bool): Load the OCR reader before accepting requests.
+        max_wait (float): Seconds the batcher waits to merge concurrent translation requests.
+        background (bool): Serve from a daemon thread and return; otherwise block until interrupted.
+
+    Returns:
+        The running server; call shutdown() to stop it.
+    """
+    if warm:
+        import extract_image_text
+        extract_image_text.warm_up_reader(languages, background=False)
+
+    batcher = TranslationBatcher(max_wait=max_wait)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = TranslationUnixServer(socket_path, TranslationRequestHandler)
+        address = socket_path
+    else:
+        server = TranslationHTTPServer((host, port), TranslationRequestHandler)
+        address = f'http://{host}:{server.server_address[1]}'
+    server.setup_state(batcher, tuple(languages))
+    logger.info("Translation server listening on %s", address)
+
+    if background:
+        threading.Thread(target=server.serve_forever, name='translation-server', daemon=True).start()
+        return server
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix socket."""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class TranslationClient:
+    """
+    Thin client of a running translation server; no model is loaded in the client process.
+
+    One persistent connection is kept per client, so use one client per thread.
+    """
+
+    def __init__(self, url: str = f'http://{DEFAULT_HOST}:{DEFAULT_PORT}', socket_path: str = None, timeout: float = 60.0):
+        """
+        Args:
+            url (str): Server address when using TCP.
+            socket_path (str): Server Unix socket; takes precedence over `url`.
+            timeout (float): Seconds to wait for a response.
+        """
+        self.url = url
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._connection = None
+
+    def _request(self, method: str, path: str, body: bytes = None, content_type: str = None) -> tuple:
+        """Send one request, reconnecting once if the kept-alive connection was closed."""
+        headers = {'Content-Type': content_type} if content_type else {}
+        for attempt in range(2):
+            if self._connection is None:
+                if self.socket_path:
+                    self._connection = _UnixHTTPConnection(self.socket_path, self.timeout)
+                else:
+                    parsed = urlparse(self.url)
+                    self._connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=self.timeout)
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                response = self._connection.getresponse()
+                data = response.read()
+            except (ConnectionError, http.client.HTTPException):
+                self.close()
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                raise RuntimeError(f"Translation server returned {response.status}: {data[:200].decode('utf-8', 'replace')}")
+            return data, response.getheader('Content-Type', '')
+
+    @staticmethod
+    def _image_query(target_language: str, languages: tuple, use_google: bool) -> str:
+        query = f'target={target_language}&use_google={int(use_google)}'
+        return query + f"&languages={','.join(languages)}" if languages else query
+
+    @staticmethod
+    def _encode(image: Image.Image) -> bytes:
+        # Uncompressed BMP: encoding time matters more than size on a local connection
+        with io.BytesIO() as buffer:
+            image.save(buffer, format='BMP')
+            return buffer.getvalue()
+
+    def health(self) -> dict:
+        """Return the server status, raising if it cannot be reached."""
+        return json.loads(self._request('GET', '/health')[0])
+
+    def translate(self, texts: list, target_language: str = 'en', use_google: bool = True) -> list:
+        """Translate a list of strings on the server."""
+        body = json.dumps({'texts': list(texts), 'target': target_language, 'use_google': use_google}).encode('utf-8')
+        return json.loads(self._request('POST', '/translate', body, 'application/json')[0])['translations']
+
+    def extract(self, image: Image.Image, target_language: str = 'en', languages: tuple = None, use_google: bool = True) -> list:
+        """OCR and translate an image on the server; returns extract_japanese_text-style results."""
+        path = '/extract?' + self._image_query(target_language, languages, use_google)
+        return json.loads(self._request('POST', path, self._encode(image), 'image/bmp')[0])['sentences']
+
+    def overlay(self, image: Image.Image, target_language: str = 'en', languages: tuple = None, use_google: bool = True) -> Image.Image:
+        """OCR, translate and caption an image on the server; returns the overlaid image."""
+        path = '/overlay?' + self._image_query(target_language, languages, use_google)
+        data, _ = self._request('POST', path, self._encode(image), 'image/bmp')
+        return Image.open(io.BytesIO(data))
+
+    def close(self):
+        """Close the connection; the next request reconnects."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def connect(url: str = f'http://{DEFAULT_HOST}:{DEFAULT_PORT}', socket_path: str = None, timeout: float = 60.0):
+    """
+    Return a client for a running server, or None when no server answers.
+
+    Example:
+        client = translation_server.connect()
+        result = client.overlay(img) if client else mid_process(img)
+    """
+    client = TranslationClient(url, socket_path, timeout)
+    try:
+        client.health()
+    except (OSError, RuntimeError, http.client.HTTPException):
+        client.close()
+        return None
+    return client
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Serve OCR and translation with the models kept loaded.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Interface to bind.')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='TCP port.')
+    parser.add_argument('--socket', help='Serve on this Unix socket instead of TCP.')
+    parser.add_argument('--languages', default='ja', help='Comma-separated OCR language codes to load.')
+    parser.add_argument('--max-wait-ms', type=float, default=10.0, help='Time spent merging concurrent translation requests.')
+    parser.add_argument('--no-warm', action='store_true', help='Load the OCR reader on the first request instead.')
+    args = parser.parse_args(argv)
+
+    metrics.setup_logging()
+    serve(args.host, args.port, args.socket, tuple(args.languages.split(',')), warm=not args.no_warm,
+          max_wait=args.max_wait_ms / 1000, background=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,405 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from difflib import SequenceMatcher
+import numpy as np
+from PIL import Image
+import metrics
+from text_layout import box_iou
+
+logger = logging.getLogger(__name__)
+
+# Side of the grayscale thumbnail compared to detect scene changes
+THUMBNAIL_SIZE = (64, 36)
+
+
+def thumbnail(frame: np.ndarray) -> np.ndarray:
+    """Return a small grayscale copy of a BGR frame for cheap frame-to-frame comparison."""
+    import cv2
+    return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+def scene_change(previous: np.ndarray, current: np.ndarray) -> float:
+    """Return the mean absolute difference (0-255) between two thumbnails."""
+    return float(np.mean(np.abs(previous.astype(np.int16) - current.astype(np.int16))))
+
+def sample_frames(path: str, threshold: float = 4.0, min_gap: int = 2, max_gap: int = 30):
+    """
+    Decode a video and yield only the frames worth reading.
+
+    A frame is sampled when its thumbnail differs from the last sampled one by more than
+    `threshold`, but never more often than every `min_gap` frames; static scenes are still
+    sampled every `max_gap` frames so slowly appearing text is not missed.
+
+    Args:
+        path (str): Video file.
+        threshold (float): Mean absolute thumbnail difference that counts as a change.
+        min_gap (int): Minimum frames between samples.
+        max_gap (int): Maximum frames between samples.
+
+    Yields:
+        tuple: (frame_index, BGR frame) of every sampled frame.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video {path}.")
+    try:
+        index = 0
+        last_index = None
+        last_thumbnail = None
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            gap = None if last_index is None else index - last_index
+            if gap is None or gap >= max_gap:
+                sample = True
+            elif gap < min_gap:
+                sample = False
+            else:
+                sample = scene_change(last_thumbnail, thumbnail(frame)) > threshold
+            if sample:
+                last_index = index
+                last_thumbnail = thumbnail(frame)
+                yield index, frame
+            index += 1
+    finally:
+        capture.release()
+
+def video_info(path: str) -> dict:
+    """Return the frame rate, frame count and size of a video."""
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    try:
+        return {
+            'fps': capture.get(cv2.CAP_PROP_FPS) or 25.0,
+            'frames': int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+            'width': int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        capture.release()
+
+def text_similarity(first: str, second: str) -> float:
+    """Return a 0-1 similarity ratio between two OCR strings."""
+    if first == second:
+        return 1.0
+    return SequenceMatcher(None, first, second).ratio()
+
+
+class LineTracker:
+    """
+    Follows OCR lines across sampled frames so each on-screen line is handled once.
+
+    A detection continues a track when its box overlaps the track's last box by `iou_threshold`
+    and its text is at least `similarity_threshold` similar, which tolerates OCR flicker on the
+    same line. Tracks not seen for `max_missing` samples end.
+    """
+
+    def __init__(self, iou_threshold: float = 0.5, similarity_threshold: float = 0.6, max_missing: int = 1):
+        """
+        Args:
+            iou_threshold (float): Minimum box overlap to match a track.
+            similarity_threshold (float): Minimum text similarity to match a track.
+            max_missing (int): Samples a track may be missing before it ends.
+        """
+        self.iou_threshold = iou_threshold
+        self.similarity_threshold = similarity_threshold
+        self.max_missing = max_missing
+        self.active = []
+        self.finished = []
+        self._next_id = 0
+
+    def update(self, frame_index: int, results: list):
+        """
+        Match the OCR results of one sampled frame to the active tracks.
+
+        Args:
+            frame_index (int): Index of the sampled frame; samples must arrive in order.
+            results (list): extract_japanese_text results of that frame.
+        """
+        candidates = []
+        for track_number, track in enumerate(self.active):
+            for result_number, result in enumerate(results):
+                overlap = box_iou(track['box'], result['coordinates'])
+                if overlap < self.iou_threshold:
+                    continue
+                similarity = text_similarity(track['observed_text'], result['text'])
+                if similarity >= self.similarity_threshold:
+                    candidates.append((overlap + similarity, track_number, result_number))
+
+        # Greedy one-to-one matching, best pairs first
+        matched_tracks, matched_results = set(), set()
+        for _, track_number, result_number in sorted(candidates, reverse=True):
+            if track_number in matched_tracks or result_number in matched_results:
+                continue
+            matched_tracks.add(track_number)
+            matched_results.add(result_number)
+            track, result = self.active[track_number], results[result_number]
+            track['last_frame'] = frame_index
+            track['box'] = result['coordinates']
+            track['missing'] = 0
+            # Keep the most confident reading as the line's text
+            if result.get('confidence', 0.0) > track['confidence']:
+                track['observed_text'] = result['text']
+                track['confidence'] = result.get('confidence', 0.0)
+                track['coordinates'] = dict(result['coordinates'])
+
+        still_active = []
+        for track_number, track in enumerate(self.active):
+            if track_number not in matched_tracks:
+                track['missing'] += 1
+                if track['missing'] == 1:
+                    track['missed_at'] = frame_index
+                if track['missing'] > self.max_missing:
+                    # The line was last on screen just before the first sample that missed it
+                    track['end_frame'] = track['missed_at']
+                    self.finished.append(track)
+                    continue
+            still_active.append(track)
+        self.active = still_active
+
+        for result_number, result in enumerate(results):
+            if result_number in matched_results:
+                continue
+            self.active.append({
+                'id': self._next_id,
+                'observed_text': result['text'],
+                'confidence': result.get('confidence', 0.0),
+                'coordinates': dict(result['coordinates']),
+                'box': result['coordinates'],
+                'first_frame': frame_index,
+                'last_frame': frame_index,
+                'missing': 0,
+            })
+            self._next_id += 1
+
+    def finish(self, end_frame: int) -> list:
+        """End every active track at `end_frame` and return all tracks ordered by start."""
+        for track in self.active:
+            track['end_frame'] = track['missed_at'] if track['missing'] else end_frame
+        self.finished.extend(self.active)
+        self.active = []
+        return sorted(self.finished, key=lambda track: (track['first_frame'], track['id']))
+
+def _ocr_frame(frame_index: int, frame: np.ndarray, languages: tuple) -> tuple:
+    """OCR one RGB frame, in a worker process or inline."""
+    import extract_image_text
+    return frame_index, extract_image_text.extract_japanese_text(Image.fromarray(frame), languages)
+
+def track_lines(path: str, workers: int = None, languages: tuple = ('ja',), threshold: float = 4.0,
+                min_gap: int = 2, max_gap: int = 30, tracker: LineTracker = None) -> list:
+    """
+    OCR the sampled frames of a video across a process pool and track the lines they contain.
+
+    Args:
+        path (str): Video file.
+        workers (int): OCR worker processes; 0 runs OCR in this process. Defaults to the CPU count.
+        languages (tuple): OCR language codes.
+        threshold, min_gap, max_gap: Frame sampling settings, see sample_frames.
+        han_language (str): Source language of ideograph-only text; None uses text_translator.HAN_LANGUAGE.
+        tracker (LineTracker): Tracker to use; a default one is created if None.
+
+    Returns:
+        list: Tracks with 'observed_text', 'coordinates', 'first_frame' and 'end_frame' (exclusive).
+    """
+    import extract_image_text
+    import text_layout
+
+    tracker = tracker or LineTracker()
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    results_by_frame = {}
+    frame_count = 0
+
+    if workers == 0:
+        for frame_index, frame in sample_frames(path, threshold, min_gap, max_gap):
+            results_by_frame[frame_index] = _ocr_frame(frame_index, frame[..., ::-1].copy(), tuple(languages))[1]
+            frame_count = frame_index + 1
+    else:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(workers, initializer=extract_image_text.init_worker, initargs=(tuple(languages), threads_per_worker)) as pool:
+            pending = set()
+            for frame_index, frame in sample_frames(path, threshold, min_gap, max_gap):
+                # Bound the frames in flight so decoding does not outrun OCR in memory
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    results_by_frame.update(future.result() for future in done)
+                pending.add(pool.submit(_ocr_frame, frame_index, frame[..., ::-1].copy(), tuple(languages)))
+                frame_count = frame_index + 1
+            results_by_frame.update(future.result() for future in wait(pending).done)
+
+    # Tracking needs the samples in order, whatever order OCR finished in
+    for frame_index in sorted(results_by_frame):
+        tracker.update(frame_index, text_layout.merge_results(results_by_frame[frame_index]))
+    total_frames = max(frame_count, video_info(path)['frames'])
+    tracks = tracker.finish(total_frames)
+    logger.info("Tracked %s line(s) over %s sampled frame(s) of %s.", len(tracks), len(results_by_frame), path)
+    return tracks
+
+def translate_tracks(tracks: list, target_language: str = 'en', use_google: bool = True, han_language: str = None) -> list:
+    """Translate every track once, in one deduplicated batch; sets each track's 'text' and 'language'."""
+    import text_translator
+
+    for track in tracks:
+        track['text'] = track['observed_text']
+    text_translator.translate_results(tracks, target_language, use_google, han_language)
+    return tracks
+
+def _timestamp(seconds: float, centiseconds: bool = False) -> str:
+    """Format seconds as an SRT (00:00:00,000) or ASS (0:00:00.00) timestamp."""
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    if centiseconds:
+        return f"{hours}:{minutes:02d}:{seconds:02d}.{milliseconds // 10:02d}"
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+def write_srt(tracks: list, fps: float, path: str):
+    """Write the translated tracks as an SRT subtitle file, one cue per track."""
+    with open(path, 'w', encoding='utf-8') as file:
+        for number, track in enumerate(tracks, 1):
+            file.write(f"{number}\n{_timestamp(track['first_frame'] / fps)} --> {_timestamp(track['end_frame'] / fps)}\n"
+                       f"{track['text']}\n\n")
+
+def write_ass(tracks: list, fps: float, size: tuple, path: str, font: str = 'Noto Sans JP'):
+    """Write the translated tracks as an ASS subtitle file, each cue positioned over its original line."""
+    width, height = size
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("[Script Info]\nScriptType: v4.00+\n"
+                   f"PlayResX: {width}\nPlayResY: {height}\n\n"
+                   "[V4+ Styles]\n"
+                   "Format: Name, Fontname, Fontsize, PrimaryColour, BackColour, BorderStyle, Outline, Shadow, Alignment\n"
+                   f"Style: Default,{font},{max(12, height // 24)},&H000000FF,&H38FFFFFF,3,1,0,5\n\n"
+                   "[Events]\nFormat: Layer, Start, End, Style, Text\n")
+        for track in tracks:
+            coords = track['coordinates']
+            x = (coords['x1'] + coords['x2']) // 2
+            y = (coords['y1'] + coords['y2']) // 2
+            text = track['text'].replace('\n', '\\N')
+            file.write(f"Dialogue: 0,{_timestamp(track['first_frame'] / fps, centiseconds=True)},"
+                       f"{_timestamp(track['end_frame'] / fps, centiseconds=True)},Default,{{\\pos({x},{y})}}{text}\n")
+
+def render_video(path: str, tracks: list, output_path: str, fourcc: str = 'mp4v'):
+    """
+    Re-encode a video with every track's caption drawn over its line.
+
+    Each track's caption is rendered and premultiplied once, then blended into every frame of
+    its lifetime, so the cost per frame is only the blend.
+    """
+    import cv2
+    from caption_cache import caption_cache
+    from overlay_caption_on_image import composite_tiles, premultiply
+
+    info = video_info(path)
+    capture = cv2.VideoCapture(path)
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), info['fps'], (info['width'], info['height']))
+    if not writer.isOpened():
+        capture.release()
+        raise ValueError(f"Cannot write video {output_path} with codec {fourcc}.")
+
+    starts = sorted(tracks, key=lambda track: track['first_frame'])
+    next_start = 0
+    active = []
+    index = 0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            while next_start < len(starts) and starts[next_start]['first_frame'] <= index:
+                track = starts[next_start]
+                coords = track['coordinates']
+                caption = caption_cache.get_caption(track['text'], (coords['x2'] - coords['x1'], coords['y2'] - coords['y1']),
+                                                    language=track.get('language'))
+                # Frames are BGR, so swap the caption's color channels once
+                tile = np.asarray(caption.convert('RGBA'))[..., [2, 1, 0, 3]]
+                active.append((track, premultiply(tile, 3)))
+                next_start += 1
+            active = [(track, planes) for track, planes in active if track['end_frame'] > index]
+
+            with metrics.span('video.overlay'):
+                composite_tiles(frame, [(track['coordinates']['x1'], track['coordinates']['y1'], planes)
+                                        for track, planes in active])
+            writer.write(frame)
+            index += 1
+    finally:
+        capture.release()
+        writer.release()
+
+def translate_video(path: str, output_path: str, workers: int = None, languages: tuple = ('ja',),
+                    target_language: str = 'en', use_google: bool = True, threshold: float = 4.0,
+                    min_gap: int = 2, max_gap: int = 30, han_language: str = None) -> dict:
+    """
+    Subtitle a video: sample, OCR and track its lines, translate each line once, then write
+    an overlaid video or a subtitle file chosen by the extension of `output_path`.
+
+    Args:
+        path (str): Input video.
+        output_path (str): '.srt' or '.ass' for subtitles; any other extension re-encodes the video.
+        workers (int): OCR worker processes; 0 runs OCR in this process.
+        languages (tuple): OCR language codes.
+        target_language (str): The target language code.
+        use_google (bool): Allow the online backend when connected.
+        threshold, min_gap, max_gap: Frame sampling settings, see sample_frames.
+        han_language (str): Source language of ideograph-only text; None uses text_translator.HAN_LANGUAGE.
+
+    Returns:
+        dict: Track count, frames and seconds per phase.
+    """
+    start = time.perf_counter()
+    info = video_info(path)
+    tracks = track_lines(path, workers, languages, threshold, min_gap, max_gap)
+    after_ocr = time.perf_counter()
+    translate_tracks(tracks, target_language, use_google, han_language)
+    after_translate = time.perf_counter()
+
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension == '.srt':
+        write_srt(tracks, info['fps'], output_path)
+    elif extension == '.ass':
+        write_ass(tracks, info['fps'], (info['width'], info['height']), output_path)
+    else:
+        render_video(path, tracks, output_path)
+    end = time.perf_counter()
+
+    return {
+        'tracks': len(tracks),
+        'frames': info['frames'],
+        'fps': info['fps'],
+        'ocr_seconds': after_ocr - start,
+        'translate_seconds': after_translate - after_ocr,
+        'output_seconds': end - after_translate,
+        'seconds': end - start,
+    }
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Translate the on-screen text of a video.')
+    parser.add_argument('input', help='Video file.')
+    parser.add_argument('-o', '--output', required=True, help='Output .srt, .ass or video file.')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='OCR worker processes (default: CPU count, 0: inline).')
+    parser.add_argument('--languages', default='ja', help='Comma-separated OCR language codes.')
+    parser.add_argument('--target', default='en', help='Target language code.')
+    parser.add_argument('--offline', action='store_true', help='Never use the online backend.')
+    parser.add_argument('--threshold', type=float, default=4.0, help='Scene change that triggers a sample (0-255).')
+    parser.add_argument('--min-gap', type=int, default=2, help='Minimum frames between samples.')
+    parser.add_argument('--max-gap', type=int, default=30, help='Maximum frames between samples.')
+    parser.add_argument('--han-language', default=None, help="Language of text in Han ideographs only (default: ja; use zh for Chinese).")
+    args = parser.parse_args(argv)
+
+    metrics.setup_logging()
+    summary = translate_video(
+        args.input, args.output, workers=args.workers, languages=tuple(args.languages.split(',')),
+        target_language=args.target, use_google=not args.offline, threshold=args.threshold,
+        min_gap=args.min_gap, max_gap=args.max_gap, han_language=args.han_language,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
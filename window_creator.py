@@ -1,4 +1,6 @@
 import os
+import queue
+import threading
 import tkinter as tk
 from PIL import Image, ImageTk
 import pyautogui
@@ -6,7 +8,20 @@ import time
 import logging
 
 
-def show_image_in_window(image, x=0, y=0):
+def show_image_in_window(image, x=0, y=0, updates=None):
+    """
+    Show an image in a topmost window until it is clicked.
+
+    Args:
+        image: The Pillow image to show.
+        x, y: Screen position of the window.
+        updates: Optional iterable of newer versions of the image (same size), e.g. overlays
+                 from progressive.stream_overlays. It is consumed on a background thread and the
+                 window shows each version as it arrives; closing the window stops consuming it.
+
+    Returns:
+        tuple: The click position and the window coordinates (x1, x2, y1, y2).
+    """
     logging.info("Initializing window to display image.")
 
     # Check if there is already a Tk instance, and create a Toplevel if so
@@ -30,12 +45,12 @@ def show_image_in_window(image, x=0, y=0):
 
     # Function to handle mouse click
     def on_click(event):
-        logging.info(f"Mouse click detected at position ({event.x_root}, {event.y_root})")
+        logging.info("Mouse click detected at position (%s, %s)", event.x_root, event.y_root)
 
         # Record the click coordinates relative to the screen
         click_position[0] = event.x_root
         click_position[1] = event.y_root
-        logging.debug(f"Click coordinates recorded: {click_position}")
+        logging.debug("Click coordinates recorded: %s", click_position)
 
         # Minimize the window
         logging.debug("Minimizing window.")
@@ -43,7 +58,7 @@ def show_image_in_window(image, x=0, y=0):
 
         # Replay the click after minimizing
         time.sleep(1)  # Give time for the window to minimize
-        logging.debug(f"Replaying click at position: {click_position}")
+        logging.debug("Replaying click at position: %s", click_position)
         pyautogui.click(click_position[0], click_position[1])  # Replay click
 
         # Get current size and position of the window
@@ -55,7 +70,7 @@ def show_image_in_window(image, x=0, y=0):
         # Store the window coordinates
         window_coordinates[0], window_coordinates[1] = x1, x2
         window_coordinates[2], window_coordinates[3] = y1, y2
-        logging.debug(f"Window coordinates: x1={x1}, x2={x2}, y1={y1}, y2={y2}")
+        logging.debug("Window coordinates: x1=%s, x2=%s, y1=%s, y2=%s", x1, x2, y1, y2)
 
         # Close the window after the click is recorded
         logging.debug("Closing window.")
@@ -77,12 +92,37 @@ def show_image_in_window(image, x=0, y=0):
     logging.debug("Binding left mouse click event to on_click function.")
     window.bind("<Button-1>", on_click)
 
+    # Show newer versions of the image as they are produced; Tk is only touched from this thread
+    if updates is not None:
+        latest = queue.Queue()
+        closed = threading.Event()
+
+        def consume():
+            for update in updates:
+                if closed.is_set():
+                    break
+                latest.put(update.copy())  # The producer keeps drawing on its own image
+
+        def refresh():
+            if closed.is_set():
+                return
+            update = None
+            while not latest.empty():
+                update = latest.get_nowait()
+            if update is not None:
+                tk_image.paste(update.convert("RGB") if update.mode != "RGB" else update)
+            window.after(30, refresh)
+
+        window.bind("<Destroy>", lambda event: closed.set() if event.widget is window else None, add="+")
+        threading.Thread(target=consume, name='window-updates', daemon=True).start()
+        window.after(30, refresh)
+
     # Set the window size to the image size
-    logging.debug(f"Setting window size to {image.width}x{image.height}.")
+    logging.debug("Setting window size to %sx%s.", image.width, image.height)
     window.geometry(f"{image.width}x{image.height}")
 
     # Set the window position to cover the specified coordinates (x, y)
-    logging.debug(f"Positioning window at coordinates ({x}, {y}).")
+    logging.debug("Positioning window at coordinates (%s, %s).", x, y)
     window.geometry(f"+{x}+{y}")  # Position the window at the coordinates where the screenshot was taken
 
     # Start the Tkinter event loop
@@ -90,7 +130,7 @@ def show_image_in_window(image, x=0, y=0):
     window.mainloop()
 
     # After window.quit(), return the click position and window coordinates
-    logging.info(f"Returning click position: {click_position} and window coordinates: {window_coordinates}")
+    logging.info("Returning click position: %s and window coordinates: %s", click_position, window_coordinates)
     return click_position, window_coordinates
 
 
@@ -128,5 +168,5 @@ if __name__ == "__main__":
     click_position, coordinates = show_image_in_window(img, screenshot_x, screenshot_y)
 
     # Print the coordinates
-    logging.info(f"Screen Click Position: {click_position}")
-    logging.info(f"Window Coordinates: {coordinates}")
+    logging.info("Screen Click Position: %s", click_position)
+    logging.info("Window Coordinates: %s", coordinates)